@@ -1,22 +1,28 @@
 # Importar librerias
+import os
+import sys
 import streamlit as st
-import torch
-from torchvision import models, transforms
 from PIL import Image # Para abrir imagenes
 import numpy as np
 import pandas as pd
 
-# Cargar el modelo
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+# Raíz del repositorio en el path para importar las utilidades compartidas
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")))
+from utilidades.artifacts import registry, show_report
+from utilidades.metrics import stage, show_panel, serve_from_env
+from utilidades.startup import background, show_status, poll
 
-# Cargar el checkpoint
-checkpoint = torch.load("D:\Hacking\Python\AI_Learning\Aprendizaje_Profundo\Intel_Image_Class_PyTorch_CNN\EfficientNetB0_phase2.pth", map_location=device)
+# Latencias por etapa (endpoint /metrics si AI_LEARNING_METRICS_PORT está definida)
+APP = "intel"
+serve_from_env()
 
-# Recuperar información del checkpoint
-num_classes = checkpoint['num_classes']
+# torch y torchvision se importan dentro de las funciones de carga, que se
+# ejecutan en segundo plano mientras se dibuja la interfaz
 
 # Reconstruir el modelo
 def build_model(num_classes):
+    import torch
+    from torchvision import models
     model = models.efficientnet_b0(weights=None) # Cargar sin pesos
     in_features = model.classifier[-1].in_features # Obtener el número de características de entrada
     model.classifier = torch.nn.Sequential(
@@ -28,9 +34,21 @@ def build_model(num_classes):
     return model
 
 
-model = build_model(num_classes).to(device)
-model.load_state_dict(checkpoint['state_dict'])
-model.eval()
+# Cargar el checkpoint y reconstruir el modelo (una sola vez por proceso)
+def load_model(path, device):
+    import torch
+    checkpoint = torch.load(path, map_location=device, weights_only=True)  # Solo pesos y tipos básicos
+    model = build_model(checkpoint['num_classes']).to(device)
+    model.load_state_dict(checkpoint['state_dict'])
+    model.eval()
+    return model
+
+
+# Inferencia de prueba para el calentamiento en segundo plano
+def dummy_inference(model, device):
+    import torch
+    with torch.no_grad():
+        model(torch.zeros(1, 3, 224, 224, device=device))
 
 
 # Mapeo idx-->clase
@@ -43,35 +61,71 @@ idx_to_class = {
     5: "street"
 }
 
-# Definir transformaciones
-
+# Parámetros de las transformaciones
 imagenet_mean = [0.485, 0.456, 0.406]
 imagenet_std = [0.229, 0.224, 0.225]
 img_size = 224
 
-eval_tfms = transforms.Compose([
-    transforms.Resize(int(img_size * 1.14)),
-    transforms.CenterCrop(img_size),
-    transforms.ToTensor(),
-    transforms.Normalize(imagenet_mean, imagenet_std)
-])
+
+# Importar torch/torchvision, cargar el modelo y calentarlo (una sola vez por proceso)
+def load_resources():
+    import torch
+    from torchvision import transforms
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    # Definir transformaciones
+    eval_tfms = transforms.Compose([
+        transforms.Resize(int(img_size * 1.14)),
+        transforms.CenterCrop(img_size),
+        transforms.ToTensor(),
+        transforms.Normalize(imagenet_mean, imagenet_std)
+    ])
+
+    def loader(path):
+        return load_model(path, device)
+
+    with stage(APP, "load"):
+        warm_up = artifacts.warm_up("intel_efficientnet_b0", lambda model: dummy_inference(model, device), loader=loader)
+        if warm_up is not None:
+            warm_up.join()
+        model = artifacts.get("intel_efficientnet_b0", loader=loader)
+    return model, eval_tfms, device
+
+
+artifacts = registry()
+resources = background("intel", load_resources)
 
 # Interfaz
 st.title("Clasificación de Imágenes con EfficientNetB0 - Intel Image Classification")
 st.write("Sube una imagen y el modelo clasificará la imagen según la categoría.")
 
 uploaded_file = st.file_uploader("Selecciona una imagen", type=["jpg", "jpeg", "png"])
+show_status(st, resources, "Modelo")
 
 if uploaded_file is not None:
     image = Image.open(uploaded_file).convert("RGB")
     st.image(image, caption="Imagen subida", use_container_width=True)
 
+    # Si el modelo aún se está cargando, la imagen queda pendiente y se clasifica
+    # en cuanto esté listo (poll() vuelve a ejecutar el script)
+    if not resources.done:
+        st.info("El modelo se está cargando; la imagen se clasificará en cuanto esté listo.")
+        poll(st, resources)
+    try:
+        model, eval_tfms, device = resources.result()
+    except Exception as exc:
+        # Cualquier fallo del hilo de carga (fichero, checksum, librería, pesos): se muestra sin traza
+        st.error(f"No se pudo cargar el modelo: {exc}")
+        st.stop()
+    import torch  # Ya importado por el hilo de carga
+
     # Preprocesar la imagen
-    img_tensor = eval_tfms(image).unsqueeze(0).to(device)
+    with stage(APP, "preprocess"):
+        img_tensor = eval_tfms(image).unsqueeze(0).to(device)
 
     # Realizar la predicción
     with st.spinner('Realizando la predicción...'):
-        with torch.no_grad():
+        with stage(APP, "inference"), torch.no_grad():
             output = model(img_tensor)  # Realizar la predicción
             probs = torch.nn.functional.softmax(output, dim=1) # Obtener probabilidades
             pred_idx = torch.argmax(probs, dim=1).item() # Obtener índice de la clase predicha
@@ -79,14 +133,20 @@ if uploaded_file is not None:
             confidence = probs[0][pred_idx].item() # Obtener confianza de la predicción
 
     # Mostrar resultados
-    st.markdown(f"### Predicción: {pred_class.capitalize()}")
-    st.markdown(f"### Confianza: {confidence * 100:.2f}%")
-
-    # Mostrar las 3 principales predicciones
-    top_probs, top_idxs = torch.topk(probs, 3)
-    st.subheader("Top 3 Predicciones:")
-    top3_df = pd.DataFrame({
-        "Clase": [idx_to_class[idx.item()].capitalize() for idx in top_idxs[0]],
-        "Confianza": [f"{prob.item() * 100:.2f} %" for prob in top_probs[0]]
-    })
-    st.table(top3_df)
\ No newline at end of file
+    with stage(APP, "postprocess"):
+        st.markdown(f"### Predicción: {pred_class.capitalize()}")
+        st.markdown(f"### Confianza: {confidence * 100:.2f}%")
+
+        # Mostrar las 3 principales predicciones
+        top_probs, top_idxs = torch.topk(probs, 3)
+        st.subheader("Top 3 Predicciones:")
+        top3_df = pd.DataFrame({
+            "Clase": [idx_to_class[idx.item()].capitalize() for idx in top_idxs[0]],
+            "Confianza": [f"{prob.item() * 100:.2f} %" for prob in top_probs[0]]
+        })
+        st.table(top3_df)
+
+# Tiempos de carga del modelo
+show_report(st, ["intel_efficientnet_b0"])
+show_panel(st, APP)
+poll(st, resources)
@@ -1,10 +1,19 @@
 # Importando las librerías necesarias
+import os
+import sys
 import streamlit as st
 import pandas as pd
 import numpy as np
-import joblib
-import matplotlib.pyplot as plt
-from tensorflow.keras.models import load_model
+
+#Raíz del repositorio en el path para importar las utilidades compartidas
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..")))
+from utilidades.artifacts import registry, show_report
+from utilidades.metrics import stage, show_panel, serve_from_env
+from utilidades.startup import background, show_status, poll
+
+#Latencias por etapa (endpoint /metrics si AI_LEARNING_METRICS_PORT está definida)
+APP = "temperatura"
+serve_from_env()
 
 
 #Funciones auxiliares (crear secuencias, predicción, etc.)
@@ -25,51 +34,89 @@ def predict_multistep(model, last_seq, scaler, days=7):
     preds = np.array(preds).reshape(-1, 1)  #Asegura que preds sea un array 2D
     return scaler.inverse_transform(preds)  #Desnormaliza las predicciones
 
-#Cargamos el modelo y el escalador
-scaler = joblib.load('D:\\Hacking\\Python\\AI_Learning\\Aprendizaje_Profundo\\Temperature_Melb_SimpleRNN\\melb_temp_scaler.pkl')
-model_loaded = load_model('D:\\Hacking\\Python\\AI_Learning\\Aprendizaje_Profundo\\Temperature_Melb_SimpleRNN\\melb_temp_rnn_model.keras')
+#Cargar y limpiar los datos originales (una sola vez por proceso)
+def load_temperatures(path):
+    df = pd.read_csv(path)
+    df.rename(columns={'Daily minimum temperatures in Melbourne, Australia, 1981-1990': 'Temp'}, inplace=True)
+    df['Date'] = pd.to_datetime(df['Date'])
+    df.set_index('Date', inplace=True)
+    df['Temp'] = pd.to_numeric(df['Temp'], errors='coerce')
+    df.dropna(inplace=True)
+    return df
 
-#Cargar datos originales
-df = pd.read_csv('D:\\Hacking\\Python\\AI_Learning\\Aprendizaje_Profundo\\Temperature_Melb_SimpleRNN\\daily-minimum-temperatures-melb.csv')
-df.rename(columns={'Daily minimum temperatures in Melbourne, Australia, 1981-1990': 'Temp'}, inplace=True)
-df['Date'] = pd.to_datetime(df['Date'])
-df.set_index('Date', inplace=True)
-df['Temp'] = pd.to_numeric(df['Temp'], errors='coerce')
-df.dropna(inplace=True)
+#Cargamos el modelo (tensorflow), el escalador y los datos desde el manifiesto de artefactos
+#en un hilo en segundo plano, junto con matplotlib, mientras se dibuja la interfaz
+#(el modelo se calienta mientras se leen el escalador y los datos)
+def load_resources():
+    import matplotlib
+    matplotlib.use("Agg")  #Sin ventanas: Streamlit dibuja la figura con st.pyplot
+    import matplotlib.pyplot  # noqa: F401
+    with stage(APP, "load"):
+        warm_up = artifacts.warm_up("melb_temp_rnn_model", lambda model: model.predict(np.zeros((1, 30, 1)), verbose=0))
+        scaler = artifacts.get("melb_temp_rnn_scaler")
+        df = artifacts.get("melb_temperatures", loader=load_temperatures)
+        if warm_up is not None:
+            warm_up.join()
+        model_loaded = artifacts.get("melb_temp_rnn_model")
+    return scaler, df, model_loaded
 
-#Normalizar los datos
-temp_scaled = scaler.transform(df[['Temp']].values)
-steps = 30  #Número de pasos a predecir
-last_seq = temp_scaled[-steps:]  #Últimos 30 días de datos normalizados
+
+artifacts = registry()
+resources = background("temperatura", load_resources)
 
 #Selector de fecha para la predicción
 days = st.slider("Selecciona el número de días a predecir:", min_value=1, max_value=7, value=7)  #Número de días a predecir
 
 #Interfaz de usuario con Streamlit
 st.title(f"🌡️ Predicción de Temperatura en Melbourne ({days} día{'s' if days > 1 else ''})")
+show_status(st, resources, "Modelo")
+
+#Mientras se carga el modelo, la predicción queda pendiente (poll() vuelve a ejecutar el script)
+if not resources.done:
+    st.info("El modelo se está cargando; la predicción se mostrará en cuanto esté listo.")
+    poll(st, resources)
+try:
+    scaler, df, model_loaded = resources.result()
+except Exception as exc:
+    #Cualquier fallo del hilo de carga (fichero, checksum, librería, pesos): se muestra sin traza
+    st.error(f"No se pudo cargar el modelo: {exc}")
+    st.stop()
+import matplotlib.pyplot as plt  #Ya importado por el hilo de carga
+
+#Normalizar los datos
+with stage(APP, "preprocess"):
+    temp_scaled = scaler.transform(df[['Temp']].values)
+    steps = 30  #Número de pasos a predecir
+    last_seq = temp_scaled[-steps:]  #Últimos 30 días de datos normalizados
 
 #Realizar la predicción
-preds = predict_multistep(model_loaded, last_seq, scaler, days=days)
+with stage(APP, "inference"):
+    preds = predict_multistep(model_loaded, last_seq, scaler, days=days)
 future_dates = pd.date_range(start=df.index[-1] + pd.Timedelta(days=1), periods=days)
 
-#Mostrar los resultados de la predicción
-st.subheader("📈 Predicción para los próximos días")
-# Mostrar las fechas y las temperaturas predichas
-for date, temp in zip(future_dates, preds.flatten()):
-    st.write(f"{date.strftime('%d/%m/%Y')}: {temp:.2f} °C")
-
-#Graficar los resultados
-st.subheader("📊 Gráfico de Predicción")
-
-fig, ax = plt.subplots(figsize=(10, 4)) #Crear una figura y un eje para el gráfico
-#Añadir los últimos 30 días al gráfico
-ax.plot(df.index[-30:], scaler.inverse_transform(temp_scaled[-30:]), label='Últimos 30 dias', color='blue') 
-ax.plot(future_dates, preds, label='Predicción', marker='o', color='red') #Añadir la predicción al gráfico
-ax.set_xlabel('Fecha')
-ax.set_ylabel('Temperatura (°C)')
-ax.set_title('Predicción de Temperatura Mínima en Melbourne') 
-ax.legend() #Añadir leyenda al gráfico
-
-ax.xaxis.set_major_formatter(plt.matplotlib.dates.DateFormatter('/%d/%m')) #Formatear las fechas en el eje x
-fig.autofmt_xdate()  #Formatear las fechas en el eje x
-st.pyplot(fig)  #Mostrar el gráfico en Streamlit
\ No newline at end of file
+#Mostrar los resultados y el gráfico de la predicción
+with stage(APP, "postprocess"):
+    st.subheader("📈 Predicción para los próximos días")
+    # Mostrar las fechas y las temperaturas predichas
+    for date, temp in zip(future_dates, preds.flatten()):
+        st.write(f"{date.strftime('%d/%m/%Y')}: {temp:.2f} °C")
+
+    #Graficar los resultados
+    st.subheader("📊 Gráfico de Predicción")
+
+    fig, ax = plt.subplots(figsize=(10, 4)) #Crear una figura y un eje para el gráfico
+    #Añadir los últimos 30 días al gráfico
+    ax.plot(df.index[-30:], scaler.inverse_transform(temp_scaled[-30:]), label='Últimos 30 dias', color='blue') 
+    ax.plot(future_dates, preds, label='Predicción', marker='o', color='red') #Añadir la predicción al gráfico
+    ax.set_xlabel('Fecha')
+    ax.set_ylabel('Temperatura (°C)')
+    ax.set_title('Predicción de Temperatura Mínima en Melbourne') 
+    ax.legend() #Añadir leyenda al gráfico
+
+    ax.xaxis.set_major_formatter(plt.matplotlib.dates.DateFormatter('/%d/%m')) #Formatear las fechas en el eje x
+    fig.autofmt_xdate()  #Formatear las fechas en el eje x
+    st.pyplot(fig)  #Mostrar el gráfico en Streamlit
+
+#Tiempos de carga de los artefactos
+show_report(st, ["melb_temp_rnn_model", "melb_temp_rnn_scaler", "melb_temperatures"])
+show_panel(st, APP)
@@ -0,0 +1,259 @@
+#Benchmark reproducible de XGBoost, LightGBM y CatBoost sobre Adult Census
+#
+#Mismos modelos y preprocesado que XGBoost_LightGBM_CatBoost.ipynb, pero:
+#  - lee una copia local del dataset (python boosting_bench.py download la descarga una vez)
+#  - mide tiempo de entrenamiento, throughput de predicción por lotes y fila a fila,
+#    pico de memoria y tamaño del modelo serializado
+#  - recorre varios números de hilos y múltiplos del tamaño del dataset
+#  - repite cada configuración y ejecuta cada repetición en un proceso aparte
+#    (el pico de memoria no se contamina entre ejecuciones)
+#  - compara codificaciones de las categóricas (utilidades/encoding.py): one-hot denso
+#    (el del cuaderno), categóricas nativas de cada librería y one-hot disperso (CSR)
+#  - guarda todos los resultados en JSON y muestra una tabla resumen (mediana ± desviación)
+#
+#Uso:
+#    python boosting_bench.py download
+#    python boosting_bench.py run --threads 1,4 --sizes 1,4 --repeats 3 --output resultados_bench.json
+#    python boosting_bench.py run --encodings dense,native,sparse --threads 4 --sizes 1,8
+
+#Importando las librerías necesarias
+import argparse
+import json
+import multiprocessing as mp
+import os
+import pickle
+import platform
+import sys
+import time
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score, f1_score
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+#Raíz del repositorio en el path para importar las utilidades compartidas
+sys.path.insert(0, os.path.abspath(os.path.join(BASE_DIR, "..", "..")))
+from utilidades.encoding import CategoricalEncoder, matrix_memory_mb
+
+DATA_PATH = os.path.join(BASE_DIR, "adult.data")
+DATA_URL = "https://archive.ics.uci.edu/ml/machine-learning-databases/adult/adult.data"
+SEED = 12
+
+#Nombres de las columnas del dataset
+COLUMNS = [
+    "age", "workclass", "fnlwgt", "education", "education-num", "marital-status",
+    "occupation", "relationship", "race", "sex", "capital-gain", "capital-loss",
+    "hours-per-week", "native-country", "income"
+]
+LIBRARIES = ["xgboost", "lightgbm", "catboost"]
+ENCODINGS = ["dense", "native", "sparse"]
+
+
+#Función para descargar el dataset una sola vez
+def download(path=DATA_PATH):
+    from urllib.request import urlretrieve
+    urlretrieve(DATA_URL, path)
+    print(f"Dataset guardado en {path}")
+
+
+#Función para cargar y preparar el dataset como en el cuaderno
+def load_adult(path=DATA_PATH):
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"No existe {path}; ejecuta: python boosting_bench.py download")
+    data = pd.read_csv(path, names=COLUMNS, na_values=" ?", skipinitialspace=True)
+    data.dropna(inplace=True)
+    X = data.drop("income", axis=1)
+    y = data["income"].apply(lambda x: 1 if x == ">50K" else 0)
+    return X, y
+
+
+#Función para crear el modelo de cada librería con los parámetros del cuaderno
+def make_model(library, threads, **params):
+    if library == "xgboost":
+        from xgboost import XGBClassifier
+        return XGBClassifier(eval_metric="logloss", random_state=SEED, n_jobs=threads, **params)
+    if library == "lightgbm":
+        import lightgbm as lgb
+        return lgb.LGBMClassifier(objective="binary", metric="binary_logloss", random_state=SEED, n_jobs=threads, verbose=-1, **params)
+    from catboost import CatBoostClassifier
+    return CatBoostClassifier(iterations=1000, learning_rate=0.1, depth=6, loss_function="Logloss",
+                              random_seed=SEED, verbose=0, thread_count=threads, **params)
+
+
+#Función para crear el codificador de cada librería (CatBoost recibe las categóricas como texto)
+def make_encoder(library, encoding):
+    if encoding == "native" and library == "catboost":
+        return CategoricalEncoder("catboost")
+    return CategoricalEncoder(encoding)
+
+
+#Filas de una matriz densa (DataFrame) o dispersa (CSR)
+def take_rows(matrix, start, stop):
+    return matrix[start:stop] if sparse.issparse(matrix) else matrix.iloc[start:stop]
+
+
+#Pico de memoria residente del proceso en MB
+def peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1024 ** 2
+
+
+#Una ejecución completa (en su propio proceso)
+def run_once(config):
+    X, y = load_adult(config["data"])
+    train_X, test_X, train_y, test_y = train_test_split(X, y, test_size=0.2, random_state=SEED)
+    #Múltiplos del tamaño: el conjunto de entrenamiento se replica
+    if config["size"] > 1:
+        train_X = pd.concat([train_X] * config["size"], ignore_index=True)
+        train_y = pd.concat([train_y] * config["size"], ignore_index=True)
+    baseline_mb = peak_rss_mb()
+
+    #El vocabulario se aprende en entrenamiento y se reutiliza en test
+    encoder = make_encoder(config["library"], config["encoding"])
+    start = time.perf_counter()
+    train_X = encoder.fit_transform(train_X)
+    test_X = encoder.transform(test_X)
+    encode_s = time.perf_counter() - start
+
+    model = make_model(config["library"], config["threads"], **encoder.model_params(config["library"]))
+    start = time.perf_counter()
+    model.fit(train_X, train_y, **encoder.fit_params(config["library"]))
+    fit_s = time.perf_counter() - start
+    fit_peak_mb = peak_rss_mb()
+
+    #Predicción por lotes (conjunto de test completo)
+    start = time.perf_counter()
+    preds = model.predict(test_X)
+    batch_s = time.perf_counter() - start
+
+    #Predicción fila a fila
+    latencies = []
+    for i in range(min(config["single_rows"], test_X.shape[0])):
+        row = take_rows(test_X, i, i + 1)
+        start = time.perf_counter()
+        model.predict(row)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "library": config["library"],
+        "encoding": config["encoding"],
+        "threads": config["threads"],
+        "size": config["size"],
+        "repeat": config["repeat"],
+        "train_rows": train_X.shape[0],
+        "features": train_X.shape[1],
+        "matrix_mb": matrix_memory_mb(train_X),
+        "encode_s": encode_s,
+        "fit_s": fit_s,
+        "batch_predict_rows_s": len(test_X) / batch_s,
+        "single_predict_p50_ms": float(np.percentile(latencies, 50)),
+        "single_predict_p95_ms": float(np.percentile(latencies, 95)),
+        "peak_rss_mb": fit_peak_mb,
+        "fit_peak_delta_mb": fit_peak_mb - baseline_mb,
+        "model_size_kb": len(pickle.dumps(model)) / 1024,
+        "accuracy": accuracy_score(test_y, preds),
+        "f1": f1_score(test_y, preds),
+    }
+
+
+def _child(config, queue):
+    try:
+        queue.put(run_once(config))
+    except Exception as exc:
+        queue.put({"error": repr(exc), **config})
+
+
+#Función para ejecutar una configuración en un proceso nuevo
+def run_isolated(config):
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_child, args=(config, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def summarize(results):
+    keys = ["library", "encoding", "threads", "size"]
+    metrics = ["matrix_mb", "fit_s", "batch_predict_rows_s", "single_predict_p50_ms", "fit_peak_delta_mb", "model_size_kb", "f1"]
+    groups = {}
+    for result in results:
+        groups.setdefault(tuple(result[k] for k in keys), []).append(result)
+    rows = {}
+    for group, runs in sorted(groups.items()):
+        ok = pd.DataFrame([r for r in runs if "error" not in r])
+        errors = [r["error"] for r in runs if "error" in r]
+        if ok.empty:
+            #Todas las repeticiones fallaron (p. ej. librería no instalada): se marca el grupo
+            row = {metric: "—" for metric in metrics}
+            row["errores"] = f"{len(errors)}/{len(runs)}: {errors[0][:60]}"
+        else:
+            #Formato "mediana ± desviación"
+            row = {metric: f"{ok[metric].median():.3g} ± {0 if len(ok) < 2 else ok[metric].std():.2g}" for metric in metrics}
+            row["errores"] = f"{len(errors)}/{len(runs)}"
+        rows[group] = row
+    table = pd.DataFrame.from_dict(rows, orient="index", columns=metrics + ["errores"])
+    if rows:
+        table.index = pd.MultiIndex.from_tuples(table.index, names=keys)
+    return table
+
+
+def run(args):
+    configs = [
+        {"library": library, "encoding": encoding, "threads": threads, "size": size, "repeat": repeat,
+         "data": args.data, "single_rows": args.single_rows}
+        for library in args.libraries
+        for encoding in args.encodings.split(",")
+        for threads in [int(t) for t in args.threads.split(",")]
+        for size in [int(s) for s in args.sizes.split(",")]
+        for repeat in range(args.repeats)
+    ]
+    results = []
+    for i, config in enumerate(configs, start=1):
+        result = run_isolated(config)
+        results.append(result)
+        status = result["error"] if "error" in result else f"fit {result['fit_s']:.2f} s"
+        print(f"[{i}/{len(configs)}] {config['library']} · {config['encoding']} · {config['threads']} hilos · x{config['size']} · rep {config['repeat']}: {status}")
+
+    with open(args.output, mode="w", encoding="utf-8") as file:
+        json.dump({
+            "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count()},
+            "results": results,
+        }, file, indent=2)
+    pd.set_option("display.width", 200)
+    print("\nResultados (mediana ± desviación):")
+    print(summarize(results))
+    print(f"\nResultados completos en {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de XGBoost, LightGBM y CatBoost sobre Adult Census")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    p_download = subparsers.add_parser("download", help="Descargar una copia local del dataset")
+    p_download.add_argument("--data", default=DATA_PATH)
+    p_run = subparsers.add_parser("run", help="Ejecutar el benchmark")
+    p_run.add_argument("--data", default=DATA_PATH)
+    p_run.add_argument("--libraries", nargs="+", choices=LIBRARIES, default=LIBRARIES)
+    p_run.add_argument("--encodings", default="dense", help=f"Codificaciones separadas por comas ({', '.join(ENCODINGS)})")
+    p_run.add_argument("--threads", default="1,4", help="Números de hilos separados por comas")
+    p_run.add_argument("--sizes", default="1,4", help="Múltiplos del conjunto de entrenamiento separados por comas")
+    p_run.add_argument("--repeats", type=int, default=3)
+    p_run.add_argument("--single-rows", type=int, default=200, help="Filas para medir la predicción fila a fila")
+    p_run.add_argument("--output", default=os.path.join(BASE_DIR, "resultados_bench.json"))
+    args = parser.parse_args()
+
+    if args.command == "download":
+        download(args.data)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,23 @@
 #Importando las librerías necesarias
+import os
+import sys
+from contextlib import nullcontext
 import streamlit as st
 import pandas as pd
-import joblib
 
-#Cargando el modelo previamente entrenado
-melb_model = joblib.load("D:\\Hacking\\Python\\AI_Learning\\Aprendizaje_Supervisado\\Melbourne_Housing\\melb_dt_model.pkl")
+#Raíz del repositorio en el path para importar las utilidades compartidas
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")))
+from utilidades.artifacts import registry, show_report, ArtifactChecksumError
+from utilidades.metrics import stage, show_panel, serve_from_env
+
+#Latencias por etapa (endpoint /metrics si AI_LEARNING_METRICS_PORT está definida)
+APP = "melb"
+serve_from_env()
+
+#El modelo se carga desde el manifiesto de artefactos la primera vez que se usa;
+#mientras tanto se calienta en segundo plano con una predicción de prueba
+artifacts = registry()
+artifacts.warm_up("melb_dt_model", lambda model: model.predict(pd.DataFrame(0, index=[0], columns=model.feature_names_in_)))
 
 #Titulo de la aplicación
 st.title("Predicción del Precio de Viviendas en Melbourne")
@@ -58,10 +71,25 @@ if st.button("Predecir Precio"):
         'PropertyCount': property_count
     }])
     
+    #Cargando el modelo previamente entrenado (solo se mide si todavía no estaba cargado)
+    try:
+        with stage(APP, "load") if not artifacts.is_loaded("melb_dt_model") else nullcontext():
+            melb_model = artifacts.get("melb_dt_model")
+    except (FileNotFoundError, ArtifactChecksumError) as exc:
+        st.error(str(exc))
+        st.stop()
+
     #Codificando las variables categóricas
-    new_data_encoded = pd.get_dummies(new_data)
-    new_data_encoded = new_data_encoded.reindex(columns=melb_model.feature_names_in_, fill_value=0)
+    with stage(APP, "preprocess"):
+        new_data_encoded = pd.get_dummies(new_data)
+        new_data_encoded = new_data_encoded.reindex(columns=melb_model.feature_names_in_, fill_value=0)
     
     #Realizando la predicción
-    prediction = melb_model.predict(new_data_encoded)
-    st.write("El precio estimado de la vivienda es de ", f"{prediction[0]:,.2f} dólares")
+    with stage(APP, "inference"):
+        prediction = melb_model.predict(new_data_encoded)
+    with stage(APP, "postprocess"):
+        st.write("El precio estimado de la vivienda es de ", f"{prediction[0]:,.2f} dólares")
+
+#Tiempos de carga del modelo
+show_report(st, ["melb_dt_model"])
+show_panel(st, APP)
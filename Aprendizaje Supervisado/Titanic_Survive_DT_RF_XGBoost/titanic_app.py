@@ -1,10 +1,23 @@
 #Importando las librerías necesarias
+import os
+import sys
+from contextlib import nullcontext
 import streamlit as st
 import pandas as pd
-import joblib
 
-#Cargando el modelo previamente entrenado
-titanic_model = joblib.load("D:\\Hacking\\Python\\AI_Learning\\Aprendizaje_Supervisado\\Titanic\\titanic_rf_model.pkl")
+#Raíz del repositorio en el path para importar las utilidades compartidas
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")))
+from utilidades.artifacts import registry, show_report, ArtifactChecksumError
+from utilidades.metrics import stage, show_panel, serve_from_env
+
+#Latencias por etapa (endpoint /metrics si AI_LEARNING_METRICS_PORT está definida)
+APP = "titanic"
+serve_from_env()
+
+#El modelo se carga desde el manifiesto de artefactos la primera vez que se usa;
+#mientras tanto se calienta en segundo plano con una predicción de prueba
+artifacts = registry()
+artifacts.warm_up("titanic_rf_model", lambda model: model.predict(pd.DataFrame(0, index=[0], columns=model.feature_names_in_)))
 
 #Titulo de la aplicación
 st.title("Predicción de Supervivencia en el Titanic")
@@ -33,10 +46,25 @@ if st.button("Predecir Supervivencia"):
         'Embarked': embarked,
     }])
     
+    #Cargando el modelo previamente entrenado (solo se mide si todavía no estaba cargado)
+    try:
+        with stage(APP, "load") if not artifacts.is_loaded("titanic_rf_model") else nullcontext():
+            titanic_model = artifacts.get("titanic_rf_model")
+    except (FileNotFoundError, ArtifactChecksumError) as exc:
+        st.error(str(exc))
+        st.stop()
+
     #Codificando las variables categóricas
-    new_passenger_encoded = pd.get_dummies(new_passenger)
-    new_passenger_encoded = new_passenger_encoded.reindex(columns=titanic_model.feature_names_in_, fill_value=0)
+    with stage(APP, "preprocess"):
+        new_passenger_encoded = pd.get_dummies(new_passenger)
+        new_passenger_encoded = new_passenger_encoded.reindex(columns=titanic_model.feature_names_in_, fill_value=0)
     
     #Realizando la predicción
-    prediction = titanic_model.predict(new_passenger_encoded)
-    st.write("Resultado de la predicción:", "Sobrevivió" if prediction[0] == 1 else "No sobrevivió")
+    with stage(APP, "inference"):
+        prediction = titanic_model.predict(new_passenger_encoded)
+    with stage(APP, "postprocess"):
+        st.write("Resultado de la predicción:", "Sobrevivió" if prediction[0] == 1 else "No sobrevivió")
+
+#Tiempos de carga del modelo
+show_report(st, ["titanic_rf_model"])
+show_panel(st, APP)
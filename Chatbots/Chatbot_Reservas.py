@@ -9,32 +9,26 @@ Entorno recomendado: "chatbot"'''
 
 # Importar librerías necesarias
 import streamlit as st
-from sentence_transformers import SentenceTransformer, util
-import spacy
+import os
 import re
 import random
+import sys
 from datetime import datetime
-
-# Inicialización de la app
-st.title("Chatbot de Reservas")
-
-# Definir función para cargar el modelo de embeddings
-@st.cache_resource
-def load_embedding_model():
-    # Usamos un modelo ligero para embeddings
-    return SentenceTransformer('all-MiniLM-L6-v2')
-
-# Cargar el modelo de embeddings
-embed_model = load_embedding_model()
-
-
-# Definir función para cargar el modelo NER de spaCy
-@st.cache_resource
-def load_ner_model():
-    return spacy.load("es_core_news_sm") # Modelo en español
-
-# Cargar el modelo NER
-ner_model = load_ner_model()
+from embedding_store import encode_intent_examples
+from onnx_encoder import load_sentence_encoder, encoder_cache_key
+from query_cache import QueryEmbeddingCache, MicroBatcher
+from transcript import BoundedHistory
+# Raíz del repositorio en el path para importar las utilidades compartidas
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utilidades.metrics import stage, show_panel, serve_from_env
+from utilidades.startup import background, show_status, request_queue, poll
+
+# Latencias por etapa (endpoint /metrics si AI_LEARNING_METRICS_PORT está definida)
+APP = "chatbot_reservas"
+serve_from_env()
+
+# Modelo de embeddings (también es la clave del almacén persistente de embeddings)
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
 
 # Definir intents y ejemplos
 intents = {
@@ -49,25 +43,59 @@ intents = {
     "pregunta_menu": ["Qué menú tienen", "Cuál es el menú del día", "Quiero ver el menú"]
 }
 
-# Precalcular embeddings de ejemplos
-examples_embeddings = {}
-# Calcular embeddings para cada intent
-for intent, examples in intents.items():
-    # Calcular embeddings de los ejemplos
-    embeddings = embed_model.encode(examples, convert_to_tensor=True)
-    # Guardar en un diccionario
-    examples_embeddings[intent] = embeddings
-    
+# Caché LRU de embeddings de consultas, compartida entre sesiones; el batcher
+# agrupa los mensajes concurrentes de varias sesiones en una sola pasada
+QUERY_CACHE_SIZE = 10000
+
+# Definir función para cargar los modelos en segundo plano: torch,
+# sentence_transformers y spaCy se importan en un hilo aparte mientras se
+# dibuja la interfaz (una sola vez por proceso)
+def load_models():
+    import spacy
+    import torch
+
+    # Usamos un modelo ligero para embeddings (PyTorch, ONNX int8 o el servicio
+    # compartido de embeddings según CHATBOT_ENCODER_BACKEND)
+    # Cada modelo tiene su propia etapa (una muestra por arranque)
+    with stage(APP, "load_embeddings"):
+        embed_model = load_sentence_encoder(EMBEDDING_MODEL_NAME)
+    query_encoder = MicroBatcher(QueryEmbeddingCache(embed_model, maxsize=QUERY_CACHE_SIZE))
+
+    # Cargar el modelo NER de spaCy
+    with stage(APP, "load_ner"):
+        ner_model = spacy.load("es_core_news_sm") # Modelo en español
+
+    # Precalcular embeddings de ejemplos
+    # Se persisten en disco (.embeddings_cache), de modo que solo se codifican
+    # los ejemplos nuevos o modificados
+    examples_embeddings = encode_intent_examples(embed_model, encoder_cache_key(EMBEDDING_MODEL_NAME, model=embed_model), intents)
+    # Convertir a tensores una sola vez para util.cos_sim
+    examples_embeddings = {intent: torch.from_numpy(e) for intent, e in examples_embeddings.items()}
+    return query_encoder, ner_model, examples_embeddings
+
+# La carga empieza antes de dibujar nada (con AI_LEARNING_FAST_STARTUP=0 termina antes)
+models = background("chatbot_reservas", load_models)
+
+# Inicialización de la app
+st.title("Chatbot de Reservas")
+show_status(st, models)
+
+
+# Historial de la conversación: los últimos mensajes en memoria y la
+# conversación completa en una transcripción en disco (transcripts/)
+HISTORY_MAX_MESSAGES = 50
 
-# Historial de la conversación
 if 'history' not in st.session_state:
-    st.session_state.history = []
+    st.session_state.history = BoundedHistory(HISTORY_MAX_MESSAGES)
+
+# Mensajes recibidos antes de que los modelos estuvieran listos
+pending = request_queue(st)
     
 
 # Función de clasificación de intents
 def predict_intent(user_input):
-    # Calcular embedding del input del usuario
-    input_embedding = embed_model.encode(user_input, convert_to_tensor=True)
+    # Calcular embedding del input del usuario (con caché y por lotes)
+    input_embedding = query_encoder.encode(user_input)
     max_sim = -1
     best_intent = None
     
@@ -109,27 +137,62 @@ def generate_response(intent, entities):
     
 # Interfaz de usuario
 chat_placeholder = st.container()
-user_input = st.text_input("Escribe tu mensaje aquí:")
 
-if user_input:
-    # Predecir intent
-    intent, sim = predict_intent(user_input)
-    
-    # Extraer entidades
-    entities = extract_entities(user_input)
-    
-    # Generar respuesta
-    bot_response = generate_response(intent, entities)
-    
-    # Actualizar el historial de la conversación
-    st.session_state.history.append({"role": "user", "content": user_input})
-    st.session_state.history.append({"role": "bot", "content": bot_response})
+# st.text_input conserva su valor entre reruns (también los de poll()): cada envío
+# incrementa un contador y vacía el campo, de modo que cada mensaje se pone en cola
+# una sola vez aunque repita el texto del anterior (p. ej. "sí" dos veces)
+def submit_message():
+    st.session_state.submission_id = st.session_state.get("submission_id", 0) + 1
+    st.session_state.submitted_text = st.session_state.user_input
+    st.session_state.user_input = ""
+
+st.text_input("Escribe tu mensaje aquí:", key="user_input", on_change=submit_message)
+
+if st.session_state.get("submission_id", 0) != st.session_state.get("queued_submission_id", 0):
+    st.session_state.queued_submission_id = st.session_state.submission_id
+    # Poner el mensaje en cola hasta que los modelos estén listos
+    if st.session_state.submitted_text:
+        pending.append(st.session_state.submitted_text)
+
+# Responder a los mensajes en cola (en orden) en cuanto los modelos están listos
+if pending and models.done:
+    try:
+        query_encoder, ner_model, examples_embeddings = models.result()
+    except Exception as exc:
+        st.error(f"No se pudieron cargar los modelos: {exc}")
+        st.stop()
+    from sentence_transformers import util  # Ya importado por el hilo de carga
+    while pending:
+        user_message = pending.popleft()
+
+        # Predecir intent
+        with stage(APP, "intent"):
+            intent, sim = predict_intent(user_message)
+
+        # Extraer entidades
+        with stage(APP, "entities"):
+            entities = extract_entities(user_message)
+
+        # Generar respuesta
+        with stage(APP, "response"):
+            bot_response = generate_response(intent, entities)
+
+        # Actualizar el historial de la conversación
+        st.session_state.history.append({"role": "user", "content": user_message})
+        st.session_state.history.append({"role": "bot", "content": bot_response})
     
 # Mostrar el historial de la conversación
 with chat_placeholder :
-    for message in st.session_state.history[-10:]: # Mostrar solo los últimos 10 mensajes
+    for message in st.session_state.history.tail(10): # Mostrar solo los últimos 10 mensajes
         if message['role'] == 'user':   
             st.markdown(f"Tú: {message['content']}")
         else:
             st.markdown(f"Chatbot: {message['content']}")
-        st.markdown("-" * 40)
\ No newline at end of file
+        st.markdown("-" * 40)
+    for message in pending:
+        st.markdown(f"Tú: {message}")
+        st.caption("En cola: se responderá en cuanto el modelo esté listo.")
+
+# Latencias por etapa (AI_LEARNING_METRICS_PANEL=1)
+show_panel(st, APP)
+poll(st, models)
@@ -1,20 +1,28 @@
 # Librerías necesarias
 import streamlit as st
-import nltk, random, os, unicodedata
+import nltk, random, os, sys, unicodedata
 from nltk.stem import SnowballStemmer
+from keyword_index import KeywordIndex, ensure_nltk_resources
+from transcript import BoundedHistory
+# Raíz del repositorio en el path para importar las utilidades compartidas
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utilidades.metrics import stage, show_panel, serve_from_env
+
+# Latencias por etapa (endpoint /metrics si AI_LEARNING_METRICS_PORT está definida)
+APP = "chatbot_faq"
+serve_from_env()
 
 # Configurar la ruta para los datos de NLTK
 nltk_data_path = os.path.join(os.getcwd(), 'nltk_data')
 
-# Crear el directorio si no existe
-os.makedirs(nltk_data_path, exist_ok=True)
-
-# Descargar recursos necesarios de NLTK en la ruta especificada
-nltk.download('punkt', download_dir=nltk_data_path)
-nltk.download('punkt_tab', download_dir=nltk_data_path)
+# Preparar los recursos de NLTK una sola vez (no en cada rerun); solo se
+# descargan si no están ya en disco
+@st.cache_resource
+def setup_nltk(data_path):
+    ensure_nltk_resources(data_path)
+    return True
 
-# Añadir la ruta a la configuración de NLTK
-nltk.data.path.append(nltk_data_path)
+setup_nltk(nltk_data_path)
 
 # Importar word_tokenize después de configurar la ruta de datos
 from nltk.tokenize import word_tokenize
@@ -75,32 +83,31 @@ intents_weights = {
     "producto": 1,
 }
 
+# Índice invertido raíz -> (intent, peso), construido una sola vez
+@st.cache_resource
+def load_keyword_index():
+    return KeywordIndex(intents, intents_weights, stemmer)
+
+keyword_index = load_keyword_index()
+
 # Variable de contexto
 if 'context' not in st.session_state:
     st.session_state.context = None
 
-# Historial de conversación
+# Historial de conversación: los últimos mensajes en memoria y la
+# conversación completa en una transcripción en disco (transcripts/)
+HISTORY_MAX_MESSAGES = 50
+
 if 'history' not in st.session_state:
-    st.session_state.history = []
+    st.session_state.history = BoundedHistory(HISTORY_MAX_MESSAGES)
 
 # Función del chatbot con contexto
 def chatbot_context(user_input):
-    # Tokenizar y stemizar la entrada del usuario
-    tokens = [stemmer.stem(t) for t in word_tokenize(user_input.lower())]
+    # Tokenizar la entrada del usuario
+    tokens = word_tokenize(user_input.lower())
 
-    # Inicializar variables para el mejor intent y la puntuación máxima
-    best_intent = None
-    max_score = 0
-    
-    # Evaluar cada intent y calcular su puntuación
-    for intent, keywords in intents.items():
-        stemmed_keywords = [stemmer.stem(k) for k in keywords]
-        matches = sum(1 for token in tokens if token in stemmed_keywords)
-        score = matches * intents_weights.get(intent, 1)
-        # Actualizar el mejor intent si la puntuación es mayor
-        if score > max_score:
-            max_score = score
-            best_intent = intent
+    # Puntuar todos los intents en una sola pasada con el índice invertido
+    best_intent, max_score = keyword_index.score(tokens)
             
     # Si no hay coincidencias, usar el contexto anterior
     if best_intent is None and st.session_state.context is not None:
@@ -129,16 +136,22 @@ user_input = st.chat_input("Escribe tu mensaje aquí:")
 
 if user_input:
     # Obtener la respuesta del chatbot
-    bot_response = chatbot_context(user_input)
+    with stage(APP, "response"):
+        bot_response = chatbot_context(user_input)
                 
     # Actualizar el historial de la conversación
     st.session_state.history.append({"role": "user", "content": user_input})
     st.session_state.history.append({"role": "bot", "content": bot_response})
     
-# Mostrar el historial de la conversación
+# Mostrar el historial de la conversación (los mensajes anteriores quedan en la transcripción)
+if st.session_state.history.spilled:
+    st.caption(f"{st.session_state.history.spilled} mensajes anteriores guardados en la transcripción de la sesión.")
 for message in st.session_state.history:
     if message['role'] == 'user':
         st.markdown(f"<div style='background-color:#DCF8C6; color:black; padding:10px; border-radius:10px; width:fit-content; margin-bottom:5px;'>Tú: {message['content']}</div>", unsafe_allow_html=True)
     else:
         st.markdown(f"<div style='background-color:#FFE5B4; color:black; padding:10px; border-radius:10px; width:fit-content; margin-bottom:5px;'>Chatbot: {message['content']}</div>", unsafe_allow_html=True)
-    st.markdown("-" * 40)
\ No newline at end of file
+    st.markdown("-" * 40)
+
+# Latencias por etapa (AI_LEARNING_METRICS_PANEL=1)
+show_panel(st, APP)
@@ -0,0 +1,225 @@
+'''Índice de disponibilidad de mesas (plazas libres por fecha y franja horaria).
+
+Se construye una vez a partir de las reservas guardadas y se actualiza al
+reservar o cancelar. Cada fecha tiene un árbol de segmentos con el máximo de
+plazas libres por franja, así que comprobar disponibilidad y buscar la
+siguiente franja libre cuestan O(log n) en lugar de recorrer las reservas.'''
+
+
+# Importar librerías necesarias
+import re
+import threading
+from datetime import datetime
+from reservation_store import CapacityError
+
+# Capacidad del restaurante (horario de 12:00 a 23:00, franjas de 30 minutos)
+SEATS_PER_SLOT = 40
+OPENING_TIME = "12:00"
+CLOSING_TIME = "23:00"
+SLOT_MINUTES = 30
+
+TIME_RE = re.compile(r'^\s*(\d{1,2})(?:[:hH](\d{2}))?\s*$')
+DATE_RE = re.compile(r'^\s*(\d{1,2})[/-](\d{1,2})(?:[/-](\d{2,4}))?\s*$')
+
+
+def _minutes(hhmm):
+    h, m = hhmm.split(":")
+    return int(h) * 60 + int(m)
+
+
+# Función para normalizar fechas a dd/mm/aaaa ("1-2-2025" -> "01/02/2025", "1/2/25" -> "01/02/2025").
+# Sin año se toma la siguiente vez que llega ese día desde `today` (hoy por defecto), de modo
+# que "10/10" y "10/10/2025" son la misma fecha para el índice y para la base de datos
+def normalize_date(date, today=None):
+    match = DATE_RE.match(str(date))
+    if not match:
+        return None
+    day, month, year = (int(g) if g else None for g in match.groups())
+    if not (1 <= day <= 31 and 1 <= month <= 12):
+        return None
+    if year is None:
+        today = today or datetime.now().date()
+        year = today.year if (month, day) >= (today.month, today.day) else today.year + 1
+    elif year < 100:
+        year += 2000
+    elif year < 1000:
+        return None
+    return f"{day:02d}/{month:02d}/{year}"
+
+
+# Función para normalizar horas ("9:30" -> "09:30", "21" -> "21:00")
+def normalize_time(time):
+    match = TIME_RE.match(str(time))
+    if not match:
+        return None
+    h, mm = int(match.group(1)), int(match.group(2) or 0)
+    if h > 23 or mm > 59:
+        return None
+    return f"{h:02d}:{mm:02d}"
+
+
+# Función para convertir el número de personas en entero
+def parse_party_size(num_personas):
+    try:
+        value = int(str(num_personas).strip())
+    except ValueError:
+        return None
+    return value if value > 0 else None
+
+
+class _DaySlots:
+    # Árbol de segmentos con el máximo de plazas libres por rango de franjas
+    def __init__(self, n_slots, capacity):
+        self.size = 1
+        while self.size < n_slots:
+            self.size *= 2
+        # Las hojas de relleno valen -1 para no ser elegidas nunca
+        self.tree = [-1] * (2 * self.size)
+        for i in range(n_slots):
+            self.tree[self.size + i] = capacity
+        for node in range(self.size - 1, 0, -1):
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def get(self, i):
+        return self.tree[self.size + i]
+
+    def add(self, i, delta):
+        node = self.size + i
+        self.tree[node] += delta
+        node //= 2
+        while node:
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+            node //= 2
+
+    def first_at_least(self, lo, seats, node=1, node_lo=0, node_hi=None):
+        # Primera franja >= lo con al menos `seats` plazas libres (o -1)
+        if node_hi is None:
+            node_hi = self.size - 1
+        if node_hi < lo or self.tree[node] < seats:
+            return -1
+        if node_lo == node_hi:
+            return node_lo
+        mid = (node_lo + node_hi) // 2
+        found = self.first_at_least(lo, seats, 2 * node, node_lo, mid)
+        if found != -1:
+            return found
+        return self.first_at_least(lo, seats, 2 * node + 1, mid + 1, node_hi)
+
+
+class AvailabilityIndex:
+    def __init__(self, seats_per_slot=SEATS_PER_SLOT, opening=OPENING_TIME, closing=CLOSING_TIME, slot_minutes=SLOT_MINUTES):
+        self.seats_per_slot = seats_per_slot
+        self.slot_minutes = slot_minutes
+        self.first_minute = _minutes(opening)
+        self.slots = [
+            f"{m // 60:02d}:{m % 60:02d}"
+            for m in range(self.first_minute, _minutes(closing), slot_minutes)
+        ]
+        self._days = {}
+        self._lock = threading.Lock()
+
+    # ----- Construcción -----
+    @classmethod
+    def from_store(cls, store, **kwargs):
+        index = cls(**kwargs)
+        for date, time, seats in store.booked_seats():
+            index._apply(date, time, -seats)
+        return index
+
+    def _slot_bounds(self, i):
+        start = self.first_minute + i * self.slot_minutes
+        end = start + self.slot_minutes
+        return f"{start // 60:02d}:{start % 60:02d}", f"{end // 60:02d}:{end % 60:02d}"
+
+    def _slot_index(self, time):
+        # Franja que contiene la hora (None si está fuera del horario)
+        time = normalize_time(time)
+        if time is None:
+            return None
+        i = (_minutes(time) - self.first_minute) // self.slot_minutes
+        return i if 0 <= i < len(self.slots) else None
+
+    def _day(self, date):
+        day = self._days.get(date)
+        if day is None:
+            day = self._days[date] = _DaySlots(len(self.slots), self.seats_per_slot)
+        return day
+
+    def _reload_day(self, store, date):
+        # Vuelve a leer de la base de datos las plazas ocupadas de una fecha (otro
+        # proceso puede haber reservado sin que este índice lo sepa); con el lock tomado
+        day = self._days[date] = _DaySlots(len(self.slots), self.seats_per_slot)
+        for _, time, seats in store.booked_seats(date=date):
+            i = self._slot_index(time)
+            if i is not None:
+                day.add(i, -seats)
+
+    def _apply(self, date, time, delta):
+        date, i = normalize_date(date), self._slot_index(time)
+        if date is None or i is None:
+            return
+        with self._lock:
+            self._day(date).add(i, delta)
+
+    # ----- Consultas -----
+    def is_open(self, time):
+        # True si la hora cae en alguna franja del horario de reservas
+        return self._slot_index(time) is not None
+
+    def remaining(self, date, time):
+        date, i = normalize_date(date), self._slot_index(time)
+        if date is None or i is None:
+            return 0
+        day = self._days.get(date)
+        return day.get(i) if day else self.seats_per_slot
+
+    def is_available(self, date, time, seats):
+        return self.remaining(date, time) >= seats
+
+    def next_free_slot(self, date, time, seats):
+        # Siguiente franja del mismo día (desde la hora pedida) con plazas suficientes
+        date = normalize_date(date)
+        if date is None or seats > self.seats_per_slot:
+            return None
+        i = self._slot_index(time)
+        if i is None:
+            # Antes de la apertura se busca desde la primera franja
+            t = normalize_time(time)
+            if t is None or _minutes(t) >= self.first_minute:
+                return None
+            i = 0
+        day = self._days.get(date)
+        if day is None:
+            return self.slots[i]
+        found = day.first_at_least(i, seats)
+        return self.slots[found] if found != -1 else None
+
+    # ----- Reservar / cancelar -----
+    def book(self, store, reservation):
+        # Comprueba la capacidad y guarda la reserva de forma atómica
+        seats = parse_party_size(reservation['num_personas'])
+        date, i = normalize_date(reservation['date']), self._slot_index(reservation['time'])
+        if seats is None or date is None or i is None:
+            raise CapacityError("Reserva fuera del horario o con datos no válidos")
+        # Se guardan fecha y hora normalizadas para que coincidan con el índice
+        reservation = {**reservation, "num_personas": seats, "date": date, "time": normalize_time(reservation['time'])}
+        with self._lock:
+            day = self._day(date)
+            if day.get(i) < seats:
+                raise CapacityError(f"Quedan {day.get(i)} plazas el {date} a las {self.slots[i]}")
+            # La base de datos vuelve a comprobar la capacidad dentro de la transacción
+            # (por si otro proceso ha reservado en la misma franja)
+            slot_start, slot_end = self._slot_bounds(i)
+            try:
+                reservation['id'] = store.add(reservation, capacity=(slot_start, slot_end, self.seats_per_slot))
+            except CapacityError:
+                # El índice estaba desactualizado: se sincroniza ese día antes de sugerir otra hora
+                self._reload_day(store, date)
+                raise
+            day.add(i, -seats)
+        return reservation
+
+    def release(self, reservation):
+        seats = parse_party_size(reservation['num_personas'])
+        if seats:
+            self._apply(reservation['date'], reservation['time'], seats)
@@ -0,0 +1,602 @@
+'''Benchmarks de los chatbots de reservas (sin Streamlit).
+
+Uso:
+    python bench_chatbots.py embeddings [--repeats 5]
+    python bench_chatbots.py queries [--log mensajes.txt] [--sessions 8]
+    python bench_chatbots.py ner [--repeats 20]
+    python bench_chatbots.py store [--rows 1000000]
+    python bench_chatbots.py availability [--threads 32] [--bookings 20000]
+    python bench_chatbots.py faq [--sizes 6,100,1000,5000]
+    python bench_chatbots.py history [--messages 10000]
+
+Entorno recomendado: "chatbot"'''
+
+
+# Importar librerías necesarias
+import argparse
+import csv
+import os
+import random
+import re
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Intents de ejemplo (los mismos que Chatbot_Reservas_Mejorado.py)
+INTENTS = {
+    "saludo": ["hola", "buenas", "buenos días", "buenas tardes", "buenas noches", "¿qué tal?"],
+    "despedida": ["adiós", "hasta luego", "nos vemos", "chao", "bye"],
+    "reservar_mesa": [
+        "Quiero reservar una mesa",
+        "Reservar para 2 personas mañana por la noche",
+        "Necesito una mesa para 4 personas a las 20:00",
+        "Me gustaría reservar una mesa el sábado a las 21",
+        "Reserva para 3 el 10/10 a las 19:30"
+    ],
+    "cancelar_reserva": ["Quiero cancelar mi reserva", "Cancelar mesa", "Anular reserva", "No podré ir a la reserva"],
+    "pregunta_menu": ["¿Qué menú tienen?", "Mostrar menú", "¿Cuál es el menú del día?", "¿Tienen opciones vegetarianas?"],
+    "pregunta_horario": ["¿Cuál es el horario?", "¿A qué hora abren?", "Horario de atención"],
+    "confirmacion": ["sí", "si", "claro", "perfecto", "confirmar"],
+    "negacion": ["no", "nop", "no gracias", "ahora no"]
+}
+
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+
+# Función auxiliar para medir tiempos (en milisegundos)
+def timed(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def report(name, times):
+    print(f"{name:<40} media={statistics.mean(times):9.2f} ms  min={min(times):9.2f} ms  n={len(times)}")
+
+
+# ----- Embeddings de los ejemplos de intents -----
+def bench_embeddings(args):
+    from sentence_transformers import SentenceTransformer
+    from embedding_store import encode_intent_examples
+
+    # Carga del modelo (común a todos los escenarios)
+    start = time.perf_counter()
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    print(f"Carga del modelo: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    # Antes: el bucle de encode se ejecuta en cada rerun
+    def encode_all():
+        return {intent: model.encode(examples, convert_to_tensor=True) for intent, examples in INTENTS.items()}
+    report("antes: encode por rerun", timed(encode_all, args.repeats))
+
+    cache_dir = tempfile.mkdtemp(prefix="embeddings_cache_")
+    try:
+        # Arranque en frío: almacén vacío, se codifica todo y se persiste
+        def cold_start():
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            encode_intent_examples(model, EMBEDDING_MODEL_NAME, INTENTS, cache_dir=cache_dir)
+        report("después: arranque en frío (almacén vacío)", timed(cold_start, args.repeats))
+
+        # Arranque en caliente: otro proceso con el almacén ya en disco (mmap)
+        def warm_start():
+            encode_intent_examples(model, EMBEDDING_MODEL_NAME, INTENTS, cache_dir=cache_dir)
+        report("después: arranque con almacén en disco", timed(warm_start, args.repeats))
+
+        # Un ejemplo nuevo: solo se codifica ese texto
+        def one_new_example():
+            intents = dict(INTENTS)
+            intents["saludo"] = INTENTS["saludo"] + [f"hola {time.perf_counter_ns()}"]
+            encode_intent_examples(model, EMBEDDING_MODEL_NAME, intents, cache_dir=cache_dir)
+        report("después: almacén con 1 ejemplo nuevo", timed(one_new_example, args.repeats))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    # Con st.cache_resource, un rerun no vuelve a llamar a la función (≈0 ms)
+
+
+# ----- Caché de consultas y codificación por lotes -----
+
+# Mensajes típicos para generar un log sintético si no se pasa uno
+SAMPLE_MESSAGES = [
+    "hola", "sí", "si", "no", "cancelar mesa", "gracias", "adiós", "buenas",
+    "Quiero reservar una mesa", "para 2 personas", "mañana a las 21:00",
+    "¿Qué menú tienen?", "¿A qué hora abren?", "Reserva para 4 el 12/10 a las 20:30",
+]
+
+
+# Función para leer el log de mensajes (uno por línea) o generar uno sintético
+def load_message_log(path, size, seed=42):
+    if path:
+        with open(path, mode="r", encoding="utf-8") as file:
+            return [line.strip() for line in file if line.strip()]
+    rng = random.Random(seed)
+    # Distribución tipo Zipf: unos pocos mensajes muy repetidos y una cola larga de únicos
+    weights = [1 / (i + 1) for i in range(len(SAMPLE_MESSAGES))]
+    messages = []
+    for i in range(size):
+        if rng.random() < 0.15:
+            messages.append(f"reserva para {rng.randint(1, 12)} personas el {rng.randint(1, 28)}/{rng.randint(1, 12)} a las {rng.randint(12, 23)}:{rng.choice(['00', '30'])} #{i}")
+        else:
+            messages.append(rng.choices(SAMPLE_MESSAGES, weights=weights)[0])
+    return messages
+
+
+def bench_queries(args):
+    from sentence_transformers import SentenceTransformer
+    from query_cache import QueryEmbeddingCache, MicroBatcher
+
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    messages = load_message_log(args.log, args.size)
+    print(f"Mensajes en el log: {len(messages)} ({len(set(messages))} distintos)")
+
+    def throughput(name, fn):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<40} {len(messages) / elapsed:10.1f} msg/s  ({elapsed:.2f} s)")
+
+    # Antes: un encode por mensaje
+    throughput("antes: encode por mensaje", lambda: [model.encode(m, convert_to_tensor=True) for m in messages])
+
+    # Caché LRU, una sesión
+    cache = QueryEmbeddingCache(model, maxsize=args.cache_size)
+    throughput("caché LRU (1 sesión)", lambda: [cache.encode(m) for m in messages])
+    print(f"  {cache.stats()}")
+
+    # Caché LRU + lotes entre sesiones concurrentes
+    cache = QueryEmbeddingCache(model, maxsize=args.cache_size)
+    batcher = MicroBatcher(cache, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        throughput(f"caché LRU + lotes ({args.sessions} sesiones)", lambda: list(pool.map(batcher.encode, messages)))
+    print(f"  {cache.stats()}")
+    print(f"  {batcher.stats()}")
+
+
+# ----- Extracción de entidades (NER + regex) -----
+
+# Corpus de frases de reserva para la comprobación de equivalencia
+BOOKING_PHRASES = [
+    "Quiero reservar una mesa",
+    "Reservar para 2 personas mañana por la noche",
+    "Necesito una mesa para 4 personas a las 20:00",
+    "Me gustaría reservar una mesa el sábado a las 21",
+    "Reserva para 3 el 10/10 a las 19:30",
+    "Somos 6, el 24-12 a las 22h",
+    "para 2",
+    "a las 9:30",
+    "el 15/08/2025",
+    "Mesa para 8 pax el 01/01 a las 14:00",
+    "Hola, soy Ana García y quiero reservar en Madrid para 5 personas",
+    "Quiero cancelar mi reserva del 12/10",
+    "Reserva a nombre de Pedro Sánchez el viernes",
+    "¿Tienen mesa para 10 personas el 3-11 a las 21h30?",
+    "Mañana a las 13",
+    "Para cuatro personas el domingo",
+    "Reservar en el restaurante de Barcelona para 2 el 20/10 a las 20",
+    "No podré ir a la reserva del 5/5",
+    "sí",
+    "adiós",
+]
+
+
+# Versión anterior (Chatbot_Reservas_Mejorado.py antes de entity_extraction.py),
+# copiada tal cual: pipeline completo de spaCy en cada mensaje + regex sin anclar.
+# El bucle de spaCy solo concatena etiquetas ya presentes, así que en la práctica no
+# añade ninguna entidad; con nlp=None se omite
+def legacy_extract_entities(nlp, user_input):
+    entities = {}
+    if nlp is not None:
+        doc = nlp(user_input)
+        # SpaCy NER (LABEL -> text)
+        for ent in doc.ents:
+            # Guardar varios valores posibles (si hay varios de la misma etiqueta)
+            if ent.label_ in entities:
+                if isinstance(entities[ent.label_], list):
+                    entities[ent.label_] += f" | {ent.text}"
+                else:
+                    entities[ent.label_] = ent.text
+
+    # Regex para extraer el número de personas (ej: "para 2 personas", "mesa para 4", etc.)
+    match = re.search(r'\b(?:para\s+)?(\d{1,2})\s*(?:personas|pers|pax)?\b', user_input, flags=re.IGNORECASE)
+    if match:
+        entities['NUM_PERSONAS'] = match.group(1)
+
+    # Regex para horas HH:MM o H:MM o H (ej: 20:00, 9:30, 21)
+    match_time = re.search(r'\b([01]?\d|2[0-3])[:hH]?([0-5]\d)?\b', user_input)
+    if match_time:
+        h = match_time.group(1)
+        mm = match_time.group(2) if match_time.group(2) else "00"
+        entities['TIME'] = f"{h}:{mm}"
+
+    # Regex para fechas (formato dd/mm, dd-mm)
+    match_date = re.search(r'\b(\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?)\b', user_input)
+    if match_date:
+        entities['DATE'] = match_date.group(1)
+    return entities
+
+
+# Slots de la versión anterior (start_reservation_flow: CARDINAL como respaldo del número de personas)
+def legacy_resolve_slots(entities):
+    return {
+        "num_personas": entities.get("NUM_PERSONAS") or entities.get("CARDINAL"),
+        "date": entities.get("DATE"),
+        "time": entities.get("TIME"),
+    }
+
+
+# Resolución de slots a partir de las entidades (como en start_reservation_flow)
+def resolve_slots(entities):
+    from entity_extraction import SLOT_ENTITIES
+    return {slot: next((entities[l] for l in labels if entities.get(l)), None) for slot, labels in SLOT_ENTITIES.items()}
+
+
+# Cambios intencionados respecto a la versión anterior: frase -> {slot: (antes, ahora)}
+#   - un número suelto ya no es una hora (solo "a las H", "HH:MM", "21h30", "22h")
+#   - la hora de "a las 20:00" ya no se toma del número de personas que va antes
+#   - un número que forma parte de una hora o de una fecha no es el número de personas
+INTENDED_SLOT_CHANGES = {
+    "Reservar para 2 personas mañana por la noche": {"time": ("2:00", None)},
+    "Necesito una mesa para 4 personas a las 20:00": {"time": ("4:00", "20:00")},
+    "Me gustaría reservar una mesa el sábado a las 21": {"num_personas": ("21", None)},
+    "Reserva para 3 el 10/10 a las 19:30": {"time": ("3:00", "19:30")},
+    "Somos 6, el 24-12 a las 22h": {"time": ("6:00", "22:00")},
+    "para 2": {"time": ("2:00", None)},
+    "a las 9:30": {"num_personas": ("9", None)},
+    "el 15/08/2025": {"num_personas": ("15", None), "time": ("15:00", None)},
+    "Mesa para 8 pax el 01/01 a las 14:00": {"time": ("8:00", "14:00")},
+    "Hola, soy Ana García y quiero reservar en Madrid para 5 personas": {"time": ("5:00", None)},
+    "Quiero cancelar mi reserva del 12/10": {"num_personas": ("12", None), "time": ("12:00", None)},
+    "¿Tienen mesa para 10 personas el 3-11 a las 21h30?": {"time": ("10:00", "21:30")},
+    "Mañana a las 13": {"num_personas": ("13", None)},
+    "Reservar en el restaurante de Barcelona para 2 el 20/10 a las 20": {"time": ("2:00", "20:00")},
+    "No podré ir a la reserva del 5/5": {"num_personas": ("5", None), "time": ("5:00", None)},
+}
+
+
+# Comprobación de equivalencia entre la extracción anterior y la nueva
+# Devuelve (frase, detalle) para cada diferencia que no esté en INTENDED_SLOT_CHANGES
+# (o que esté listada y ya no se produzca); lista vacía si son equivalentes.
+# Los slots se comprueban siempre; el pipeline reducido frente al completo, solo si
+# se pasan los dos modelos de spaCy
+def ner_mismatches(full_nlp=None, lean_nlp=None, phrases=BOOKING_PHRASES):
+    from entity_extraction import extract_entities, extract_entities_batch, spacy_entities, SLOT_ENTITIES
+
+    slots = tuple(SLOT_ENTITIES)
+    mismatches = []
+    batch_results = extract_entities_batch(lean_nlp, phrases, needed=slots)
+    for phrase, batch_ents in zip(phrases, batch_results):
+        legacy = legacy_resolve_slots(legacy_extract_entities(full_nlp, phrase))
+        expected = dict(legacy)
+        for slot, (before, after) in INTENDED_SLOT_CHANGES.get(phrase, {}).items():
+            if legacy[slot] != before:
+                mismatches.append((phrase, f"{slot}: antes {legacy[slot]!r}, se esperaba {before!r}"))
+            expected[slot] = after
+        # Slot filling (solo regex), mensaje a mensaje y por lotes
+        for name, got in (("slots", resolve_slots(extract_entities(lean_nlp, phrase, needed=slots))),
+                          ("lotes", resolve_slots(batch_ents))):
+            if got != expected:
+                mismatches.append((phrase, f"{name}: {got} != {expected}"))
+        # El pipeline reducido debe dar las mismas entidades de spaCy que el completo
+        if full_nlp is not None and lean_nlp is not None:
+            full_ents, lean_ents = spacy_entities(full_nlp(phrase)), spacy_entities(lean_nlp(phrase))
+            if full_ents != lean_ents:
+                mismatches.append((phrase, f"spaCy: {lean_ents} != {full_ents}"))
+    return mismatches
+
+
+def bench_ner(args):
+    from entity_extraction import load_ner_pipeline, extract_entities, extract_entities_batch, SLOT_ENTITIES
+
+    full_nlp = load_ner_pipeline(lean=False)
+    lean_nlp = load_ner_pipeline(lean=True)
+    print(f"Pipeline completo: {full_nlp.pipe_names}")
+    print(f"Pipeline reducido: {lean_nlp.pipe_names}")
+    slots = tuple(SLOT_ENTITIES)
+
+    # Comprobación de equivalencia
+    mismatches = ner_mismatches(full_nlp, lean_nlp)
+    for phrase, detail in mismatches:
+        print(f"  DIFERENCIA: {phrase!r} -> {detail}")
+    different = len({phrase for phrase, _ in mismatches})
+    print(f"Equivalencia: {len(BOOKING_PHRASES) - different}/{len(BOOKING_PHRASES)} frases idénticas "
+          f"(salvo {len(INTENDED_SLOT_CHANGES)} cambios intencionados)")
+
+    # Latencia por mensaje
+    def per_message(fn):
+        times = timed(lambda: [fn(p) for p in BOOKING_PHRASES], args.repeats)
+        return [t / len(BOOKING_PHRASES) for t in times]
+    report("antes: pipeline completo + regex", per_message(lambda p: legacy_extract_entities(full_nlp, p)))
+    report("pipeline reducido (siempre spaCy)", per_message(lambda p: extract_entities(lean_nlp, p)))
+    report("solo regex (slot filling)", per_message(lambda p: extract_entities(lean_nlp, p, needed=slots)))
+    times = timed(lambda: extract_entities_batch(lean_nlp, BOOKING_PHRASES), args.repeats)
+    report("nlp.pipe por lotes (siempre spaCy)", [t / len(BOOKING_PHRASES) for t in times])
+    if mismatches:
+        raise SystemExit(1)
+
+
+# ----- Almacén de reservas: CSV frente a SQLite -----
+
+# Versión anterior: append al CSV y lectura completa al iniciar cada sesión
+def legacy_save_csv(csv_file, reservation):
+    file_exists = os.path.isfile(csv_file)
+    with open(csv_file, mode='a', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        if not file_exists:
+            writer.writerow(["num_personas", "date", "time", "created_at"])
+        writer.writerow([reservation['num_personas'], reservation['date'], reservation['time'], reservation['created_at']])
+
+
+def legacy_load_csv(csv_file):
+    reservations = []
+    with open(csv_file, mode='r', newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            row['num_personas'] = int(row['num_personas'])
+            reservations.append(row)
+    return reservations
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def report_latencies(name, times):
+    print(f"{name:<40} p50={percentile(times, 50):8.3f} ms  p95={percentile(times, 95):8.3f} ms  p99={percentile(times, 99):8.3f} ms")
+
+
+# Generador de reservas sintéticas
+def synthetic_reservations(n, seed=42):
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield (rng.randint(1, 12), f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}",
+               f"{rng.randint(12, 23)}:{rng.choice(['00', '30'])}", "2025-01-01T00:00:00")
+
+
+def bench_store(args):
+    from reservation_store import ReservationStore
+
+    workdir = tempfile.mkdtemp(prefix="reservas_bench_")
+    try:
+        csv_file = os.path.join(workdir, "reservas.csv")
+        db_file = os.path.join(workdir, "reservas.db")
+        print(f"Generando {args.rows} reservas...")
+        with open(csv_file, mode='w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(["num_personas", "date", "time", "created_at"])
+            writer.writerows(synthetic_reservations(args.rows))
+        store = ReservationStore(db_file)
+        store.import_csv(csv_file)
+        store.close()
+
+        # Fecha ya normalizada (dd/mm/aaaa), como la guardan AvailabilityIndex.book e import_csv
+        new_reservation = {"num_personas": 2, "date": "10/10/2025", "time": "20:00", "created_at": "2025-01-01T00:00:00"}
+
+        # Antes: inicio de sesión = leer todo el CSV; reserva = append
+        report("antes: inicio de sesión (CSV completo)", timed(lambda: legacy_load_csv(csv_file), args.repeats))
+        report_latencies("antes: reserva (append CSV)", timed(lambda: legacy_save_csv(csv_file, new_reservation), args.bookings))
+
+        # Después: inicio de sesión = abrir el almacén y leer la primera página
+        def session_start():
+            s = ReservationStore(db_file)
+            s.list_reservations(limit=20)
+            s.close()
+        report("después: inicio de sesión (SQLite)", timed(session_start, args.repeats))
+        store = ReservationStore(db_file)
+        report_latencies("después: reserva (INSERT)", timed(lambda: store.add(new_reservation), args.bookings))
+        report_latencies("después: consulta por fecha/hora", timed(lambda: store.list_reservations(date="10/10/2025", time="20:00"), args.bookings))
+        ids = [store.add(new_reservation) for _ in range(args.bookings)]
+        report_latencies("después: cancelación", timed(lambda: store.cancel(ids.pop()), args.bookings))
+        store.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# ----- Índice de disponibilidad: carga con reservas concurrentes -----
+def bench_availability(args):
+    from reservation_store import ReservationStore, CapacityError
+    from availability import AvailabilityIndex
+
+    workdir = tempfile.mkdtemp(prefix="disponibilidad_bench_")
+    try:
+        store = ReservationStore(os.path.join(workdir, "reservas.db"))
+        index = AvailabilityIndex.from_store(store)
+        dates = [f"{d:02d}/10" for d in range(1, args.days + 1)]
+        rng = random.Random(42)
+        requests = [
+            {"num_personas": rng.randint(1, 8), "date": rng.choice(dates),
+             "time": rng.choice(index.slots), "created_at": "2025-01-01T00:00:00"}
+            for _ in range(args.bookings)
+        ]
+
+        # Muchas reservas concurrentes contra el mismo índice y la misma base de datos
+        def book(reservation):
+            try:
+                index.book(store, reservation)
+                return True
+            except CapacityError:
+                return False
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            results = list(pool.map(book, requests))
+        elapsed = time.perf_counter() - start
+        print(f"Reservas: {sum(results)} aceptadas, {len(results) - sum(results)} rechazadas "
+              f"en {elapsed:.2f} s ({len(results) / elapsed:.1f} reservas/s, {args.threads} hilos)")
+
+        # Ninguna franja por encima de la capacidad en la base de datos
+        rebuilt = AvailabilityIndex.from_store(store)
+        oversold = [
+            (d, t) for d in dates for t in index.slots
+            if rebuilt.remaining(d, t) < 0
+        ]
+        print(f"Franjas con exceso de reservas: {len(oversold)}")
+        # El índice en memoria coincide con el reconstruido tras un reinicio
+        mismatched = [
+            (d, t) for d in dates for t in index.slots
+            if rebuilt.remaining(d, t) != index.remaining(d, t)
+        ]
+        print(f"Franjas distintas entre el índice y la base de datos: {len(mismatched)}")
+
+        # Latencia de las consultas
+        queries = [(rng.choice(dates), rng.choice(index.slots), rng.randint(1, 8)) for _ in range(args.queries)]
+        report_latencies("comprobar disponibilidad", timed(lambda: [index.is_available(*q) for q in queries], 5))
+        report_latencies("siguiente franja libre", timed(lambda: [index.next_free_slot(*q) for q in queries], 5))
+        print(f"  (tiempos para {args.queries} consultas)")
+        store.close()
+        if oversold or mismatched:
+            raise SystemExit(1)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# ----- Chatbot FAQ: puntuación por intents frente a índice invertido -----
+
+# Versión anterior: stemiza las keywords de todos los intents en cada mensaje
+def legacy_faq_score(stemmer, intents, weights, tokens):
+    tokens = [stemmer.stem(t) for t in tokens]
+    best_intent, max_score = None, 0
+    for intent, keywords in intents.items():
+        stemmed_keywords = [stemmer.stem(k) for k in keywords]
+        matches = sum(1 for token in tokens if token in stemmed_keywords)
+        score = matches * weights.get(intent, 1)
+        if score > max_score:
+            max_score = score
+            best_intent = intent
+    return best_intent, max_score
+
+
+def bench_faq(args):
+    from nltk.stem import SnowballStemmer
+    from keyword_index import KeywordIndex
+
+    stemmer = SnowballStemmer('spanish')
+    rng = random.Random(42)
+    base_words = ["horario", "envío", "entrega", "teléfono", "móvil", "portátil", "cargador", "ayuda",
+                  "duda", "pregunta", "abierto", "cierra", "reparto", "llegada", "hola", "adios"]
+    messages = [
+        " ".join(rng.choice(base_words + ["quiero", "saber", "el", "de", "mi", "pedido"]) for _ in range(rng.randint(3, 12)))
+        for _ in range(args.messages)
+    ]
+    # Los mensajes se tokenizan con split() para medir solo la puntuación
+    tokenized = [m.lower().split() for m in messages]
+
+    for size in (int(n) for n in args.sizes.split(",")):
+        # Intents sintéticos: las palabras base repartidas más keywords únicas
+        intents = {
+            f"intent_{i}": [base_words[i % len(base_words)]] + [f"clave{i}x{j}" for j in range(args.keywords - 1)]
+            for i in range(size)
+        }
+        weights = {intent: rng.choice([0.5, 1]) for intent in intents}
+        start = time.perf_counter()
+        index = KeywordIndex(intents, weights, stemmer)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        # Comprobación de equivalencia con la versión anterior
+        sample = tokenized[:200]
+        assert [index.score(t) for t in sample] == [legacy_faq_score(stemmer, intents, weights, t) for t in sample]
+
+        new = timed(lambda: [index.score(t) for t in tokenized], 3)
+        legacy_n = min(len(tokenized), max(10, 20000 // size))
+        old = timed(lambda: [legacy_faq_score(stemmer, intents, weights, t) for t in tokenized[:legacy_n]], 1)
+        print(f"{size:>6} intents x {args.keywords} keywords: índice construido en {build_ms:8.1f} ms | "
+              f"antes {old[0] / legacy_n * 1000:10.1f} us/msg | después {min(new) / len(tokenized) * 1000:7.1f} us/msg")
+
+
+# ----- Historial: lista sin límite frente a buffer circular + transcripción -----
+def bench_history(args):
+    import tracemalloc
+    from transcript import BoundedHistory
+
+    def message(i):
+        if i % 2 == 0:
+            return {"role": "user", "content": f"quiero reservar para {i % 12 + 1} personas el 10/10 a las 20:00", "timestamp": "2025-01-01T00:00:00"}
+        return {"role": "bot", "content": "¡Reserva confirmada para 2 personas el 10/10 a las 20:00! ¿Necesitas algo más?",
+                "meta": {"intent": "reservar_mesa", "sim": 0.812, "entities": {"NUM_PERSONAS": "2", "DATE": "10/10", "TIME": "20:00"}}}
+
+    # Render de un rerun: los chatbots de reservas muestran los últimos 16, el FAQ todo el historial
+    def render(messages):
+        return sum(len(m["content"]) for m in messages)
+
+    workdir = tempfile.mkdtemp(prefix="historial_bench_")
+    try:
+        for name, factory, tail in (
+            ("antes: lista", lambda: [], lambda h: h[-16:]),
+            ("después: BoundedHistory", lambda: BoundedHistory(args.max_messages, transcripts_dir=workdir), lambda h: h.tail(16)),
+        ):
+            tracemalloc.start()
+            history = factory()
+            start = time.perf_counter()
+            for i in range(args.messages):
+                history.append(message(i))
+            append_ms = (time.perf_counter() - start) * 1000
+            memory_kb = tracemalloc.get_traced_memory()[0] / 1024
+            tracemalloc.stop()
+            rerun_tail = timed(lambda: render(tail(history)), 50)
+            rerun_all = timed(lambda: render(history), 50)
+            print(f"{name:<26} memoria={memory_kb:9.1f} KB  append total={append_ms:8.1f} ms  "
+                  f"rerun (últimos 16)={statistics.mean(rerun_tail):.4f} ms  rerun (historial en memoria)={statistics.mean(rerun_all):.3f} ms")
+            if isinstance(history, BoundedHistory):
+                size_kb = os.path.getsize(history.transcript_path) / 1024
+                start = time.perf_counter()
+                count = sum(1 for _ in history.iter_all())
+                print(f"  transcripción: {size_kb:.1f} KB en disco, lectura perezosa de {count} mensajes en {(time.perf_counter() - start) * 1000:.1f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de los chatbots de reservas")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p_emb = subparsers.add_parser("embeddings", help="Arranque y rerun con/sin almacén de embeddings")
+    p_emb.add_argument("--repeats", type=int, default=5)
+    p_emb.set_defaults(func=bench_embeddings)
+
+    p_q = subparsers.add_parser("queries", help="Throughput de la caché de consultas sobre un log de mensajes")
+    p_q.add_argument("--log", help="Fichero con un mensaje por línea (por defecto, log sintético)")
+    p_q.add_argument("--size", type=int, default=5000, help="Tamaño del log sintético")
+    p_q.add_argument("--sessions", type=int, default=8)
+    p_q.add_argument("--cache-size", type=int, default=10000)
+    p_q.add_argument("--max-batch", type=int, default=32)
+    p_q.add_argument("--max-wait-ms", type=float, default=5.0)
+    p_q.set_defaults(func=bench_queries)
+
+    p_ner = subparsers.add_parser("ner", help="Latencia y equivalencia de la extracción de entidades")
+    p_ner.add_argument("--repeats", type=int, default=20)
+    p_ner.set_defaults(func=bench_ner)
+
+    p_store = subparsers.add_parser("store", help="Inicio de sesión y latencia de reserva: CSV frente a SQLite")
+    p_store.add_argument("--rows", type=int, default=1000000)
+    p_store.add_argument("--repeats", type=int, default=3)
+    p_store.add_argument("--bookings", type=int, default=500)
+    p_store.set_defaults(func=bench_store)
+
+    p_av = subparsers.add_parser("availability", help="Carga con reservas concurrentes sobre el índice de disponibilidad")
+    p_av.add_argument("--threads", type=int, default=32)
+    p_av.add_argument("--bookings", type=int, default=20000)
+    p_av.add_argument("--days", type=int, default=14)
+    p_av.add_argument("--queries", type=int, default=10000)
+    p_av.set_defaults(func=bench_availability)
+
+    p_faq = subparsers.add_parser("faq", help="Latencia por mensaje del chatbot FAQ según el número de intents")
+    p_faq.add_argument("--sizes", default="6,100,1000,5000")
+    p_faq.add_argument("--keywords", type=int, default=10)
+    p_faq.add_argument("--messages", type=int, default=2000)
+    p_faq.set_defaults(func=bench_faq)
+
+    p_hist = subparsers.add_parser("history", help="Memoria y tiempo de rerun del historial tras muchos mensajes")
+    p_hist.add_argument("--messages", type=int, default=10000)
+    p_hist.add_argument("--max-messages", type=int, default=50)
+    p_hist.set_defaults(func=bench_history)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+'''Servidor local (HTTP + WebSocket) del chatbot de reservas.
+
+Expone el motor de diálogo (dialogue_engine.py) por sesiones:
+    POST /sessions/{session_id}/messages   {"text": "..."} -> {"response": ..., "meta": ...}
+    GET  /ws?session_id=...                 WebSocket: cada mensaje de texto recibe su respuesta
+    GET  /health
+    GET  /metrics[?format=json]            Latencias por etapa (Prometheus o JSON)
+
+El bucle asyncio solo gestiona la red; las llamadas a los modelos se ejecutan
+en un pool de hilos. Los mensajes de una misma sesión se procesan en orden.
+
+Uso:
+    python chatbot_server.py --port 8080 --workers 8 [--sessions sqlite]
+
+Entorno recomendado: "chatbot"'''
+
+
+# Importar librerías necesarias
+import argparse
+import asyncio
+import os
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web, WSMsgType
+from reservation_store import ReservationStore
+from availability import AvailabilityIndex
+from dialogue_engine import DialogueEngine, NLPModels, SessionDialogue, InMemorySessionStore, SQLiteSessionStore
+from utilidades.metrics import snapshot, to_prometheus
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class ChatbotServer:
+    def __init__(self, dialogue, workers=8):
+        self.dialogue = dialogue
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dialogue")
+        # Un lock por sesión activa para mantener el orden de sus mensajes
+        self._session_locks = weakref.WeakValueDictionary()
+        self.messages = 0
+        self.started_at = time.monotonic()
+
+    def _lock_for(self, session_id):
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            lock = self._session_locks[session_id] = asyncio.Lock()
+        return lock
+
+    async def handle_message(self, session_id, text):
+        lock = self._lock_for(session_id)
+        async with lock:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.pool, self.dialogue.handle, session_id, text)
+        self.messages += 1
+        return result
+
+    # ----- Rutas -----
+    async def post_message(self, request):
+        try:
+            payload = await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(text="JSON no válido")
+        text = (payload.get("text") or "").strip()
+        if not text:
+            raise web.HTTPBadRequest(text="Falta el campo 'text'")
+        return web.json_response(await self.handle_message(request.match_info["session_id"], text))
+
+    async def websocket(self, request):
+        session_id = request.query.get("session_id")
+        if not session_id:
+            raise web.HTTPBadRequest(text="Falta el parámetro 'session_id'")
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        async for msg in ws:
+            if msg.type == WSMsgType.TEXT and msg.data.strip():
+                await ws.send_json(await self.handle_message(session_id, msg.data.strip()))
+            elif msg.type == WSMsgType.ERROR:
+                break
+        return ws
+
+    async def health(self, request):
+        uptime = time.monotonic() - self.started_at
+        return web.json_response({"status": "ok", "messages": self.messages, "uptime_s": round(uptime, 1)})
+
+    async def metrics(self, request):
+        if request.query.get("format") == "json":
+            return web.json_response(snapshot())
+        return web.Response(text=to_prometheus(), content_type="text/plain", charset="utf-8")
+
+    def app(self):
+        app = web.Application()
+        app.add_routes([
+            web.post("/sessions/{session_id}/messages", self.post_message),
+            web.get("/ws", self.websocket),
+            web.get("/health", self.health),
+            web.get("/metrics", self.metrics),
+        ])
+        app.on_cleanup.append(self._shutdown)
+        return app
+
+    async def _shutdown(self, app):
+        self.pool.shutdown(wait=False)
+
+
+# Función para construir el motor con todos sus recursos
+def build_dialogue(sessions="memory", db_file=os.path.join(BASE_DIR, "reservas.db")):
+    store = ReservationStore(db_file)
+    store.import_csv(os.path.join(BASE_DIR, "reservas.csv"))
+    engine = DialogueEngine(NLPModels.load(), store, AvailabilityIndex.from_store(store))
+    if sessions == "sqlite":
+        session_store = SQLiteSessionStore(os.path.join(BASE_DIR, "sesiones.db"))
+    else:
+        session_store = InMemorySessionStore()
+    return SessionDialogue(engine, session_store)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local del chatbot de reservas")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=8, help="Hilos para las llamadas a los modelos")
+    parser.add_argument("--sessions", choices=["memory", "sqlite"], default="memory", help="Almacén de sesiones")
+    args = parser.parse_args()
+
+    server = ChatbotServer(build_dialogue(args.sessions), workers=args.workers)
+    web.run_app(server.app(), host=args.host, port=args.port, backlog=4096)
+
+
+if __name__ == "__main__":
+    main()
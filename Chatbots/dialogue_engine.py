@@ -0,0 +1,357 @@
+'''Motor de diálogo del chatbot de reservas, independiente de Streamlit.
+
+Contiene la clasificación de intents, la extracción de entidades, el slot
+filling y la generación de respuestas. El estado de cada conversación es un
+diccionario serializable ({"pending_action": ..., "reservations": [...]}) que
+se guarda en un almacén de sesiones intercambiable (memoria o SQLite), de modo
+que el mismo motor sirve para la app de Streamlit y para chatbot_server.py.
+
+Entorno recomendado: "chatbot"'''
+
+
+# Importar librerías necesarias
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from reservation_store import CapacityError
+from availability import normalize_date, normalize_time, parse_party_size
+from entity_extraction import extract_entities as extract_entities_with, SLOT_ENTITIES
+
+# Raíz del repositorio en el path para importar las utilidades compartidas
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utilidades.metrics import stage
+
+# Nombre de la app en las métricas de latencia (intent, entities, response)
+METRICS_APP = "chatbot"
+
+# Modelos (el de embeddings también es la clave del almacén persistente de embeddings)
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+SIMILARITY_THRESHOLD = 0.55  # Umbral de similitud para aceptar un intent (ajustable)
+
+# Definir intents y ejemplos
+intents = {
+    "saludo": [
+        "hola", "buenas", "buenos días", "buenas tardes", "buenas noches", "¿qué tal?"
+    ],
+    "despedida": [
+        "adiós", "hasta luego", "nos vemos", "chao", "bye"
+    ],
+    "reservar_mesa": [
+        "Quiero reservar una mesa",
+        "Reservar para 2 personas mañana por la noche",
+        "Necesito una mesa para 4 personas a las 20:00",
+        "Me gustaría reservar una mesa el sábado a las 21",
+        "Reserva para 3 el 10/10 a las 19:30"
+    ],
+    "cancelar_reserva": [
+        "Quiero cancelar mi reserva",
+        "Cancelar mesa",
+        "Anular reserva",
+        "No podré ir a la reserva"
+    ],
+    "pregunta_menu": [
+        "¿Qué menú tienen?",
+        "Mostrar menú",
+        "¿Cuál es el menú del día?",
+        "¿Tienen opciones vegetarianas?"
+    ],
+    "pregunta_horario": [
+        "¿Cuál es el horario?", "¿A qué hora abren?", "Horario de atención"
+    ],
+    "confirmacion": [
+        "sí", "si", "claro", "perfecto", "confirmar"
+    ],
+    "negacion": [
+        "no", "nop", "no gracias", "ahora no"
+    ]
+}
+
+
+# Estado inicial de una conversación
+def new_state():
+    # pending_action ejemplo: {"action":"reservar_mesa", "slots": {"num_personas": None, "date": None, "time": None}}
+    return {"pending_action": None, "reservations": []}
+
+
+# ----- Modelos de NLP -----
+class NLPModels:
+    def __init__(self, query_encoder, examples_embeddings, ner_model=None, threshold=SIMILARITY_THRESHOLD):
+        self.query_encoder = query_encoder
+        self.examples_embeddings = examples_embeddings
+        self.ner_model = ner_model
+        self.threshold = threshold
+        # sentence_transformers se importa al crear los modelos (no al importar el motor)
+        from sentence_transformers import util
+        self.cos_sim = util.cos_sim
+
+    @classmethod
+    def load(cls, query_cache_size=10000):
+        # Carga completa fuera de Streamlit (servidor, benchmarks)
+        import torch
+        from onnx_encoder import load_sentence_encoder, encoder_cache_key
+        from embedding_store import encode_intent_examples
+        from query_cache import QueryEmbeddingCache, MicroBatcher
+
+        with stage(METRICS_APP, "load_embeddings"):
+            embed_model = load_sentence_encoder(EMBEDDING_MODEL_NAME)
+            query_encoder = MicroBatcher(QueryEmbeddingCache(embed_model, maxsize=query_cache_size))
+            examples_embeddings = {
+                intent: torch.from_numpy(e) if e is not None else None
+                for intent, e in encode_intent_examples(embed_model, encoder_cache_key(EMBEDDING_MODEL_NAME, model=embed_model), intents).items()
+            }
+        # Sin modelo de spaCy: los slots de la reserva salen solo de las regex
+        return cls(query_encoder, examples_embeddings)
+
+    # Función de clasificación de intents
+    def predict_intent(self, user_input):
+        # Calcular embedding del input del usuario (con caché y por lotes)
+        input_embedding = self.query_encoder.encode(user_input)
+        max_sim = -1
+        best_intent = None
+
+        # Comparar con cada intent
+        for intent, embeddings in self.examples_embeddings.items():
+            if embeddings is None:
+                continue
+            sim_scores = self.cos_sim(input_embedding, embeddings)
+            sim_score = sim_scores.max().item()
+            if sim_score > max_sim:
+                max_sim = sim_score
+                best_intent = intent
+        # Fallback si no supera el umbral
+        if max_sim < self.threshold:
+            return "fallback", max_sim
+        return best_intent, max_sim
+
+    # Función de extracción de entidades
+    # Los slots (número de personas, hora y fecha) salen de las regex; spaCy solo se
+    # ejecuta con needed=None y si se ha pasado un ner_model (el motor no lo carga)
+    def extract_entities(self, user_input, needed=None):
+        return extract_entities_with(self.ner_model, user_input, needed=needed)
+
+
+# ----- Motor de diálogo -----
+class DialogueEngine:
+    def __init__(self, nlp, reservation_store, availability):
+        self.nlp = nlp
+        self.reservation_store = reservation_store
+        self.availability = availability
+
+    # ----- Lógica de negocio: slot filling y manejo de reservas -----
+    def start_reservation_flow(self, state, entities):
+        # Inicializar pending_action con slots vacíos o rellenados si ya se tienen
+        slots = {"num_personas": None, "date": None, "time": None}
+        if entities.get("NUM_PERSONAS"):
+            slots['num_personas'] = entities['NUM_PERSONAS']
+        if entities.get("DATE"):
+            slots['date'] = entities['DATE']
+        if entities.get("TIME"):
+            slots['time'] = entities['TIME']
+        state['pending_action'] = {"action": "reservar_mesa", "slots": slots}
+
+    def fill_slot_from_answer(self, state, answer):
+        # Intent: intentar llenar el slot vacío con el último texto del usuario
+        slots = state['pending_action']['slots']
+        # Solo hace falta extraer los slots que siguen vacíos
+        missing = [slot for slot, value in slots.items() if not value]
+        ent = self.nlp.extract_entities(answer, needed=missing)
+        changed = False
+        if not slots['num_personas'] and ent.get('NUM_PERSONAS'):
+            slots['num_personas'] = ent['NUM_PERSONAS']; changed = True
+        if not slots['time'] and ent.get('TIME'):
+            slots['time'] = ent['TIME']; changed = True
+        if not slots['date'] and ent.get('DATE'):
+            slots['date'] = ent['DATE']; changed = True
+        return changed
+
+    def finalize_reservation(self, state):
+        slots = state['pending_action']['slots']
+        reservation = {
+            "num_personas": slots.get('num_personas') or "1",
+            "date": slots.get('date'),
+            "time": slots.get('time'),
+            "created_at": datetime.utcnow().isoformat()
+        }
+        # Guardar en la base de datos comprobando la capacidad (lanza CapacityError si está completo)
+        reservation = self.availability.book(self.reservation_store, reservation)
+        state['reservations'].append(reservation)
+        state['pending_action'] = None
+        return reservation
+
+    # Cerrar la reserva si hay mesa o sugerir otra hora si no la hay
+    def confirm_reservation(self, state):
+        slots = state['pending_action']['slots']
+        seats = parse_party_size(slots['num_personas'])
+        if seats is None:
+            slots['num_personas'] = None
+            return "No he entendido el número de personas. ¿Para cuántas personas es la reserva?"
+        # Un grupo mayor que la capacidad de una franja no cabe ningún día
+        if seats > self.availability.seats_per_slot:
+            slots['num_personas'] = None
+            return (f"Lo siento, no podemos reservar para {seats} personas: el máximo es de "
+                    f"{self.availability.seats_per_slot} personas por reserva. ¿Para cuántas personas es la reserva?")
+        if normalize_date(slots['date']) is None:
+            slots['date'] = None
+            return "¿Para qué fecha te gustaría hacer la reserva? (por ejemplo, 10/10)"
+        # Una hora no válida o fuera del horario no significa que el día esté completo
+        if normalize_time(slots['time']) is None:
+            slots['time'] = None
+            return "No he entendido la hora. ¿A qué hora te gustaría reservar la mesa? (por ejemplo, 20:30)"
+        if not self.availability.is_open(slots['time']):
+            requested, slots['time'] = slots['time'], None
+            first, last = self.availability.slots[0], self.availability.slots[-1]
+            return f"Lo siento, no admitimos reservas a las {requested}: las mesas se reservan entre las {first} y las {last}. ¿A qué hora te gustaría reservar la mesa?"
+        if self.availability.is_available(slots['date'], slots['time'], seats):
+            try:
+                reservation = self.finalize_reservation(state)
+                return f"¡Reserva confirmada para {reservation['num_personas']} personas el {reservation['date']} a las {reservation['time']}! ¿Necesitas algo más?"
+            except CapacityError:
+                # Otra sesión ha completado la franja mientras tanto
+                pass
+        # No hay mesa: sugerir la siguiente franja libre del mismo día
+        suggestion = self.availability.next_free_slot(slots['date'], slots['time'], seats)
+        message = f"Lo siento, no quedan mesas para {seats} personas el {slots['date']} a las {slots['time']}."
+        slots['time'] = None
+        if suggestion:
+            return f"{message} La siguiente hora libre es a las {suggestion}. ¿A qué hora te gustaría reservar la mesa?"
+        slots['date'] = None
+        return f"{message} No hay más mesas libres ese día. ¿Para qué otra fecha te gustaría hacer la reserva?"
+
+    def ask_missing_slot(self, slots):
+        # Preguntar por el primer slot que falte (None si están todos)
+        if not slots['num_personas']:
+            return "¿Para cuántas personas es la reserva?"
+        if not slots['date']:
+            return "¿Para qué fecha te gustaría hacer la reserva?"
+        if not slots['time']:
+            return "¿A qué hora te gustaría reservar la mesa?"
+        return None
+
+    # ----- Generación de respuestas -----
+    def generate_response(self, state, intent, entities, user_input):
+        # Si hay flujo pendiente (slot filling), priorizarlo
+        if state['pending_action']:
+            # Intent: intentar rellenar slots con la respuesta del usuario
+            self.fill_slot_from_answer(state, user_input)
+            slots = state['pending_action']['slots']
+            # Si ya están todos los slots, finalizar la reserva (si hay mesa)
+            return self.ask_missing_slot(slots) or self.confirm_reservation(state)
+
+        # Flujo normal cuando no hay pending_action
+        if intent == "saludo":
+            return random.choice(["¡Hola! ¿Deseas reservar una mesa?", "¡Buenas! ¿En qué puedo ayudarte hoy?"])
+        elif intent == "despedida":
+            return random.choice(["¡Hasta luego!", "Que tengas un buen día."])
+        elif intent == "reservar_mesa":
+            # Iniciar flujo de reserva; si ya hay slots completos, finalizar directamente
+            self.start_reservation_flow(state, entities)
+            slots = state['pending_action']['slots']
+            return self.ask_missing_slot(slots) or self.confirm_reservation(state)
+        elif intent == "cancelar_reserva":
+            # Logica simple: cancelar la última reserva de la sesión que siga activa
+            removed = None
+            while state['reservations'] and removed is None:
+                removed = self.reservation_store.cancel(state['reservations'].pop()['id'])
+            if removed:
+                # Liberar las plazas en el índice de disponibilidad
+                self.availability.release(removed)
+                return f"Tu reserva para {removed['num_personas']} personas el {removed['date']} a las {removed['time']} ha sido cancelada."
+            else:
+                return "No tienes reservas para cancelar."
+        elif intent == "pregunta_menu":
+            return "Nuestro menú incluye opciones vegetarianas y sin gluten. ¿Quieres que te envíe el menú completo por email?"
+        elif intent == "pregunta_horario":
+            return "Nuestro horario de atención es de lunes a domingo de 12:00 a 23:00."
+        elif intent == "fallback":
+            return "Lo siento, no he entendido tu mensaje. ¿Podrías reformularlo?"
+        else:
+            return "Lo siento, no he entendido tu solicitud. ¿Podrías aclararlo?"
+
+    def respond(self, state, user_input):
+        # Devuelve (respuesta, meta); meta es None durante el slot filling
+        if state['pending_action']:
+            with stage(METRICS_APP, "response"):
+                return self.generate_response(state, None, {}, user_input), None
+        # Predecir intent y extraer entidades
+        with stage(METRICS_APP, "intent"):
+            intent, sim = self.nlp.predict_intent(user_input)
+        with stage(METRICS_APP, "entities"):
+            entities = self.nlp.extract_entities(user_input, needed=tuple(SLOT_ENTITIES))
+        with stage(METRICS_APP, "response"):
+            response = self.generate_response(state, intent, entities, user_input)
+        return response, {"intent": intent, "sim": round(sim, 3), "entities": entities}
+
+
+# ----- Almacenes de sesiones -----
+class InMemorySessionStore:
+    # Sesiones en memoria con límite de tamaño (se descartan las menos recientes)
+    def __init__(self, max_sessions=100000):
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, session_id):
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                return new_state()
+            self._sessions.move_to_end(session_id)
+            return state
+
+    def save(self, session_id, state):
+        with self._lock:
+            self._sessions[session_id] = state
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SQLiteSessionStore:
+    # Sesiones persistentes en SQLite (sobreviven a reinicios y se comparten entre procesos)
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at TEXT NOT NULL)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, session_id):
+        row = self._conn().execute("SELECT state FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row else new_state()
+
+    def save(self, session_id, state):
+        self._conn().execute(
+            "INSERT INTO sessions (id, state, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+            (session_id, json.dumps(state, ensure_ascii=False), datetime.utcnow().isoformat()),
+        )
+
+
+class SessionDialogue:
+    # Motor + almacén de sesiones: una llamada por mensaje, identificada por session_id
+    def __init__(self, engine, session_store):
+        self.engine = engine
+        self.session_store = session_store
+
+    def handle(self, session_id, user_input):
+        state = self.session_store.load(session_id)
+        response, meta = self.engine.respond(state, user_input)
+        self.session_store.save(session_id, state)
+        return {"session_id": session_id, "response": response, "meta": meta}
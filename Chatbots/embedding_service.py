@@ -0,0 +1,329 @@
+'''Servicio local de embeddings compartido por varios procesos de chatbot.
+
+Un único proceso carga el modelo (PyTorch u ONNX, ver onnx_encoder.py) y
+atiende peticiones por TCP en localhost o por un socket Unix; las peticiones
+concurrentes de todos los clientes se agrupan en una sola pasada del modelo.
+EmbeddingClient tiene la misma interfaz encode() que SentenceTransformer y es
+lo que devuelve load_sentence_encoder() con CHATBOT_ENCODER_BACKEND=service.
+
+Protocolo: cada mensaje es una cabecera JSON precedida de su longitud (4 bytes,
+big-endian); las respuestas con embeddings añaden después los float32 en bruto.
+
+Uso:
+    python embedding_service.py serve [--address 127.0.0.1:8765 | --address /tmp/embeddings.sock]
+    python embedding_service.py bench --workers 4
+
+Entorno recomendado: "chatbot"'''
+
+
+# Importar librerías necesarias
+import argparse
+import asyncio
+import json
+import os
+import socket
+import struct
+import threading
+import time
+import numpy as np
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+SERVICE_ENV = "CHATBOT_EMBEDDING_SERVICE"
+HEADER = struct.Struct(">I")
+
+
+# Función para interpretar la dirección ("host:puerto" o ruta de socket Unix)
+def parse_address(address):
+    if ":" in address and not address.startswith("/"):
+        host, port = address.rsplit(":", 1)
+        return socket.AF_INET, (host, int(port))
+    return socket.AF_UNIX, address
+
+
+# ----- Servidor -----
+class EmbeddingServer:
+    def __init__(self, model, cache_key, max_batch=64, max_wait_ms=5.0):
+        self.model = model
+        self.cache_key = cache_key
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = None
+        # Métricas
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            n_texts = len(pending[0][0])
+            deadline = loop.time() + self.max_wait
+            # Agrupar peticiones hasta llenar el lote o agotar la espera
+            while n_texts < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                n_texts += len(item[0])
+            texts = [t for item_texts, _ in pending for t in item_texts]
+            try:
+                # Una sola pasada del modelo fuera del bucle de eventos
+                embeddings = await loop.run_in_executor(
+                    None, lambda: np.asarray(self.model.encode(texts, batch_size=self.max_batch, convert_to_numpy=True), dtype=np.float32)
+                )
+            except Exception as exc:
+                for _, future in pending:
+                    future.set_exception(exc)
+                continue
+            self.batches += 1
+            self.texts += len(texts)
+            start = 0
+            for item_texts, future in pending:
+                future.set_result(embeddings[start:start + len(item_texts)])
+                start += len(item_texts)
+
+    # Función para validar una petición; devuelve (petición, None) o (None, mensaje de error)
+    @staticmethod
+    def _parse_request(data):
+        try:
+            request = json.loads(data)
+        except ValueError as exc:
+            return None, f"Petición no válida (JSON): {exc}"
+        if not isinstance(request, dict):
+            return None, "Petición no válida: se esperaba un objeto JSON"
+        if request.get("op") == "info":
+            return request, None
+        texts = request.get("texts")
+        if not isinstance(texts, list) or not texts or not all(isinstance(t, str) for t in texts):
+            return None, "Petición no válida: 'texts' debe ser una lista no vacía de cadenas"
+        return request, None
+
+    async def _send(self, writer, header, payload=b""):
+        data = json.dumps(header).encode("utf-8")
+        writer.write(HEADER.pack(len(data)) + data + payload)
+        await writer.drain()
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                size = HEADER.unpack(await reader.readexactly(HEADER.size))[0]
+                request, error = self._parse_request(await reader.readexactly(size))
+                self.requests += 1
+                if error is not None:
+                    # La trama se ha leído entera: la conexión sigue siendo válida
+                    await self._send(writer, {"error": error})
+                    continue
+                if request.get("op") == "info":
+                    await self._send(writer, {"cache_key": self.cache_key, "requests": self.requests,
+                                              "batches": self.batches, "texts": self.texts})
+                    continue
+                future = asyncio.get_running_loop().create_future()
+                await self.queue.put((request["texts"], future))
+                try:
+                    embeddings = await future
+                except Exception as exc:
+                    await self._send(writer, {"error": repr(exc)})
+                    continue
+                await self._send(writer, {"shape": list(embeddings.shape)}, embeddings.tobytes())
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, address):
+        self.queue = asyncio.Queue()
+        asyncio.create_task(self._batcher())
+        family, addr = parse_address(address)
+        if family == socket.AF_UNIX:
+            if os.path.exists(addr):
+                os.remove(addr)
+            server = await asyncio.start_unix_server(self.handle_client, path=addr)
+        else:
+            server = await asyncio.start_server(self.handle_client, host=addr[0], port=addr[1])
+        print(f"Servicio de embeddings ({self.cache_key}) escuchando en {address}")
+        async with server:
+            await server.serve_forever()
+
+
+# ----- Cliente -----
+class EmbeddingClient:
+    def __init__(self, address=None, timeout=60.0):
+        self.address = address or os.environ.get(SERVICE_ENV, DEFAULT_ADDRESS)
+        self.timeout = timeout
+        # Un socket por hilo (cada sesión de Streamlit corre en su propio hilo)
+        self._local = threading.local()
+        self.cache_key = self._request({"op": "info"})[0]["cache_key"]
+
+    def _socket(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            family, addr = parse_address(self.address)
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(addr)
+            if family == socket.AF_INET:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._local.sock = sock
+        return sock
+
+    def _recv_exactly(self, sock, size):
+        chunks = bytearray()
+        while len(chunks) < size:
+            chunk = sock.recv(size - len(chunks))
+            if not chunk:
+                raise ConnectionError("El servicio de embeddings ha cerrado la conexión")
+            chunks.extend(chunk)
+        return bytes(chunks)
+
+    def _request(self, request):
+        data = json.dumps(request, ensure_ascii=False).encode("utf-8")
+        sock = self._socket()
+        try:
+            sock.sendall(HEADER.pack(len(data)) + data)
+            size = HEADER.unpack(self._recv_exactly(sock, HEADER.size))[0]
+            header = json.loads(self._recv_exactly(sock, size))
+            payload = b""
+            if "shape" in header:
+                n, dim = header["shape"]
+                payload = self._recv_exactly(sock, n * dim * 4)
+        except (OSError, ConnectionError):
+            # Conexión rota: se abrirá una nueva en la siguiente llamada
+            sock.close()
+            self._local.sock = None
+            raise
+        if "error" in header:
+            raise RuntimeError(f"Error en el servicio de embeddings: {header['error']}")
+        return header, payload
+
+    def encode(self, sentences, batch_size=32, convert_to_tensor=False, convert_to_numpy=True,
+               normalize_embeddings=False, **kwargs):
+        # Misma interfaz que SentenceTransformer.encode
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if texts:
+            header, payload = self._request({"texts": texts})
+            embeddings = np.frombuffer(payload, dtype=np.float32).reshape(header["shape"]).copy()
+        else:
+            embeddings = np.zeros((0, 0), dtype=np.float32)
+        if normalize_embeddings and len(embeddings):
+            embeddings = embeddings / np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        if single:
+            embeddings = embeddings[0]
+        if convert_to_tensor:
+            import torch
+            return torch.from_numpy(embeddings)
+        return embeddings
+
+    def info(self):
+        return self._request({"op": "info"})[0]
+
+
+# ----- Benchmark: N procesos con modelo propio frente a servicio compartido -----
+def _rss_mb(pid):
+    # Memoria residente de un proceso (Linux: /proc; en otro caso, psutil si está instalado)
+    try:
+        with open(f"/proc/{pid}/status", mode="r") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        import psutil
+        return psutil.Process(pid).memory_info().rss / 1024 ** 2
+    return 0.0
+
+
+def _bench_worker(mode, model_name, address, messages, ready, start, results):
+    from onnx_encoder import load_sentence_encoder
+    model = EmbeddingClient(address) if mode == "service" else load_sentence_encoder(model_name, backend="torch")
+    model.encode("calentamiento")
+    ready.set()
+    start.wait()
+    t0 = time.perf_counter()
+    for m in messages:
+        model.encode(m)
+    results.put((os.getpid(), len(messages) / (time.perf_counter() - t0)))
+    # Esperar a que el proceso padre mida la memoria
+    time.sleep(2)
+
+
+def bench(args):
+    import multiprocessing as mp
+    ctx = mp.get_context("spawn")
+    messages = [f"quiero reservar una mesa para {i % 12 + 1} personas a las {12 + i % 10}:00" for i in range(args.messages)]
+
+    server_proc = None
+    if args.mode == "service":
+        server_proc = ctx.Process(target=_serve, args=(args.model, args.address, "torch", 64, 5.0), daemon=True)
+        server_proc.start()
+        # Esperar a que el servicio acepte conexiones
+        for _ in range(600):
+            try:
+                EmbeddingClient(args.address)
+                break
+            except OSError:
+                time.sleep(0.5)
+
+    ready_events = [ctx.Event() for _ in range(args.workers)]
+    start, results = ctx.Event(), ctx.Queue()
+    procs = [
+        ctx.Process(target=_bench_worker, args=(args.mode, args.model, args.address, messages, ev, start, results))
+        for ev in ready_events
+    ]
+    for p in procs:
+        p.start()
+    for ev in ready_events:
+        ev.wait()
+    t0 = time.perf_counter()
+    start.set()
+    rates = [results.get() for _ in procs]
+    elapsed = time.perf_counter() - t0
+    pids = [p.pid for p in procs] + ([server_proc.pid] if server_proc else [])
+    total_rss = sum(_rss_mb(pid) for pid in pids)
+    for p in procs:
+        p.join()
+    if server_proc:
+        server_proc.terminate()
+
+    print(f"Modo: {args.mode} · {args.workers} procesos de app")
+    print(f"RSS total: {total_rss:.0f} MB ({total_rss / args.workers:.0f} MB por app)")
+    print(f"Throughput agregado: {args.workers * len(messages) / elapsed:.1f} msg/s "
+          f"(por proceso: {', '.join(f'{r:.1f}' for _, r in rates)})")
+
+
+def _serve(model_name, address, backend, max_batch, max_wait_ms):
+    from onnx_encoder import load_sentence_encoder, encoder_cache_key
+    model = load_sentence_encoder(model_name, backend=backend)
+    server = EmbeddingServer(model, encoder_cache_key(model_name, backend), max_batch=max_batch, max_wait_ms=max_wait_ms)
+    asyncio.run(server.serve(address))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio local de embeddings compartido")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    p_serve = subparsers.add_parser("serve", help="Arrancar el servicio")
+    p_serve.add_argument("--model", default="all-MiniLM-L6-v2")
+    p_serve.add_argument("--address", default=os.environ.get(SERVICE_ENV, DEFAULT_ADDRESS))
+    p_serve.add_argument("--backend", choices=["torch", "onnx"], help="Encoder del servicio (por defecto, torch)")
+    p_serve.add_argument("--max-batch", type=int, default=64)
+    p_serve.add_argument("--max-wait-ms", type=float, default=5.0)
+    p_bench = subparsers.add_parser("bench", help="RSS y throughput: modelo por proceso frente a servicio")
+    p_bench.add_argument("--mode", choices=["process", "service"], default="service")
+    p_bench.add_argument("--model", default="all-MiniLM-L6-v2")
+    p_bench.add_argument("--address", default=DEFAULT_ADDRESS)
+    p_bench.add_argument("--workers", type=int, default=4)
+    p_bench.add_argument("--messages", type=int, default=500)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        _serve(args.model, args.address, args.backend or "torch", args.max_batch, args.max_wait_ms)
+    else:
+        bench(args)
+
+
+if __name__ == "__main__":
+    main()
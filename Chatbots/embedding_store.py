@@ -0,0 +1,159 @@
+'''Almacén persistente de embeddings para los ejemplos de intents.
+
+Los embeddings se guardan en disco por modelo: un fichero .f32 con las filas de
+float32 una detrás de otra y un índice .json que asocia el hash de cada texto con
+su fila. Al arrancar se cargan con memoria mapeada y solo se codifican los
+ejemplos nuevos o cambiados, que se añaden al final del fichero (sin reescribir
+las filas existentes); después se sustituye el índice de forma atómica. Varios
+procesos pueden compartir el mismo almacén: las escrituras se serializan con un
+fichero de bloqueo.'''
+
+
+# Importar librerías necesarias
+import os
+import re
+import json
+import time
+import hashlib
+import numpy as np
+
+# Directorio por defecto del almacén (junto a los chatbots)
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".embeddings_cache")
+
+
+# Función para calcular la clave de un texto
+def text_key(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    def __init__(self, model_name, cache_dir=DEFAULT_CACHE_DIR, lock_timeout=30.0):
+        self.model_name = model_name
+        self.lock_timeout = lock_timeout
+        os.makedirs(cache_dir, exist_ok=True)
+        # Nombre de fichero seguro a partir del nombre del modelo
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        self.vectors_path = os.path.join(cache_dir, f"{safe_name}.f32")
+        self.index_path = os.path.join(cache_dir, f"{safe_name}.json")
+        self.lock_path = os.path.join(cache_dir, f"{safe_name}.lock")
+        self.index = {}
+        self.vectors = None
+        self.dim = None
+        self._load()
+
+    # ----- Lectura del almacén -----
+    def _load(self):
+        self.index = {}
+        self.vectors = None
+        self.dim = None
+        if not (os.path.isfile(self.index_path) and os.path.isfile(self.vectors_path)):
+            return
+        try:
+            with open(self.index_path, mode="r", encoding="utf-8") as file:
+                data = json.load(file)
+            dim = int(data["dim"])
+            # Solo filas completas (una escritura interrumpida puede dejar una fila a medias)
+            n_rows = os.path.getsize(self.vectors_path) // (dim * 4)
+            vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(n_rows, dim)) if n_rows else None
+        except (OSError, ValueError, KeyError):
+            # Almacén corrupto o a medio escribir: se reconstruye al codificar
+            return
+        if data.get("model") != self.model_name or vectors is None:
+            return
+        # Los vectores se escriben antes que el índice, así que solo se
+        # descartan filas que no existan (nunca debería ocurrir)
+        self.index = {k: row for k, row in data.get("rows", {}).items() if row < n_rows}
+        self.vectors = vectors
+        self.dim = dim
+
+    def __len__(self):
+        return len(self.index)
+
+    def lookup(self, texts):
+        # Devuelve los vectores guardados o None si falta alguno
+        rows = [self.index.get(text_key(t)) for t in texts]
+        if self.vectors is None or any(r is None for r in rows):
+            return None
+        return np.asarray(self.vectors[rows], dtype=np.float32)
+
+    # ----- Escritura del almacén -----
+    def _acquire_lock(self):
+        start = time.monotonic()
+        while True:
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.close(fd)
+                return
+            except FileExistsError:
+                # Si el bloqueo lleva demasiado tiempo, se considera huérfano
+                if time.monotonic() - start > self.lock_timeout:
+                    self._release_lock()
+                    start = time.monotonic()
+                time.sleep(0.05)
+
+    def _release_lock(self):
+        try:
+            os.remove(self.lock_path)
+        except FileNotFoundError:
+            pass
+
+    def _append(self, new_vectors):
+        # Añade las filas al final del fichero y devuelve la primera fila nueva
+        # (si el modelo o la dimensión cambian, el fichero se empieza de cero)
+        dim = new_vectors.shape[1]
+        row_bytes = dim * 4
+        mode = "r+b" if self.dim == dim and os.path.isfile(self.vectors_path) else "w+b"
+        if mode == "w+b":
+            self.index = {}
+        with open(self.vectors_path, mode=mode) as file:
+            # Descartar una posible fila incompleta de una escritura interrumpida
+            end = file.seek(0, os.SEEK_END)
+            start_row = end // row_bytes
+            if end != start_row * row_bytes:
+                file.truncate(start_row * row_bytes)
+                file.seek(start_row * row_bytes)
+            file.write(np.ascontiguousarray(new_vectors, dtype=np.float32).tobytes())
+            file.flush()
+            os.fsync(file.fileno())
+        return start_row, dim
+
+    def _write_index(self, dim):
+        # Escritura atómica del índice: fichero temporal + os.replace
+        tmp_index = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_index, mode="w", encoding="utf-8") as file:
+            json.dump({"model": self.model_name, "dim": int(dim), "rows": self.index}, file)
+        os.replace(tmp_index, self.index_path)
+
+    def encode(self, model, texts):
+        # Camino rápido: todos los textos ya están en el almacén
+        cached = self.lookup(texts)
+        if cached is not None:
+            return cached
+
+        self._acquire_lock()
+        try:
+            # Releer por si otro proceso ha añadido embeddings mientras tanto
+            self._load()
+            missing = list(dict.fromkeys(t for t in texts if text_key(t) not in self.index))
+            if missing:
+                new_vectors = np.asarray(model.encode(missing, convert_to_numpy=True), dtype=np.float32)
+                # Se libera el mapa actual antes de escribir en el fichero
+                self.vectors = None
+                start_row, dim = self._append(new_vectors)
+                for i, text in enumerate(missing):
+                    self.index[text_key(text)] = start_row + i
+                self._write_index(dim)
+                self._load()
+        finally:
+            self._release_lock()
+        return self.lookup(texts)
+
+
+# Función para calcular los embeddings de todos los intents usando el almacén
+def encode_intent_examples(model, model_name, intents, cache_dir=DEFAULT_CACHE_DIR):
+    store = EmbeddingStore(model_name, cache_dir=cache_dir)
+    examples_embeddings = {}
+    for intent, examples in intents.items():
+        # Si no hay ejemplos, asignar None
+        examples_embeddings[intent] = store.encode(model, examples) if len(examples) > 0 else None
+    return examples_embeddings
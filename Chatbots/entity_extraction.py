@@ -0,0 +1,109 @@
+'''Extracción de entidades para el chatbot de reservas (regex + NER de spaCy).
+
+Los slots de la reserva (número de personas, fecha y hora) salen solo de las
+regex precompiladas: es_core_news_sm solo etiqueta PER/LOC/ORG/MISC, así que
+spaCy no puede rellenarlos y no se ejecuta durante el slot filling. Por eso el
+motor de diálogo (app y servidor) no carga el modelo: spaCy solo se usa cuando
+se piden todas las entidades (needed=None) con un pipeline cargado, p. ej. en
+bench_chatbots.py, y únicamente con los componentes del NER.'''
+
+
+# Importar librerías necesarias
+import re
+
+# Componentes del pipeline que necesita el NER; el resto se excluye al cargar
+NER_COMPONENTS = ("tok2vec", "ner")
+EXCLUDED_COMPONENTS = ["morphologizer", "tagger", "parser", "senter", "attribute_ruler", "lemmatizer"]
+
+# Entidades (de las regex) que rellenan cada slot de la reserva
+SLOT_ENTITIES = {
+    "num_personas": ("NUM_PERSONAS",),
+    "date": ("DATE",),
+    "time": ("TIME",),
+}
+
+# Regex para extraer el número de personas (ej: "para 2 personas", "mesa para 4", etc.);
+# no acepta números que formen parte de una hora o de una fecha ("a las 9:30", "10/10")
+NUM_PERSONAS_RE = re.compile(
+    r'(?<![:/\-\d])(?<!a las )(?<!a la )\b(?:para\s+)?(\d{1,2})(?![:/\-]\d|[hH]\b|[hH]\d)\s*(?:personas|pers|pax)?\b',
+    flags=re.IGNORECASE,
+)
+# Regex para horas: "a las 21", "a las 19:30", "a las 22h" o una hora explícita (20:00, 21h30, 22h);
+# un número suelto no es una hora ("Reserva para 3 el 10/10" no da las 3:00)
+TIME_RE = re.compile(
+    r'\ba\s+las?\s+(?P<h1>[01]?\d|2[0-3])(?:[:hH.](?P<m1>[0-5]\d)|[hH])?\b'
+    r'|\b(?P<h2>[01]?\d|2[0-3])(?::(?P<m2>[0-5]\d)|[hH](?P<m3>[0-5]\d)?)(?!\w)',
+    flags=re.IGNORECASE,
+)
+# Regex para fechas (formato dd/mm, dd-mm)
+DATE_RE = re.compile(r'\b(\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?)\b')
+
+
+# Función para cargar el modelo NER de spaCy sin los componentes innecesarios
+# (spaCy se importa aquí para no ralentizar el arranque de las apps)
+def load_ner_pipeline(model_name="es_core_news_sm", lean=True):
+    import spacy
+    if not lean:
+        return spacy.load(model_name)
+    return spacy.load(model_name, exclude=EXCLUDED_COMPONENTS)
+
+
+# Función de extracción de entidades con regex
+def regex_entities(user_input):
+    entities = {}
+    match = NUM_PERSONAS_RE.search(user_input)
+    if match:
+        entities['NUM_PERSONAS'] = match.group(1)
+
+    match_time = TIME_RE.search(user_input)
+    if match_time:
+        # Construir hora legible
+        h = match_time.group('h1') or match_time.group('h2')
+        mm = match_time.group('m1') or match_time.group('m2') or match_time.group('m3') or "00"
+        entities['TIME'] = f"{h}:{mm}"
+
+    match_date = DATE_RE.search(user_input)
+    if match_date:
+        entities['DATE'] = match_date.group(1)
+    return entities
+
+
+# Función para añadir las entidades de spaCy (LABEL -> texto)
+def spacy_entities(doc):
+    entities = {}
+    for ent in doc.ents:
+        # Guardar varios valores posibles (si hay varios de la misma etiqueta)
+        if ent.label_ in entities:
+            entities[ent.label_] += f" | {ent.text}"
+        else:
+            entities[ent.label_] = ent.text
+    return entities
+
+
+# Función para saber si hace falta spaCy: solo cuando se piden todas las entidades
+# (needed=None); sus etiquetas no rellenan ningún slot de la reserva
+def needs_spacy(needed=None):
+    return needed is None
+
+
+def _merge(doc, regex_ents):
+    # Las regex tienen prioridad sobre spaCy si coinciden las etiquetas
+    entities = spacy_entities(doc) if doc is not None else {}
+    entities.update(regex_ents)
+    return entities
+
+
+# Función de extracción de entidades (regex; spaCy solo si se piden todas las entidades
+# y hay un pipeline cargado)
+def extract_entities(nlp, user_input, needed=None):
+    regex_ents = regex_entities(user_input)
+    doc = nlp(user_input) if nlp is not None and needs_spacy(needed) else None
+    return _merge(doc, regex_ents)
+
+
+# Versión por lotes para cargas con muchos mensajes (usa nlp.pipe)
+def extract_entities_batch(nlp, texts, needed=None, batch_size=64):
+    regex_results = [regex_entities(t) for t in texts]
+    pending = list(range(len(texts))) if nlp is not None and needs_spacy(needed) else []
+    docs = dict(zip(pending, nlp.pipe((texts[i] for i in pending), batch_size=batch_size))) if pending else {}
+    return [_merge(docs.get(i), ents) for i, ents in enumerate(regex_results)]
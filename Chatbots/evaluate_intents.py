@@ -0,0 +1,241 @@
+'''Evaluación offline de los clasificadores de intents de los chatbots.
+
+Ejecuta sin Streamlit el clasificador de cada chatbot sobre un fichero CSV
+etiquetado (columnas text,intent; "fallback" para frases fuera de dominio) y
+muestra accuracy, matriz de confusión por intent, tasa de fallback para un
+barrido de umbrales y latencia (p50/p95/p99) y throughput.
+
+Los intents, pesos y umbrales se leen directamente de los scripts de los
+chatbots (o de dialogue_engine.py para el chatbot mejorado), así que la evaluación siempre usa la configuración actual.
+
+Uso:
+    python evaluate_intents.py --bot reservas_mejorado
+    python evaluate_intents.py --bot faq --data data/intents_faq_eval.csv
+    python evaluate_intents.py --bot reservas --thresholds 0.3:0.8:0.05 --output resultados.json
+
+Entorno recomendado: "chatbot"'''
+
+
+# Importar librerías necesarias
+import argparse
+import ast
+import csv
+import json
+import os
+import time
+from collections import Counter, defaultdict
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FALLBACK = "fallback"
+
+# Scripts de cada chatbot y fichero de evaluación por defecto
+BOTS = {
+    "reservas": ("Chatbot_Reservas.py", "data/intents_reservas_eval.csv"),
+    "reservas_mejorado": ("dialogue_engine.py", "data/intents_reservas_eval.csv"),
+    "faq": ("Chatbot_web_FAQ.py", "data/intents_faq_eval.csv"),
+}
+
+
+# ----- Lectura de la configuración y de los datos -----
+
+# Función para leer constantes (intents, pesos, umbral) de un script sin ejecutarlo
+def load_script_constants(path, names):
+    with open(path, mode="r", encoding="utf-8") as file:
+        tree = ast.parse(file.read(), filename=path)
+    constants = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            name = node.targets[0].id
+            if name in names:
+                constants[name] = ast.literal_eval(node.value)
+    return constants
+
+
+# Función para leer el fichero etiquetado (text,intent)
+def load_labeled(path):
+    with open(path, mode="r", newline="", encoding="utf-8") as file:
+        rows = [(row["text"], row["intent"]) for row in csv.DictReader(file)]
+    return [t for t, _ in rows], [i for _, i in rows]
+
+
+# Función para generar la lista de umbrales ("0.3:0.8:0.05" -> [0.3, 0.35, ...])
+def parse_thresholds(spec):
+    start, stop, step = (float(x) for x in spec.split(":"))
+    n = int(round((stop - start) / step)) + 1
+    return [round(start + i * step, 6) for i in range(n)]
+
+
+# ----- Métricas -----
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def latency_summary(latencies_ms, total_s, n):
+    return {
+        "p50_ms": percentile(latencies_ms, 50),
+        "p95_ms": percentile(latencies_ms, 95),
+        "p99_ms": percentile(latencies_ms, 99),
+        "throughput_msg_s": n / total_s if total_s else 0.0,
+    }
+
+
+def classification_report(labels, predictions):
+    confusion = defaultdict(Counter)
+    for label, pred in zip(labels, predictions):
+        confusion[label][pred] += 1
+    per_intent = {}
+    for intent in sorted(set(labels) | set(predictions)):
+        tp = confusion[intent][intent]
+        predicted = sum(confusion[l][intent] for l in confusion)
+        actual = sum(confusion[intent].values())
+        per_intent[intent] = {
+            "precision": tp / predicted if predicted else 0.0,
+            "recall": tp / actual if actual else 0.0,
+            "support": actual,
+        }
+    return {
+        "accuracy": sum(l == p for l, p in zip(labels, predictions)) / len(labels),
+        "fallback_rate": predictions.count(FALLBACK) / len(predictions),
+        "per_intent": per_intent,
+        "confusion": {label: dict(preds) for label, preds in confusion.items()},
+    }
+
+
+# ----- Clasificadores -----
+
+class EmbeddingIntentClassifier:
+    # Mismo criterio que predict_intent: máxima similitud coseno con los ejemplos de cada intent
+    def __init__(self, model, intents):
+        import numpy as np
+        self.np = np
+        self.model = model
+        self.intent_names = [intent for intent, examples in intents.items() if examples]
+        self.example_embeddings = [
+            model.encode(intents[intent], convert_to_numpy=True, normalize_embeddings=True)
+            for intent in self.intent_names
+        ]
+
+    def similarities(self, texts, batch_size=64):
+        # Matriz (n_textos, n_intents) con la similitud máxima por intent
+        queries = self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+        return self.np.stack([(queries @ emb.T).max(axis=1) for emb in self.example_embeddings], axis=1)
+
+    def predict_from_similarities(self, sims, threshold):
+        # np.argmax devuelve el primer máximo, igual que la comparación estricta de predict_intent
+        best = sims.argmax(axis=1)
+        best_sim = sims.max(axis=1)
+        return [
+            FALLBACK if threshold is not None and s < threshold else self.intent_names[b]
+            for b, s in zip(best, best_sim)
+        ]
+
+
+class KeywordIntentClassifier:
+    # Mismo criterio que chatbot_context (sin contexto de conversación)
+    def __init__(self, intents, weights):
+        from nltk.stem import SnowballStemmer
+        from nltk.tokenize import word_tokenize
+        from keyword_index import KeywordIndex, ensure_nltk_resources
+        ensure_nltk_resources(os.path.join(os.getcwd(), "nltk_data"))
+        self.tokenize = word_tokenize
+        self.index = KeywordIndex(intents, weights, SnowballStemmer("spanish"))
+
+    def predict(self, text):
+        best_intent, _ = self.index.score(self.tokenize(text.lower()))
+        return best_intent or FALLBACK
+
+
+# ----- Evaluación -----
+
+def evaluate_embeddings(script, texts, labels, thresholds, batch_size, backend=None):
+    from onnx_encoder import load_sentence_encoder
+    constants = load_script_constants(script, {"intents", "SIMILARITY_THRESHOLD", "EMBEDDING_MODEL_NAME"})
+    current = constants.get("SIMILARITY_THRESHOLD")
+    model = load_sentence_encoder(constants.get("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2"), backend=backend)
+    classifier = EmbeddingIntentClassifier(model, constants["intents"])
+
+    # Modo por lotes: las similitudes se calculan una sola vez para todo el barrido
+    start = time.perf_counter()
+    sims = classifier.similarities(texts, batch_size=batch_size)
+    batch_s = time.perf_counter() - start
+
+    # Latencia por mensaje (una consulta cada vez, como en el chatbot)
+    latencies = []
+    for text in texts:
+        t0 = time.perf_counter()
+        classifier.predict_from_similarities(classifier.similarities([text]), current)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    sweep = {}
+    for threshold in sorted(set(thresholds) | ({current} if current is not None else set())):
+        report = classification_report(labels, classifier.predict_from_similarities(sims, threshold))
+        sweep[threshold] = {"accuracy": report["accuracy"], "fallback_rate": report["fallback_rate"]}
+
+    return {
+        "current_threshold": current,
+        "current": classification_report(labels, classifier.predict_from_similarities(sims, current)),
+        "threshold_sweep": sweep,
+        "latency": latency_summary(latencies, sum(latencies) / 1000, len(texts)),
+        "batch_throughput_msg_s": len(texts) / batch_s if batch_s else 0.0,
+    }
+
+
+def evaluate_keywords(script, texts, labels):
+    constants = load_script_constants(script, {"intents", "intents_weights"})
+    classifier = KeywordIntentClassifier(constants["intents"], constants.get("intents_weights", {}))
+    predictions, latencies = [], []
+    for text in texts:
+        t0 = time.perf_counter()
+        predictions.append(classifier.predict(text))
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return {
+        "current": classification_report(labels, predictions),
+        "latency": latency_summary(latencies, sum(latencies) / 1000, len(texts)),
+    }
+
+
+def print_results(bot, results):
+    current = results["current"]
+    print(f"== {bot} ==")
+    print(f"Accuracy: {current['accuracy']:.3f} · fallback: {current['fallback_rate']:.3f}")
+    print(f"{'intent':<20} {'precision':>9} {'recall':>7} {'n':>4}  confusiones")
+    for intent, m in current["per_intent"].items():
+        errors = {p: c for p, c in current["confusion"].get(intent, {}).items() if p != intent}
+        print(f"{intent:<20} {m['precision']:9.2f} {m['recall']:7.2f} {m['support']:4d}  {errors or ''}")
+    if "threshold_sweep" in results:
+        print(f"Barrido de umbrales (actual: {results['current_threshold']}):")
+        for threshold, m in results["threshold_sweep"].items():
+            print(f"  {threshold:5.2f}  accuracy={m['accuracy']:.3f}  fallback={m['fallback_rate']:.3f}")
+        print(f"Throughput por lotes: {results['batch_throughput_msg_s']:.1f} msg/s")
+    lat = results["latency"]
+    print(f"Latencia por mensaje: p50={lat['p50_ms']:.2f} ms  p95={lat['p95_ms']:.2f} ms  "
+          f"p99={lat['p99_ms']:.2f} ms  ({lat['throughput_msg_s']:.1f} msg/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluación offline de los clasificadores de intents")
+    parser.add_argument("--bot", choices=sorted(BOTS), default="reservas_mejorado")
+    parser.add_argument("--data", help="CSV etiquetado con columnas text,intent")
+    parser.add_argument("--thresholds", default="0.30:0.80:0.05", help="inicio:fin:paso")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--backend", choices=["torch", "onnx"], help="Encoder (por defecto, CHATBOT_ENCODER_BACKEND)")
+    parser.add_argument("--output", help="Guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    script, default_data = BOTS[args.bot]
+    texts, labels = load_labeled(args.data or os.path.join(BASE_DIR, default_data))
+    script = os.path.join(BASE_DIR, script)
+    if args.bot == "faq":
+        results = evaluate_keywords(script, texts, labels)
+    else:
+        results = evaluate_embeddings(script, texts, labels, parse_thresholds(args.thresholds), args.batch_size, args.backend)
+
+    print_results(args.bot, results)
+    if args.output:
+        with open(args.output, mode="w", encoding="utf-8") as file:
+            json.dump({"bot": args.bot, **results}, file, ensure_ascii=False, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+'''Índice invertido de raíces (stems) para el chatbot FAQ.
+
+Las palabras clave de cada intent se stemizan una sola vez y se guardan en un
+diccionario raíz -> [(intent, peso)], de modo que puntuar un mensaje es una
+única pasada por sus tokens, independiente del número de intents.'''
+
+
+# Importar librerías necesarias
+import os
+from functools import lru_cache
+import nltk
+
+# Recursos de NLTK necesarios (ruta dentro de nltk_data, nombre del paquete)
+NLTK_RESOURCES = (("tokenizers/punkt", "punkt"), ("tokenizers/punkt_tab", "punkt_tab"))
+
+
+# Función para preparar los recursos de NLTK (solo descarga lo que falte)
+def ensure_nltk_resources(data_path, resources=NLTK_RESOURCES):
+    os.makedirs(data_path, exist_ok=True)
+    if data_path not in nltk.data.path:
+        nltk.data.path.append(data_path)
+    for resource_path, package in resources:
+        try:
+            nltk.data.find(resource_path)
+        except LookupError:
+            nltk.download(package, download_dir=data_path, quiet=True)
+
+
+class KeywordIndex:
+    def __init__(self, intents, weights, stemmer, stem_cache_size=50000):
+        # Orden de los intents: en caso de empate gana el primero (como antes)
+        self.order = {intent: i for i, intent in enumerate(intents)}
+        self.stem = lru_cache(maxsize=stem_cache_size)(stemmer.stem)
+        self.index = {}
+        for intent, keywords in intents.items():
+            weight = weights.get(intent, 1)
+            # Cada raíz cuenta una vez por intent aunque se repita entre sus keywords
+            for stem in {self.stem(k) for k in keywords}:
+                self.index.setdefault(stem, []).append((intent, weight))
+
+    def score(self, tokens):
+        # Una sola pasada por los tokens acumulando la puntuación de cada intent
+        scores = {}
+        for token in tokens:
+            for intent, weight in self.index.get(self.stem(token), ()):
+                scores[intent] = scores.get(intent, 0) + weight
+        best_intent, max_score = None, 0
+        for intent, score in scores.items():
+            if score > max_score or (score == max_score and best_intent is not None and self.order[intent] < self.order[best_intent]):
+                best_intent, max_score = intent, score
+        return best_intent, max_score
@@ -0,0 +1,105 @@
+'''Generador de carga local para chatbot_server.py.
+
+Lanza muchas conversaciones concurrentes (cada una con su session_id) que
+siguen un guion de reserva y mide mensajes/segundo y percentiles de latencia.
+
+Uso:
+    python load_generator.py --conversations 2000 --concurrency 500 [--ws]
+
+Entorno recomendado: "chatbot"'''
+
+
+# Importar librerías necesarias
+import argparse
+import asyncio
+import random
+import time
+import uuid
+import aiohttp
+
+# Guion de una conversación de reserva típica
+def conversation_script(rng):
+    day, month = rng.randint(1, 28), rng.randint(1, 12)
+    hour = rng.randint(12, 22)
+    return [
+        rng.choice(["hola", "buenas", "buenas tardes"]),
+        "Quiero reservar una mesa",
+        f"para {rng.randint(1, 8)} personas",
+        f"el {day}/{month}",
+        f"a las {hour}:{rng.choice(['00', '30'])}",
+        rng.choice(["¿Cuál es el horario?", "¿Qué menú tienen?"]),
+        rng.choice(["adiós", "hasta luego", "gracias, chao"]),
+    ]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+async def run_http_conversation(session, base_url, script, latencies, errors):
+    session_id = uuid.uuid4().hex
+    for text in script:
+        start = time.perf_counter()
+        try:
+            async with session.post(f"{base_url}/sessions/{session_id}/messages", json={"text": text}) as resp:
+                await resp.json()
+                if resp.status != 200:
+                    errors.append(resp.status)
+                    continue
+        except aiohttp.ClientError as exc:
+            errors.append(repr(exc))
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def run_ws_conversation(session, base_url, script, latencies, errors):
+    session_id = uuid.uuid4().hex
+    try:
+        async with session.ws_connect(f"{base_url}/ws?session_id={session_id}") as ws:
+            for text in script:
+                start = time.perf_counter()
+                await ws.send_str(text)
+                await ws.receive_json()
+                latencies.append((time.perf_counter() - start) * 1000)
+    except aiohttp.ClientError as exc:
+        errors.append(repr(exc))
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    scripts = [conversation_script(rng) for _ in range(args.conversations)]
+    latencies, errors = [], []
+    semaphore = asyncio.Semaphore(args.concurrency)
+    run_conversation = run_ws_conversation if args.ws else run_http_conversation
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def bounded(script):
+            async with semaphore:
+                await run_conversation(session, args.url, script, latencies, errors)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(bounded(s) for s in scripts))
+        elapsed = time.perf_counter() - start
+
+    print(f"Conversaciones: {args.conversations} ({args.concurrency} concurrentes, {'WebSocket' if args.ws else 'HTTP'})")
+    print(f"Mensajes: {len(latencies)} en {elapsed:.2f} s -> {len(latencies) / elapsed:.1f} msg/s · errores: {len(errors)}")
+    if latencies:
+        print(f"Latencia: p50={percentile(latencies, 50):.1f} ms  p95={percentile(latencies, 95):.1f} ms  "
+              f"p99={percentile(latencies, 99):.1f} ms  max={max(latencies):.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generador de carga para chatbot_server.py")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--conversations", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--ws", action="store_true", help="Usar WebSocket en lugar de HTTP")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+'''Encoder MiniLM exportado a ONNX y cuantizado a int8 para servir en CPU.
+
+OnnxSentenceEncoder reproduce el pipeline de SentenceTransformer para
+all-MiniLM-L6-v2 (tokenizador, mean pooling con la máscara de atención y
+normalización L2) y expone el mismo método encode(), así que puede sustituir
+al modelo de PyTorch en los chatbots. El backend se elige con la variable de
+entorno CHATBOT_ENCODER_BACKEND: "torch" (por defecto), "onnx" o "service"
+(cliente del servicio compartido de embedding_service.py).
+
+Uso:
+    python onnx_encoder.py export [--model all-MiniLM-L6-v2] [--output onnx_models/all-MiniLM-L6-v2-int8]
+    python onnx_encoder.py report [--data data/intents_reservas_eval.csv]
+
+Entorno recomendado: "chatbot"'''
+
+
+# Importar librerías necesarias
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ONNX_MODELS_DIR = os.path.join(BASE_DIR, "onnx_models")
+BACKEND_ENV = "CHATBOT_ENCODER_BACKEND"
+ONNX_DIR_ENV = "CHATBOT_ONNX_DIR"
+
+
+def default_onnx_dir(model_name):
+    return os.path.join(ONNX_MODELS_DIR, f"{model_name.replace('/', '_')}-int8")
+
+
+# ----- Exportación -----
+def export_quantized(model_name, output_dir, opset=14):
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+    pooling = st_model[1]
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Exportar el transformer (sin pooling) con ejes dinámicos de lote y longitud
+    dummy = tokenizer(["hola, quiero reservar una mesa"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    fp32_path = os.path.join(output_dir, "model_fp32.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer, tuple(dummy[name] for name in input_names), fp32_path,
+            input_names=input_names, output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes, opset_version=opset,
+        )
+
+    # Cuantización dinámica de los pesos a int8
+    int8_path = os.path.join(output_dir, "model_int8.onnx")
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+
+    # Guardar tokenizador y configuración del pooling
+    tokenizer.save_pretrained(output_dir)
+    config = {
+        "source_model": model_name,
+        "max_seq_length": st_model.max_seq_length,
+        "pooling_mode": "mean" if pooling.pooling_mode_mean_tokens else "cls",
+        "normalize": any(type(module).__name__ == "Normalize" for module in st_model),
+        "input_names": input_names,
+    }
+    with open(os.path.join(output_dir, "encoder_config.json"), mode="w", encoding="utf-8") as file:
+        json.dump(config, file, indent=2)
+    return int8_path
+
+
+# ----- Encoder ONNX -----
+class OnnxSentenceEncoder:
+    def __init__(self, model_dir, intra_op_threads=None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(model_dir, "encoder_config.json"), mode="r", encoding="utf-8") as file:
+            self.config = json.load(file)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, "model_int8.onnx"), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = self.config["input_names"]
+        self.max_seq_length = self.config["max_seq_length"]
+
+    def _encode_batch(self, texts):
+        # Padding dinámico: cada lote se rellena solo hasta su frase más larga
+        tokens = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np"
+        )
+        feeds = {name: tokens[name].astype(np.int64) for name in self.input_names}
+        hidden = self.session.run(None, feeds)[0]
+        mask = tokens["attention_mask"].astype(np.float32)[..., None]
+        if self.config["pooling_mode"] == "mean":
+            embeddings = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        else:
+            embeddings = hidden[:, 0]
+        if self.config["normalize"]:
+            embeddings = embeddings / np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings.astype(np.float32)
+
+    def encode(self, sentences, batch_size=32, convert_to_tensor=False, convert_to_numpy=True,
+               normalize_embeddings=False, **kwargs):
+        # Misma interfaz que SentenceTransformer.encode (los argumentos extra se ignoran)
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        # Ordenar por longitud para reducir el padding dentro de cada lote
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        embeddings = np.zeros((len(texts), 0), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            batch = self._encode_batch([texts[i] for i in idx])
+            if embeddings.shape[1] == 0:
+                embeddings = np.zeros((len(texts), batch.shape[1]), dtype=np.float32)
+            embeddings[idx] = batch
+        if normalize_embeddings:
+            embeddings = embeddings / np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        if single:
+            embeddings = embeddings[0]
+        if convert_to_tensor:
+            import torch
+            return torch.from_numpy(embeddings)
+        return embeddings
+
+
+# ----- Selección del backend -----
+def encoder_backend():
+    return os.environ.get(BACKEND_ENV, "torch").lower()
+
+
+# Clave del almacén de embeddings: los vectores del modelo cuantizado son distintos
+def encoder_cache_key(model_name, backend=None, model=None):
+    # El cliente del servicio conoce la clave del modelo que carga el servidor
+    if getattr(model, "cache_key", None):
+        return model.cache_key
+    backend = backend or encoder_backend()
+    return model_name if backend == "torch" else f"{model_name}-onnx-int8"
+
+
+# Función para cargar el encoder según el backend (PyTorch fp32 u ONNX int8)
+def load_sentence_encoder(model_name, backend=None):
+    backend = backend or encoder_backend()
+    if backend == "service":
+        from embedding_service import EmbeddingClient
+        return EmbeddingClient()
+    if backend == "onnx":
+        model_dir = os.environ.get(ONNX_DIR_ENV) or default_onnx_dir(model_name)
+        if not os.path.isfile(os.path.join(model_dir, "model_int8.onnx")):
+            raise FileNotFoundError(
+                f"No existe el modelo ONNX en {model_dir}; ejecuta: python onnx_encoder.py export --model {model_name}"
+            )
+        return OnnxSentenceEncoder(model_dir)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+# ----- Informe de calidad y rendimiento -----
+def report(model_name, onnx_dir, data_path, repeats):
+    from dialogue_engine import intents
+    from evaluate_intents import load_labeled
+
+    torch_model = load_sentence_encoder(model_name, backend="torch")
+    onnx_model = OnnxSentenceEncoder(onnx_dir)
+    examples = [(intent, text) for intent, texts in intents.items() for text in texts]
+    queries, _ = load_labeled(data_path)
+    texts = [t for _, t in examples] + queries
+
+    # Concordancia coseno entre los embeddings originales y los cuantizados
+    ref = torch_model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    quant = onnx_model.encode(texts, normalize_embeddings=True)
+    cosine = (ref * quant).sum(axis=1)
+    print(f"Coseno original vs int8: media={cosine.mean():.4f}  min={cosine.min():.4f}  p5={np.percentile(cosine, 5):.4f}")
+
+    # Accuracy de intents en los ejemplos (leave-one-out: vecino más cercano entre los demás ejemplos)
+    labels = [intent for intent, _ in examples]
+    for name, model in (("pytorch fp32", torch_model), ("onnx int8", onnx_model)):
+        emb = model.encode([t for _, t in examples], convert_to_numpy=True, normalize_embeddings=True)
+        sims = emb @ emb.T
+        np.fill_diagonal(sims, -np.inf)
+        accuracy = np.mean([labels[j] == labels[i] for i, j in enumerate(sims.argmax(axis=1))])
+        print(f"Accuracy leave-one-out en los ejemplos ({name}): {accuracy:.3f}")
+
+    # Latencia por consulta y throughput por lotes en CPU
+    for name, model in (("pytorch fp32", torch_model), ("onnx int8", onnx_model)):
+        latencies = []
+        for _ in range(repeats):
+            for q in queries:
+                start = time.perf_counter()
+                model.encode(q)
+                latencies.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            model.encode(texts, batch_size=64)
+        throughput = repeats * len(texts) / (time.perf_counter() - start)
+        latencies.sort()
+        print(f"{name:<13} consulta p50={latencies[len(latencies) // 2]:.2f} ms  "
+              f"p95={latencies[int(len(latencies) * 0.95)]:.2f} ms · lotes: {throughput:.1f} frases/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportación e informe del encoder ONNX int8")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    p_export = subparsers.add_parser("export", help="Exportar y cuantizar el encoder")
+    p_export.add_argument("--model", default="all-MiniLM-L6-v2")
+    p_export.add_argument("--output")
+    p_report = subparsers.add_parser("report", help="Concordancia, accuracy y latencia frente a PyTorch")
+    p_report.add_argument("--model", default="all-MiniLM-L6-v2")
+    p_report.add_argument("--onnx-dir")
+    p_report.add_argument("--data", default=os.path.join(BASE_DIR, "data", "intents_reservas_eval.csv"))
+    p_report.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        path = export_quantized(args.model, args.output or default_onnx_dir(args.model))
+        print(f"Modelo exportado: {path}")
+    else:
+        report(args.model, args.onnx_dir or default_onnx_dir(args.model), args.data, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
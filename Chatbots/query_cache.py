@@ -0,0 +1,156 @@
+'''Caché LRU de embeddings de consultas y codificación por lotes.
+
+El tráfico real de los chatbots está dominado por mensajes cortos repetidos
+("hola", "sí", "cancelar mesa"), así que los embeddings se cachean por texto
+normalizado. Además, MicroBatcher agrupa los mensajes pendientes de varias
+sesiones (cada sesión de Streamlit corre en su propio hilo) en una sola pasada
+del modelo.'''
+
+
+# Importar librerías necesarias
+import re
+import time
+import queue
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+# Función de normalización del texto de la consulta
+def normalize_query(text):
+    # all-MiniLM-L6-v2 no distingue mayúsculas y el tokenizador ignora los
+    # espacios repetidos, así que la normalización no cambia el embedding
+    text = unicodedata.normalize("NFC", text).lower().strip()
+    return re.sub(r"\s+", " ", text)
+
+
+class QueryEmbeddingCache:
+    def __init__(self, model, maxsize=10000):
+        self.model = model
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+    def _get(self, key):
+        # Debe llamarse con el lock adquirido
+        embedding = self._cache.get(key)
+        if embedding is None:
+            self.misses += 1
+            return None
+        self._cache.move_to_end(key)
+        self.hits += 1
+        return embedding
+
+    def _put(self, key, embedding):
+        # Debe llamarse con el lock adquirido
+        self._cache[key] = embedding
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+            self.evictions += 1
+
+    def encode_many(self, texts):
+        # Codifica una lista de textos con una sola llamada al modelo para los fallos
+        keys = [normalize_query(t) for t in texts]
+        results = [None] * len(keys)
+        missing = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                embedding = self._get(key)
+                if embedding is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    results[i] = embedding
+        if missing:
+            missing_keys = list(missing)
+            embeddings = self.model.encode(missing_keys, convert_to_tensor=True)
+            with self._lock:
+                for key, embedding in zip(missing_keys, embeddings):
+                    self._put(key, embedding)
+                    for i in missing[key]:
+                        results[i] = embedding
+        return results
+
+    def encode(self, text):
+        return self.encode_many([text])[0]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+class MicroBatcher:
+    '''Agrupa peticiones concurrentes en lotes para QueryEmbeddingCache.
+
+    Cada llamada a encode() espera como mucho max_wait_ms a que lleguen más
+    mensajes (o a completar max_batch) antes de lanzar una sola pasada.'''
+
+    def __init__(self, cache, max_batch=32, max_wait_ms=5.0):
+        self.cache = cache
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        # Métricas
+        self.batches = 0
+        self.batched_items = 0
+        self._worker = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text):
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, text):
+        return self.submit(text).result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            # Recoger más peticiones hasta llenar el lote o agotar la espera
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            texts = [text for text, _ in batch]
+            try:
+                embeddings = self.cache.encode_many(texts)
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            self.batches += 1
+            self.batched_items += len(batch)
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "avg_batch_size": self.batched_items / self.batches if self.batches else 0.0,
+        }
@@ -0,0 +1,211 @@
+'''Almacén de reservas en SQLite (modo WAL).
+
+Sustituye al antiguo reservas.csv: las escrituras son transaccionales y seguras
+entre sesiones concurrentes, las cancelaciones se guardan en la base de datos,
+las consultas se paginan por clave (sin leer todo el fichero) y hay índices por
+fecha/hora. El CSV antiguo se importa una sola vez, con el número de personas,
+la fecha (dd/mm/aaaa) y la hora normalizados como en las reservas nuevas.'''
+
+
+# Importar librerías necesarias
+import os
+import csv
+import sqlite3
+import threading
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reservations (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    num_personas INTEGER NOT NULL,
+    date         TEXT NOT NULL,
+    time         TEXT NOT NULL,
+    created_at   TEXT NOT NULL,
+    cancelled_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_reservations_date_time ON reservations (date, time);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+COLUMNS = ("id", "num_personas", "date", "time", "created_at", "cancelled_at")
+
+
+def _created_day(created_at):
+    # Día de creación de una reserva (ISO 8601) o None si no se puede leer
+    try:
+        return datetime.fromisoformat(created_at).date()
+    except (TypeError, ValueError):
+        return None
+
+
+class CapacityError(Exception):
+    '''No quedan plazas suficientes en la franja pedida.'''
+
+
+class ReservationStore:
+    def __init__(self, db_path, busy_timeout=5.0):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        # Una conexión por hilo (cada sesión de Streamlit corre en su propio hilo)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        self._normalize_dates()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: las transacciones se abren explícitamente
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, fn):
+        # BEGIN IMMEDIATE toma el bloqueo de escritura al inicio de la transacción
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    # ----- Escritura -----
+    def add(self, reservation, capacity=None):
+        # capacity = (hora_inicio, hora_fin, plazas): comprueba dentro de la misma
+        # transacción que la franja [inicio, fin) no supera las plazas máximas
+        def insert(conn):
+            if capacity is not None:
+                slot_start, slot_end, max_seats = capacity
+                booked = conn.execute(
+                    "SELECT COALESCE(SUM(num_personas), 0) FROM reservations "
+                    "WHERE date = ? AND time >= ? AND time < ? AND cancelled_at IS NULL",
+                    (reservation['date'], slot_start, slot_end),
+                ).fetchone()[0]
+                if booked + int(reservation['num_personas']) > max_seats:
+                    raise CapacityError(f"Quedan {max_seats - booked} plazas el {reservation['date']} a las {slot_start}")
+            cur = conn.execute(
+                "INSERT INTO reservations (num_personas, date, time, created_at) VALUES (?, ?, ?, ?)",
+                (reservation['num_personas'], reservation['date'], reservation['time'],
+                 reservation.get('created_at') or datetime.utcnow().isoformat()),
+            )
+            return cur.lastrowid
+        return self._transaction(insert)
+
+    def cancel(self, reservation_id):
+        # Devuelve la reserva cancelada o None si no existe o ya estaba cancelada
+        def update(conn):
+            row = conn.execute(
+                "SELECT * FROM reservations WHERE id = ? AND cancelled_at IS NULL", (reservation_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            cancelled_at = datetime.utcnow().isoformat()
+            conn.execute("UPDATE reservations SET cancelled_at = ? WHERE id = ?", (cancelled_at, reservation_id))
+            return {**dict(row), "cancelled_at": cancelled_at}
+        return self._transaction(update)
+
+    # ----- Lectura -----
+    def get(self, reservation_id):
+        row = self._conn().execute("SELECT * FROM reservations WHERE id = ?", (reservation_id,)).fetchone()
+        return dict(row) if row else None
+
+    def count(self, include_cancelled=False):
+        sql = "SELECT COUNT(*) FROM reservations"
+        if not include_cancelled:
+            sql += " WHERE cancelled_at IS NULL"
+        return self._conn().execute(sql).fetchone()[0]
+
+    def booked_seats(self, date=None):
+        # Plazas ocupadas por fecha y hora (reservas activas), opcionalmente de una sola fecha
+        where, params = ("AND date = ?", (date,)) if date is not None else ("", ())
+        return self._conn().execute(
+            "SELECT date, time, SUM(num_personas) FROM reservations "
+            f"WHERE cancelled_at IS NULL {where} GROUP BY date, time", params
+        ).fetchall()
+
+    def list_reservations(self, limit=20, before_id=None, date=None, time=None, include_cancelled=False):
+        # Paginación por clave: la siguiente página se pide con before_id = último id recibido
+        clauses, params = [], []
+        if not include_cancelled:
+            clauses.append("cancelled_at IS NULL")
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+        if date is not None:
+            clauses.append("date = ?")
+            params.append(date)
+        if time is not None:
+            clauses.append("time = ?")
+            params.append(time)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn().execute(
+            f"SELECT * FROM reservations {where} ORDER BY id DESC LIMIT ?", (*params, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    # ----- Importación del CSV antiguo -----
+    def import_csv(self, csv_path):
+        # Importa reservas.csv una sola vez (se registra en la tabla meta).
+        # El CSV antiguo guardaba el texto de los slots tal cual (p. ej. "dos" o
+        # "mañana" de spaCy): las filas que no se pueden normalizar se saltan.
+        # Devuelve (filas importadas, filas descartadas)
+        from availability import normalize_date, normalize_time, parse_party_size
+
+        if not os.path.isfile(csv_path):
+            return 0, 0
+        key = f"csv_imported:{os.path.abspath(csv_path)}"
+
+        def do_import(conn):
+            if conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+                return 0, 0
+            rows, skipped = [], 0
+            with open(csv_path, mode='r', newline='', encoding='utf-8') as file:
+                for row in csv.DictReader(file):
+                    created_at = row.get('created_at') or datetime.utcnow().isoformat()
+                    seats = parse_party_size(row.get('num_personas'))
+                    # Las fechas sin año se refieren al año en que se hizo la reserva
+                    date = normalize_date(row.get('date'), today=_created_day(created_at))
+                    time = normalize_time(row.get('time'))
+                    if seats is None or date is None or time is None:
+                        skipped += 1
+                        continue
+                    rows.append((seats, date, time, created_at))
+            conn.executemany(
+                "INSERT INTO reservations (num_personas, date, time, created_at) VALUES (?, ?, ?, ?)", rows
+            )
+            conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, datetime.utcnow().isoformat()))
+            return len(rows), skipped
+        return self._transaction(do_import)
+
+    # ----- Migración: fechas sin año -----
+    def _normalize_dates(self):
+        # Las reservas guardadas antes de normalizar las fechas a dd/mm/aaaa ("10/10")
+        # se reescriben una sola vez, con el año deducido de su fecha de creación
+        from availability import normalize_date
+
+        key = "dates_normalized"
+
+        def migrate(conn):
+            if conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+                return
+            for row in conn.execute("SELECT id, date, created_at FROM reservations").fetchall():
+                date = normalize_date(row['date'], today=_created_day(row['created_at']))
+                if date is not None and date != row['date']:
+                    conn.execute("UPDATE reservations SET date = ? WHERE id = ?", (date, row['id']))
+            conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, datetime.utcnow().isoformat()))
+        self._transaction(migrate)
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,91 @@
+'''Pruebas del motor de diálogo: validación de los slots antes de comprobar la capacidad.'''
+
+
+# Importar librerías necesarias
+from availability import AvailabilityIndex, normalize_date
+from dialogue_engine import DialogueEngine, new_state
+from reservation_store import ReservationStore
+
+
+class FakeNLP:
+    # Devuelve siempre las mismas entidades (sin modelos)
+    def __init__(self, entities=None):
+        self.entities = entities or {}
+
+    def extract_entities(self, user_input, needed=None):
+        return dict(self.entities)
+
+
+def make_engine(tmp_path, entities=None):
+    store = ReservationStore(str(tmp_path / "reservas.db"))
+    return DialogueEngine(FakeNLP(entities), store, AvailabilityIndex.from_store(store))
+
+
+def pending_state(time, num_personas="2"):
+    state = new_state()
+    state['pending_action'] = {"action": "reservar_mesa", "slots": {"num_personas": num_personas, "date": "10/10", "time": time}}
+    return state
+
+
+def test_hora_fuera_del_horario_pide_otra_hora(tmp_path):
+    engine = make_engine(tmp_path, {"TIME": "23:30"})
+    state = pending_state(None)
+
+    response = engine.generate_response(state, None, {}, "a las 23:30")
+
+    assert "23:30" in response and "entre las 12:00 y las 22:30" in response
+    assert "No hay más mesas libres" not in response
+    slots = state['pending_action']['slots']
+    assert slots['time'] is None
+    assert slots['date'] == "10/10"
+    assert state['reservations'] == []
+
+
+def test_hora_no_valida_pide_la_hora_de_nuevo(tmp_path):
+    engine = make_engine(tmp_path)
+    state = pending_state("la hora que prefieras")
+
+    response = engine.confirm_reservation(state)
+
+    assert response.startswith("No he entendido la hora")
+    slots = state['pending_action']['slots']
+    assert slots['time'] is None
+    assert slots['date'] == "10/10"
+
+
+def test_hora_valida_confirma_la_reserva(tmp_path):
+    engine = make_engine(tmp_path)
+    state = pending_state("21:30")
+
+    response = engine.confirm_reservation(state)
+
+    assert response.startswith(f"¡Reserva confirmada para 2 personas el {normalize_date('10/10')} a las 21:30")
+    assert state['pending_action'] is None
+
+
+def test_grupo_mayor_que_la_capacidad_pide_otro_numero_de_personas(tmp_path):
+    engine = make_engine(tmp_path)
+    state = pending_state("21:30", num_personas="45")
+
+    response = engine.confirm_reservation(state)
+
+    assert "máximo es de 40 personas" in response
+    assert "No hay más mesas libres" not in response
+    slots = state['pending_action']['slots']
+    assert slots['num_personas'] is None
+    assert slots['date'] == "10/10" and slots['time'] == "21:30"
+
+
+def test_franja_completada_por_otro_proceso_no_se_vuelve_a_sugerir(tmp_path):
+    # Dos procesos con su propio índice sobre la misma base de datos
+    engine = make_engine(tmp_path)
+    other_store = ReservationStore(str(tmp_path / "reservas.db"))
+    AvailabilityIndex.from_store(other_store).book(other_store, {"num_personas": 40, "date": "10/10", "time": "21:00", "created_at": ""})
+    state = pending_state("21:00")
+
+    response = engine.confirm_reservation(state)
+
+    assert "no quedan mesas" in response
+    assert "La siguiente hora libre es a las 21:30" in response
+    assert engine.availability.remaining("10/10", "21:00") == 0
+    assert state['reservations'] == []
@@ -0,0 +1,56 @@
+'''Pruebas del servicio de embeddings: peticiones mal formadas.'''
+
+
+# Importar librerías necesarias
+import asyncio
+import json
+import socket
+import threading
+import time
+import pytest
+
+np = pytest.importorskip("numpy")
+from embedding_service import EmbeddingClient, EmbeddingServer, HEADER
+
+
+class FakeModel:
+    # Un embedding de dimensión 2 por texto: (longitud, 1)
+    def encode(self, texts, batch_size=None, convert_to_numpy=True):
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def address(tmp_path):
+    address = str(tmp_path / "embeddings.sock")
+    server = EmbeddingServer(FakeModel(), "fake")
+    threading.Thread(target=lambda: asyncio.run(server.serve(address)), daemon=True).start()
+    for _ in range(100):
+        try:
+            socket.socket(socket.AF_UNIX).connect(address)
+            break
+        except OSError:
+            time.sleep(0.05)
+    return address
+
+
+def raw_request(sock, data):
+    sock.sendall(HEADER.pack(len(data)) + data)
+    size = HEADER.unpack(sock.recv(HEADER.size))[0]
+    return json.loads(sock.recv(size))
+
+
+def test_peticiones_mal_formadas_devuelven_error_sin_cerrar_la_conexion(address):
+    sock = socket.socket(socket.AF_UNIX)
+    sock.settimeout(5)
+    sock.connect(address)
+    for data in (b"{no es json", b"[1, 2]", b'{"op": "encode"}', b'{"texts": "hola"}', b'{"texts": []}', b'{"texts": [1]}'):
+        assert "error" in raw_request(sock, data)
+    # La misma conexión sigue atendiendo peticiones válidas
+    assert raw_request(sock, b'{"op": "info"}')["cache_key"] == "fake"
+
+
+def test_el_cliente_recibe_el_error_y_sigue_funcionando(address):
+    client = EmbeddingClient(address)
+    with pytest.raises(RuntimeError, match="texts"):
+        client._request({"texts": None})
+    assert client.encode(["hola", "adiós"]).tolist() == [[4.0, 1.0], [5.0, 1.0]]
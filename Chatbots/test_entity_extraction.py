@@ -0,0 +1,77 @@
+'''Pruebas de la extracción de entidades: regex de los slots y equivalencia con la versión anterior.'''
+
+
+# Importar librerías necesarias
+import pytest
+from bench_chatbots import BOOKING_PHRASES, ner_mismatches
+from entity_extraction import extract_entities, extract_entities_batch, regex_entities, SLOT_ENTITIES
+
+SLOTS = tuple(SLOT_ENTITIES)
+
+# Frase -> (número de personas, fecha, hora) esperados
+EXPECTED_SLOTS = {
+    "Quiero reservar una mesa": (None, None, None),
+    "Reservar para 2 personas mañana por la noche": ("2", None, None),
+    "Necesito una mesa para 4 personas a las 20:00": ("4", None, "20:00"),
+    "Me gustaría reservar una mesa el sábado a las 21": (None, None, "21:00"),
+    "Reserva para 3 el 10/10 a las 19:30": ("3", "10/10", "19:30"),
+    "Somos 6, el 24-12 a las 22h": ("6", "24-12", "22:00"),
+    "para 2": ("2", None, None),
+    "a las 9:30": (None, None, "9:30"),
+    "el 15/08/2025": (None, "15/08/2025", None),
+    "Mesa para 8 pax el 01/01 a las 14:00": ("8", "01/01", "14:00"),
+    "¿Tienen mesa para 10 personas el 3-11 a las 21h30?": ("10", "3-11", "21:30"),
+    "Mañana a las 13": (None, None, "13:00"),
+    "Reservar en el restaurante de Barcelona para 2 el 20/10 a las 20": ("2", "20/10", "20:00"),
+    "No podré ir a la reserva del 5/5": (None, "5/5", None),
+    "a las 23:30": (None, None, "23:30"),
+    "20:00": (None, None, "20:00"),
+}
+
+
+class NoSpacy:
+    # Falla si se llama a spaCy (no debe ejecutarse durante el slot filling)
+    def __call__(self, text):
+        raise AssertionError(f"spaCy no debería ejecutarse para {text!r}")
+
+    def pipe(self, texts, batch_size=None):
+        texts = list(texts)
+        if texts:
+            raise AssertionError(f"spaCy no debería ejecutarse para {texts!r}")
+        return iter(())
+
+
+@pytest.mark.parametrize("phrase, expected", EXPECTED_SLOTS.items())
+def test_regex_rellena_los_slots(phrase, expected):
+    entities = regex_entities(phrase)
+    assert (entities.get("NUM_PERSONAS"), entities.get("DATE"), entities.get("TIME")) == expected
+
+
+def test_slot_filling_no_ejecuta_spacy():
+    for phrase in BOOKING_PHRASES:
+        assert extract_entities(NoSpacy(), phrase, needed=SLOTS) == regex_entities(phrase)
+    assert extract_entities_batch(NoSpacy(), BOOKING_PHRASES, needed=SLOTS) == [regex_entities(p) for p in BOOKING_PHRASES]
+
+
+def test_sin_modelo_de_spacy_solo_regex():
+    # El motor de diálogo no carga spaCy: todas las entidades salen de las regex
+    for phrase in BOOKING_PHRASES:
+        assert extract_entities(None, phrase) == regex_entities(phrase)
+    assert extract_entities_batch(None, BOOKING_PHRASES) == [regex_entities(p) for p in BOOKING_PHRASES]
+
+
+def test_slots_como_la_extraccion_anterior_salvo_cambios_listados():
+    # Regex y slots de la versión anterior (copiados en bench_chatbots.py) frente a los
+    # actuales: solo pueden diferir en INTENDED_SLOT_CHANGES
+    assert ner_mismatches() == []
+
+
+def test_equivalencia_con_la_extraccion_anterior():
+    pytest.importorskip("spacy")
+    from entity_extraction import load_ner_pipeline
+    try:
+        full_nlp = load_ner_pipeline(lean=False)
+        lean_nlp = load_ner_pipeline(lean=True)
+    except OSError:
+        pytest.skip("Modelo es_core_news_sm no instalado")
+    assert ner_mismatches(full_nlp, lean_nlp) == []
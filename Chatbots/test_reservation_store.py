@@ -0,0 +1,78 @@
+'''Pruebas de la importación del CSV antiguo de reservas.'''
+
+
+# Importar librerías necesarias
+import csv
+from availability import AvailabilityIndex, normalize_date
+from reservation_store import ReservationStore
+
+
+def write_csv(path, rows):
+    with open(path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(["num_personas", "date", "time", "created_at"])
+        writer.writerows(rows)
+
+
+def test_import_csv_normaliza_y_descarta_filas_antiguas(tmp_path):
+    csv_file = tmp_path / "reservas.csv"
+    write_csv(csv_file, [
+        ["2", "10/10", "20:00", "2025-01-01T00:00:00"],
+        ["4", "1/2", "9:30", "2025-01-01T00:00:00"],
+        [" 3 ", "5-3-2025", "21", ""],
+        ["dos", "10/10", "20:00", "2025-01-01T00:00:00"],           # CARDINAL de spaCy
+        ["2", "mañana", "20:00", "2025-01-01T00:00:00"],            # DATE de spaCy
+        ["2", "10/10", "la hora que prefieras", "2025-01-01T00:00:00"],
+        ["0", "10/10", "20:00", "2025-01-01T00:00:00"],
+    ])
+    store = ReservationStore(str(tmp_path / "reservas.db"))
+
+    assert store.import_csv(str(csv_file)) == (3, 4)
+    rows = sorted((r['num_personas'], r['date'], r['time']) for r in store.list_reservations())
+    # Las fechas sin año toman el año de created_at
+    assert rows == [(2, "10/10/2025", "20:00"), (3, "05/03/2025", "21:00"), (4, "01/02/2025", "09:30")]
+    assert all(r['created_at'] for r in store.list_reservations())
+
+    # Solo se importa una vez
+    assert store.import_csv(str(csv_file)) == (0, 0)
+    assert store.count() == 3
+
+
+def test_import_csv_coincide_con_el_indice_de_disponibilidad(tmp_path):
+    # La comprobación de capacidad en SQL y el índice deben ver las mismas plazas
+    csv_file = tmp_path / "reservas.csv"
+    write_csv(csv_file, [["30", "1/2", "20:00", ""], ["5", "01/02", "20:15", ""], ["x", "1/2", "20:00", ""]])
+    store = ReservationStore(str(tmp_path / "reservas.db"))
+    store.import_csv(str(csv_file))
+    index = AvailabilityIndex.from_store(store)
+
+    assert index.remaining("01/02", "20:00") == 5
+    booked = store._conn().execute(
+        "SELECT SUM(num_personas) FROM reservations WHERE date = ? AND time >= ? AND time < ?",
+        (normalize_date("01/02"), "20:00", "20:30"),
+    ).fetchone()[0]
+    assert booked == index.seats_per_slot - index.remaining("01/02", "20:00")
+
+
+def test_fechas_sin_anio_y_con_anio_son_el_mismo_dia(tmp_path):
+    store = ReservationStore(str(tmp_path / "reservas.db"))
+    index = AvailabilityIndex.from_store(store)
+    full_date = normalize_date("10/10")
+
+    index.book(store, {"num_personas": 30, "date": "10/10", "time": "20:00", "created_at": ""})
+
+    assert index.remaining(full_date, "20:00") == 10
+    assert [r['date'] for r in store.list_reservations()] == [full_date]
+
+
+def test_migra_las_fechas_sin_anio_de_una_base_anterior(tmp_path):
+    db_path = str(tmp_path / "reservas.db")
+    store = ReservationStore(db_path)
+    store._conn().execute(
+        "INSERT INTO reservations (num_personas, date, time, created_at) VALUES (2, '10/10', '20:00', '2025-03-01T12:00:00')"
+    )
+    store._conn().execute("DELETE FROM meta WHERE key = 'dates_normalized'")
+    store.close()
+
+    store = ReservationStore(db_path)
+    assert [r['date'] for r in store.list_reservations()] == ["10/10/2025"]
@@ -0,0 +1,85 @@
+'''Historial de conversación acotado con transcripción compacta en disco.
+
+En memoria solo se guardan los últimos mensajes (buffer circular); todos los
+mensajes se añaden además a un fichero JSON Lines por sesión (solo append, con
+claves cortas), que se puede leer de forma perezosa para revisar la
+conversación completa sin cargarla entera en memoria.'''
+
+
+# Importar librerías necesarias
+import os
+import json
+import uuid
+from collections import deque
+from itertools import islice
+
+# Directorio por defecto de las transcripciones (junto a los chatbots)
+DEFAULT_TRANSCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "transcripts")
+
+# Claves cortas del formato compacto
+_SHORT_KEYS = {"role": "r", "content": "c", "timestamp": "t", "meta": "m"}
+_LONG_KEYS = {v: k for k, v in _SHORT_KEYS.items()}
+_SHORT_ROLES = {"user": "u", "bot": "b"}
+_LONG_ROLES = {v: k for k, v in _SHORT_ROLES.items()}
+
+
+def _compact(message):
+    record = {_SHORT_KEYS.get(k, k): v for k, v in message.items()}
+    record["r"] = _SHORT_ROLES.get(record.get("r"), record.get("r"))
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+
+
+def _expand(line):
+    record = json.loads(line)
+    message = {_LONG_KEYS.get(k, k): v for k, v in record.items()}
+    message["role"] = _LONG_ROLES.get(message.get("role"), message.get("role"))
+    return message
+
+
+# Función para leer una transcripción de forma perezosa (mensaje a mensaje)
+def iter_transcript(path, start=0, stop=None):
+    if not os.path.isfile(path):
+        return
+    with open(path, mode="r", encoding="utf-8") as file:
+        for line in islice(file, start, stop):
+            yield _expand(line)
+
+
+class BoundedHistory:
+    def __init__(self, max_messages=50, session_id=None, transcripts_dir=DEFAULT_TRANSCRIPTS_DIR):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.transcript_path = os.path.join(transcripts_dir, f"{self.session_id}.jsonl")
+        self._transcripts_dir = transcripts_dir
+        self._recent = deque(maxlen=max_messages)
+        self._total = 0
+
+    def append(self, message):
+        # El mensaje entra en el buffer circular y se añade a la transcripción
+        self._recent.append(message)
+        self._total += 1
+        if self._total == 1:
+            os.makedirs(self._transcripts_dir, exist_ok=True)
+        with open(self.transcript_path, mode="a", encoding="utf-8") as file:
+            file.write(_compact(message) + "\n")
+
+    def tail(self, n):
+        # Últimos n mensajes (solo los que siguen en memoria)
+        if n >= len(self._recent):
+            return list(self._recent)
+        return list(islice(self._recent, len(self._recent) - n, None))
+
+    def __iter__(self):
+        return iter(self._recent)
+
+    def __len__(self):
+        # Número total de mensajes de la sesión (incluidos los que ya no están en memoria)
+        return self._total
+
+    @property
+    def spilled(self):
+        # Mensajes que solo están en la transcripción
+        return self._total - len(self._recent)
+
+    def iter_all(self, start=0, stop=None):
+        # Conversación completa leída de disco de forma perezosa
+        return iter_transcript(self.transcript_path, start, stop)
@@ -0,0 +1,229 @@
+'''Detección de cláusulas de terminación en contratos largos (CUAD) con Longformer.
+
+Aplica el modelo entrenado en Longformer_Contrato_Legal.ipynb a muchos
+contratos sin cargar CUADv1.json entero ni rellenar cada trozo a 4096 tokens:
+  - el JSON se lee de forma incremental, contrato a contrato,
+  - cada contrato se trocea en ventanas solapadas de tokens,
+  - la lista de palabras clave del cuaderno (más sus equivalentes en español)
+    actúa como prefiltro: las ventanas sin ninguna coincidencia no pasan por
+    el modelo (y un contrato sin coincidencias se marca "no" directamente),
+  - las ventanas que quedan se agrupan por longitud con padding dinámico,
+  - los resultados se escriben en JSONL a medida que se procesan.
+
+Un contrato es "sí" si alguna ventana supera el umbral (máximo de las
+probabilidades, como classify_contract del cuaderno).
+
+Uso:
+    python contract_scanner.py CUADv1.json --model longformer-modelo-contratos --output clausulas.jsonl
+    python contract_scanner.py CUADv1.json --model longformer-modelo-contratos --no-prefilter   # referencia
+
+Entorno recomendado: "transformers"'''
+
+
+# Importar librerías necesarias
+import argparse
+import json
+import re
+import time
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from ner_batch import peak_memory_mb
+
+# Palabras clave del cuaderno y equivalentes en español
+KEYWORDS = ["termination", "terminate", "end of contract", "contract end", "cancellation", "cancel",
+            "terminación", "rescisión", "rescindir", "rescindido", "resolución anticipada", "cancelación"]
+KEYWORDS_RE = re.compile("|".join(re.escape(k) for k in sorted(KEYWORDS, key=len, reverse=True)), re.IGNORECASE)
+
+
+# ----- Lectura incremental de CUADv1.json -----
+def iter_cuad_contracts(path, chunk_size=1 << 20):
+    # Recorre los elementos de la lista "data" sin cargar el fichero completo
+    decoder = json.JSONDecoder()
+    with open(path, mode="r", encoding="utf-8") as file:
+        buffer, pos = "", None
+        # Avanzar hasta la apertura de la lista "data"
+        while pos is None:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return
+            buffer += chunk
+            match = re.search(r'"data"\s*:\s*\[', buffer)
+            if match:
+                buffer, pos = buffer[match.end():], 0
+            else:
+                buffer = buffer[-64:]
+        eof = False
+        while True:
+            # Saltar separadores entre elementos
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            try:
+                contract, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Elemento incompleto: leer más
+                chunk = file.read(chunk_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            yield contract
+            pos = end
+
+
+def contract_text(contract):
+    return "\n".join(paragraph["context"] for paragraph in contract["paragraphs"])
+
+
+def contract_label(contract):
+    # Etiqueta de referencia: alguna pregunta de terminación con respuesta
+    return int(any(
+        "termination" in qa["question"].lower() and not qa["is_impossible"]
+        for paragraph in contract["paragraphs"] for qa in paragraph["qas"]
+    ))
+
+
+# ----- Ventanas -----
+def split_windows(n_tokens, window, stride):
+    if n_tokens <= window:
+        return [(0, n_tokens)]
+    step = window - stride
+    starts = list(range(0, n_tokens - window, step)) + [n_tokens - window]
+    return [(start, start + window) for start in starts]
+
+
+class ContractScanner:
+    def __init__(self, model_dir, tokenizer_name="allenai/longformer-base-4096", window=2048, stride=256,
+                 batch_tokens=8192, threshold=0.5, prefilter=True, device="cpu"):
+        self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_dir).to(device).eval()
+        self.device = device
+        # Tokens de contenido por ventana (<s> y </s> aparte)
+        self.window = window - self.tokenizer.num_special_tokens_to_add()
+        self.stride = stride
+        self.batch_tokens = batch_tokens
+        self.threshold = threshold
+        self.prefilter = prefilter
+        # Métricas
+        self.total_windows = 0
+        self.scored_windows = 0
+        self.forward_passes = 0
+
+    def _windows(self, text):
+        encoded = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, truncation=False)
+        ids, offsets = encoded["input_ids"], encoded["offset_mapping"]
+        spans = split_windows(len(ids), self.window, self.stride) if ids else []
+        windows = []
+        for start, end in spans:
+            # Prefiltro barato sobre el texto que cubre la ventana
+            span = text[offsets[start][0]:offsets[end - 1][1]]
+            if self.prefilter and not KEYWORDS_RE.search(span):
+                continue
+            windows.append(ids[start:end])
+        return windows, len(spans)
+
+    @torch.inference_mode()
+    def _score(self, windows):
+        # windows: (ids, índice de contrato); lotes por longitud con padding dinámico
+        windows = sorted(windows, key=lambda w: len(w[0]))
+        scores, batch = [], []
+
+        def flush(batch):
+            sequences = [self.tokenizer.build_inputs_with_special_tokens(ids) for ids, _ in batch]
+            longest = max(len(seq) for seq in sequences)
+            input_ids = torch.full((len(batch), longest), self.tokenizer.pad_token_id, dtype=torch.long)
+            attention_mask = torch.zeros((len(batch), longest), dtype=torch.long)
+            for row, seq in enumerate(sequences):
+                input_ids[row, :len(seq)] = torch.tensor(seq, dtype=torch.long)
+                attention_mask[row, :len(seq)] = 1
+            # Longformer rellena internamente hasta un múltiplo de su ventana de atención
+            logits = self.model(input_ids=input_ids.to(self.device), attention_mask=attention_mask.to(self.device)).logits
+            probs = torch.softmax(logits.float(), dim=-1)[:, 1].cpu().tolist()
+            scores.extend((idx, p) for (_, idx), p in zip(batch, probs))
+            self.forward_passes += 1
+
+        for item in windows:
+            length = len(item[0]) + self.tokenizer.num_special_tokens_to_add()
+            if batch and (len(batch) + 1) * length > self.batch_tokens:
+                flush(batch)
+                batch = []
+            batch.append(item)
+        if batch:
+            flush(batch)
+        return scores
+
+    def scan_block(self, texts):
+        windows, counts = [], []
+        for i, text in enumerate(texts):
+            kept, total = self._windows(text)
+            windows.extend((ids, i) for ids in kept)
+            counts.append((len(kept), total))
+            self.total_windows += total
+            self.scored_windows += len(kept)
+        best = [0.0] * len(texts)
+        for i, p in self._score(windows):
+            best[i] = max(best[i], p)
+        return [
+            {"prediction": "sí" if score > self.threshold else "no", "score": score, "windows": total, "windows_scored": kept}
+            for score, (kept, total) in zip(best, counts)
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detección de cláusulas de terminación en contratos CUAD")
+    parser.add_argument("cuad_json", help="Ruta a CUADv1.json")
+    parser.add_argument("--model", required=True, help="Directorio del modelo entrenado (longformer-modelo-contratos)")
+    parser.add_argument("--tokenizer", default="allenai/longformer-base-4096")
+    parser.add_argument("--output", default="clausulas.jsonl")
+    parser.add_argument("--window", type=int, default=2048, help="Tokens por ventana (max_length del entrenamiento)")
+    parser.add_argument("--stride", type=int, default=256, help="Tokens de solape entre ventanas")
+    parser.add_argument("--batch-tokens", type=int, default=8192, help="Tokens (con padding) por lote")
+    parser.add_argument("--block-size", type=int, default=16, help="Contratos por bloque")
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--no-prefilter", action="store_true", help="Pasar todas las ventanas por el modelo")
+    parser.add_argument("--limit", type=int, help="Procesar solo los N primeros contratos")
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+
+    scanner = ContractScanner(args.model, args.tokenizer, args.window, args.stride, args.batch_tokens,
+                              args.threshold, prefilter=not args.no_prefilter, device=args.device)
+    n_contracts = positives = positives_kept = 0
+    start = time.perf_counter()
+    with open(args.output, mode="w", encoding="utf-8") as output:
+        block = []
+
+        def flush(block):
+            nonlocal positives, positives_kept
+            results = scanner.scan_block([contract_text(c) for c in block])
+            for contract, result in zip(block, results):
+                label = contract_label(contract)
+                positives += label
+                positives_kept += label and result["windows_scored"] > 0
+                output.write(json.dumps({"title": contract.get("title"), "label": label, **result}, ensure_ascii=False) + "\n")
+            output.flush()
+
+        for contract in iter_cuad_contracts(args.cuad_json):
+            if args.limit and n_contracts >= args.limit:
+                break
+            block.append(contract)
+            n_contracts += 1
+            if len(block) == args.block_size:
+                flush(block)
+                block = []
+        if block:
+            flush(block)
+    elapsed = time.perf_counter() - start
+
+    saved = scanner.total_windows - scanner.scored_windows
+    print(f"Contratos: {n_contracts} en {elapsed:.1f} s -> {n_contracts / max(elapsed, 1e-9) * 60:.1f} contratos/min ({args.device})")
+    print(f"Ventanas: {scanner.total_windows} · pasadas por el modelo: {scanner.scored_windows} "
+          f"({saved} ahorradas por el prefiltro, {saved / max(scanner.total_windows, 1):.1%}) en {scanner.forward_passes} lotes")
+    if positives:
+        print(f"Contratos con cláusula no descartados por el prefiltro: {positives_kept}/{positives}")
+    print(f"Pico de memoria: {peak_memory_mb():.0f} MB · resultados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+'''NER por lotes y en streaming sobre corpus grandes de documentos en español.
+
+Mismo modelo que ner.ipynb (mrm8488/bert-spanish-cased-finetuned-ner), pero en
+lugar de llamar al pipeline frase a frase:
+  - lee los documentos de forma perezosa (ficheros .txt con un documento por
+    línea o .jsonl con un campo de texto) y los procesa por bloques,
+  - trocea los documentos largos en ventanas solapadas y, al unirlas, cada
+    token toma la predicción de la ventana en la que está más centrado, así
+    que las entidades que cruzan el corte de una ventana no se parten ni se
+    duplican,
+  - ordena las ventanas por longitud y las agrupa con un presupuesto de tokens
+    por lote (padding dinámico: cada lote se rellena solo hasta su ventana
+    más larga),
+  - escribe los resultados en JSONL a medida que termina cada bloque.
+
+Las entidades tienen el mismo formato que aggregation_strategy="simple"
+(entity_group, score, word, start, end) con offsets de caracteres del documento.
+
+Uso:
+    python ner_batch.py corpus/*.txt --output entidades.jsonl [--batch-tokens 8192] [--stride 64]
+    python ner_batch.py noticias.jsonl --text-field cuerpo --output entidades.jsonl --verify 200
+
+Entorno recomendado: "transformers"'''
+
+
+# Importar librerías necesarias
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import numpy as np
+import torch
+from transformers import AutoTokenizer, AutoModelForTokenClassification
+
+MODEL_NAME = "mrm8488/bert-spanish-cased-finetuned-ner"
+
+
+# ----- Lectura perezosa del corpus -----
+def iter_documents(paths, text_field="text", id_field="id"):
+    # Genera (doc_id, texto) sin cargar los ficheros en memoria
+    for path in paths:
+        jsonl = path.endswith(".jsonl")
+        with open(path, mode="r", encoding="utf-8") as file:
+            for line_no, line in enumerate(file, start=1):
+                if jsonl:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    yield str(record.get(id_field, f"{path}:{line_no}")), record.get(text_field) or ""
+                else:
+                    text = line.rstrip("\r\n")
+                    if text.strip():
+                        yield f"{path}:{line_no}", text
+
+
+def iter_blocks(documents, block_size):
+    block = []
+    for doc in documents:
+        block.append(doc)
+        if len(block) == block_size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+# ----- Ventanas solapadas -----
+def split_windows(n_tokens, window, stride):
+    # Devuelve (inicio, fin, inicio_propio, fin_propio) de cada ventana; cada token
+    # pertenece a una sola ventana: la mitad del solape va a cada lado del corte
+    if n_tokens <= window:
+        return [(0, n_tokens, 0, n_tokens)]
+    step = window - stride
+    starts = list(range(0, n_tokens - window, step)) + [n_tokens - window]
+    windows = []
+    for i, start in enumerate(starts):
+        end = start + window
+        own_start = 0 if i == 0 else (windows[-1][3])
+        own_end = n_tokens if i == len(starts) - 1 else (end + starts[i + 1]) // 2
+        windows.append((start, end, own_start, own_end))
+    return windows
+
+
+# ----- Agrupación de tokens en entidades (equivalente a aggregation_strategy="simple") -----
+def aggregate_entities(text, labels, scores, offsets, id2label):
+    entities, current = [], None
+    for label_id, score, (start, end) in zip(labels, scores, offsets):
+        tag = id2label[int(label_id)]
+        prefix, _, group = tag.partition("-") if "-" in tag else ("", "", tag)
+        if start == end:
+            continue
+        if tag == "O":
+            current = None
+            continue
+        # Un B- abre entidad nueva; un I- continúa la anterior si es del mismo tipo
+        if current and group == current["entity_group"] and prefix != "B":
+            current["end"] = end
+            current["_scores"].append(score)
+            continue
+        current = {"entity_group": group, "start": start, "end": end, "_scores": [score]}
+        entities.append(current)
+    for entity in entities:
+        entity["score"] = float(np.mean(entity.pop("_scores")))
+        entity["word"] = text[entity["start"]:entity["end"]]
+    return [{k: e[k] for k in ("entity_group", "score", "word", "start", "end")} for e in entities]
+
+
+class StreamingNER:
+    def __init__(self, model_name=MODEL_NAME, batch_tokens=8192, stride=64, max_length=None, device="cpu"):
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForTokenClassification.from_pretrained(model_name).to(device).eval()
+        self.device = device
+        self.id2label = self.model.config.id2label
+        self.batch_tokens = batch_tokens
+        max_length = max_length or min(self.tokenizer.model_max_length, self.model.config.max_position_embeddings)
+        # Tokens de contenido por ventana ([CLS] y [SEP] aparte)
+        self.window = max_length - self.tokenizer.num_special_tokens_to_add()
+        self.stride = min(stride, self.window // 2)
+        # Métricas
+        self.windows = 0
+        self.batches = 0
+        self.padded_tokens = 0
+        self.real_tokens = 0
+
+    def _batches(self, items):
+        # items: (longitud, ...) ordenados por longitud; lotes con presupuesto de tokens
+        batch = []
+        for item in items:
+            length = item[0] + self.tokenizer.num_special_tokens_to_add()
+            if batch and (len(batch) + 1) * length > self.batch_tokens:
+                yield batch
+                batch = []
+            batch.append(item)
+        if batch:
+            yield batch
+
+    @torch.inference_mode()
+    def _predict(self, batch):
+        sequences = [self.tokenizer.build_inputs_with_special_tokens(ids) for _, ids, _ in batch]
+        # Padding dinámico: hasta la secuencia más larga del lote
+        longest = max(len(seq) for seq in sequences)
+        input_ids = torch.full((len(sequences), longest), self.tokenizer.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(sequences), longest), dtype=torch.long)
+        for row, seq in enumerate(sequences):
+            input_ids[row, :len(seq)] = torch.tensor(seq, dtype=torch.long)
+            attention_mask[row, :len(seq)] = 1
+        logits = self.model(input_ids=input_ids.to(self.device), attention_mask=attention_mask.to(self.device)).logits
+        scores, labels = torch.softmax(logits, dim=-1).max(dim=-1)
+        self.batches += 1
+        self.padded_tokens += input_ids.numel()
+        self.real_tokens += int(attention_mask.sum())
+        # Quitar [CLS] inicial; el resto de posiciones especiales y de relleno se descartan por longitud
+        return labels[:, 1:].cpu().numpy(), scores[:, 1:].cpu().numpy()
+
+    def process_block(self, block):
+        texts = [text for _, text in block]
+        encoded = self.tokenizer(texts, add_special_tokens=False, return_offsets_mapping=True, truncation=False)
+        n_docs = len(block)
+        doc_labels = [np.zeros(len(ids), dtype=np.int64) for ids in encoded["input_ids"]]
+        doc_scores = [np.zeros(len(ids), dtype=np.float32) for ids in encoded["input_ids"]]
+
+        # Ventanas de todos los documentos del bloque, ordenadas por longitud
+        items = []
+        for d in range(n_docs):
+            ids = encoded["input_ids"][d]
+            for start, end, own_start, own_end in split_windows(len(ids), self.window, self.stride):
+                if end > start:
+                    items.append((end - start, ids[start:end], (d, start, own_start, own_end)))
+        items.sort(key=lambda item: item[0])
+        self.windows += len(items)
+
+        for batch in self._batches(items):
+            labels, scores = self._predict(batch)
+            for row, (length, _, (d, start, own_start, own_end)) in enumerate(batch):
+                # Solo los tokens propios de la ventana pasan al documento
+                a, b = own_start - start, own_end - start
+                doc_labels[d][own_start:own_end] = labels[row, a:b]
+                doc_scores[d][own_start:own_end] = scores[row, a:b]
+
+        return [
+            (doc_id, aggregate_entities(text, doc_labels[d], doc_scores[d], encoded["offset_mapping"][d], self.id2label))
+            for d, (doc_id, text) in enumerate(block)
+        ]
+
+    def run(self, documents, output, block_size=2048):
+        n_docs = 0
+        for block in iter_blocks(documents, block_size):
+            for doc_id, entities in self.process_block(block):
+                output.write(json.dumps({"id": doc_id, "entities": entities}, ensure_ascii=False) + "\n")
+            output.flush()
+            n_docs += len(block)
+        return n_docs
+
+
+# ----- Comparación con el pipeline original -----
+def verify(ner, documents, n):
+    from transformers import pipeline
+    reference = pipeline("ner", model=ner.model, tokenizer=ner.tokenizer, aggregation_strategy="simple",
+                         device=ner.model.device)
+    sample = [doc for doc, _ in zip(documents, range(n))]
+    ours = dict(ner.process_block(sample))
+    matched = total = 0
+    for doc_id, text in sample:
+        expected = {(e["entity_group"], e["start"], e["end"]) for e in reference(text)}
+        got = {(e["entity_group"], e["start"], e["end"]) for e in ours[doc_id]}
+        matched += len(expected & got)
+        total += len(expected | got)
+    print(f"Concordancia con pipeline(aggregation_strategy='simple') en {len(sample)} documentos: "
+          f"{matched / max(total, 1):.3f} ({matched}/{total} entidades)")
+
+
+def peak_memory_mb():
+    # Pico de memoria residente del proceso
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1024 ** 2
+
+
+def expand_paths(patterns):
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True))
+        paths.extend(m for m in matches if os.path.isfile(m))
+        if not matches and os.path.isfile(pattern):
+            paths.append(pattern)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NER en streaming y por lotes sobre un corpus de documentos")
+    parser.add_argument("inputs", nargs="+", help="Ficheros .txt (un documento por línea) o .jsonl; admite globs")
+    parser.add_argument("--output", default="entidades.jsonl")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--text-field", default="text", help="Campo de texto en los .jsonl")
+    parser.add_argument("--id-field", default="id", help="Campo identificador en los .jsonl")
+    parser.add_argument("--batch-tokens", type=int, default=8192, help="Tokens (con padding) por lote")
+    parser.add_argument("--block-size", type=int, default=2048, help="Documentos en memoria a la vez")
+    parser.add_argument("--stride", type=int, default=64, help="Tokens de solape entre ventanas")
+    parser.add_argument("--max-length", type=int, help="Longitud máxima de ventana (por defecto, la del modelo)")
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--threads", type=int, help="Hilos de PyTorch en CPU")
+    parser.add_argument("--verify", type=int, default=0, help="Comparar los N primeros documentos con el pipeline")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    paths = expand_paths(args.inputs)
+    if not paths:
+        parser.error("No se ha encontrado ningún fichero de entrada")
+    ner = StreamingNER(args.model, batch_tokens=args.batch_tokens, stride=args.stride,
+                       max_length=args.max_length, device=args.device)
+    if args.verify:
+        verify(ner, iter_documents(paths, args.text_field, args.id_field), args.verify)
+
+    start = time.perf_counter()
+    with open(args.output, mode="w", encoding="utf-8") as output:
+        n_docs = ner.run(iter_documents(paths, args.text_field, args.id_field), output, args.block_size)
+    elapsed = time.perf_counter() - start
+
+    print(f"Documentos: {n_docs} en {elapsed:.1f} s -> {n_docs / max(elapsed, 1e-9):.1f} docs/s ({args.device})")
+    print(f"Ventanas: {ner.windows} en {ner.batches} lotes · tokens reales/con padding: "
+          f"{ner.real_tokens / max(ner.padded_tokens, 1):.1%}")
+    print(f"Pico de memoria: {peak_memory_mb():.0f} MB · resultados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+'''Puntuación masiva de sentimiento en CSV con SaBERT y un pool de procesos.
+
+Mismo modelo que class_sentimiento.ipynb
+(VerificadoProfesional/SaBERT-Spanish-Sentiment-Analysis), pensado para
+columnas de reseñas en CSV de varios GB:
+  - el CSV se lee por trozos (pandas, chunksize), nunca entero,
+  - el modelo se carga una vez en el proceso principal y los workers se crean
+    con fork, así que comparten sus pesos copy-on-write; en Windows (sin fork)
+    y en macOS (donde fork no es seguro con torch ni con el runtime de
+    Objective-C) se usa spawn y cada worker carga su propia copia,
+  - cada worker ordena su lote por longitud y lo procesa en micro-lotes con
+    padding dinámico, con un hilo de PyTorch por worker,
+  - las columnas label/score se escriben a medida que terminan los lotes y en
+    el orden de entrada, con un número acotado de lotes en vuelo.
+
+Uso:
+    python sentiment_bulk.py score resenas.csv --text-column review --output resenas_sentimiento.csv --workers 8
+    python sentiment_bulk.py bench resenas.csv --text-column review --workers 1,2,4,8 --rows 5000
+
+Entorno recomendado: "transformers"'''
+
+
+# Importar librerías necesarias
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+MODEL_NAME = "VerificadoProfesional/SaBERT-Spanish-Sentiment-Analysis"
+LABELS = ["Negativo", "Positivo"]
+
+# Modelo del proceso (heredado por los workers tras el fork)
+_model = None
+_tokenizer = None
+_micro_batch = 32
+
+
+def use_fork():
+    # fork solo en Linux/Unix: en macOS existe pero no es seguro con torch
+    return sys.platform != "darwin" and "fork" in mp.get_all_start_methods()
+
+
+def load_model(model_name=MODEL_NAME):
+    global _model, _tokenizer
+    _tokenizer = AutoTokenizer.from_pretrained(model_name)
+    _model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+    return _model, _tokenizer
+
+
+def label_names(model):
+    # Etiquetas legibles: las del modelo si no son genéricas, si no las del cuaderno
+    id2label = model.config.id2label
+    names = [id2label[i] for i in range(len(id2label))]
+    return LABELS if all(name.startswith("LABEL_") for name in names) else names
+
+
+def _init_worker(model_name, micro_batch, forked):
+    global _micro_batch
+    _micro_batch = micro_batch
+    # Un hilo por worker: el paralelismo lo da el pool
+    torch.set_num_threads(1)
+    if not forked:
+        load_model(model_name)
+
+
+@torch.inference_mode()
+def score_texts(texts):
+    # Devuelve (índices de clase, probabilidades) en el orden de entrada
+    order = np.argsort([len(t) for t in texts], kind="stable")
+    classes = np.zeros(len(texts), dtype=np.int64)
+    scores = np.zeros(len(texts), dtype=np.float32)
+    for start in range(0, len(texts), _micro_batch):
+        idx = order[start:start + _micro_batch]
+        # Padding dinámico: cada micro-lote se rellena hasta su texto más largo
+        inputs = _tokenizer([texts[i] for i in idx], return_tensors="pt", truncation=True, padding=True, max_length=512)
+        probs = torch.softmax(_model(**inputs).logits, dim=-1)
+        best, cls = probs.max(dim=-1)
+        classes[idx] = cls.numpy()
+        scores[idx] = best.numpy()
+    return classes, scores
+
+
+def iter_batches(path, text_column, chunksize, batch_size, nrows=None):
+    # Trozos del CSV divididos en lotes para el pool
+    for chunk in pd.read_csv(path, chunksize=chunksize, nrows=nrows):
+        chunk[text_column] = chunk[text_column].fillna("").astype(str)
+        for start in range(0, len(chunk), batch_size):
+            yield chunk.iloc[start:start + batch_size]
+
+
+def score_csv(path, output, text_column, workers, model_name=MODEL_NAME, chunksize=50000, batch_size=256,
+              micro_batch=32, nrows=None):
+    forked = use_fork()
+    if _model is None:
+        load_model(model_name)
+    names = np.array(label_names(_model))
+    ctx = mp.get_context("fork" if forked else "spawn")
+    rows = 0
+    header = True
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(model_name, micro_batch, forked)) as pool:
+        in_flight = deque()
+
+        def write_head():
+            nonlocal rows, header
+            frame, result = in_flight.popleft()
+            classes, scores = result.get()
+            frame = frame.assign(label=names[classes], score=np.round(scores, 4))
+            frame.to_csv(output, mode="w" if header else "a", header=header, index=False)
+            header = False
+            rows += len(frame)
+
+        for frame in iter_batches(path, text_column, chunksize, batch_size, nrows):
+            in_flight.append((frame, pool.apply_async(score_texts, (frame[text_column].tolist(),))))
+            # Acotar la memoria: como mucho dos lotes en vuelo por worker
+            if len(in_flight) >= 2 * workers:
+                write_head()
+        while in_flight:
+            write_head()
+    return rows
+
+
+def bench(args):
+    load_model(args.model)
+    results = []
+    for workers in [int(w) for w in args.workers.split(",")]:
+        start = time.perf_counter()
+        rows = score_csv(args.csv, os.devnull, args.text_column, workers, args.model, args.chunksize,
+                         args.batch_size, args.micro_batch, nrows=args.rows)
+        rate = rows / (time.perf_counter() - start)
+        results.append((workers, rate))
+        print(f"{workers:>3} workers: {rate:8.1f} filas/s ({rate / results[0][1]:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sentimiento masivo en CSV con SaBERT")
+    parser.add_argument("command", choices=["score", "bench"])
+    parser.add_argument("csv", help="CSV de entrada")
+    parser.add_argument("--text-column", required=True, help="Columna con el texto a puntuar")
+    parser.add_argument("--output", help="CSV de salida (por defecto, <entrada>_sentimiento.csv)")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--workers", default=str(os.cpu_count()),
+                        help="Procesos del pool (en bench, lista separada por comas, p. ej. 1,2,4,8)")
+    parser.add_argument("--chunksize", type=int, default=50000, help="Filas leídas del CSV a la vez")
+    parser.add_argument("--batch-size", type=int, default=256, help="Filas por tarea del pool")
+    parser.add_argument("--micro-batch", type=int, default=32, help="Textos por pasada del modelo")
+    parser.add_argument("--rows", type=int, default=5000, help="Filas usadas en bench")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        bench(args)
+        return
+
+    output = args.output or f"{os.path.splitext(args.csv)[0]}_sentimiento.csv"
+    start = time.perf_counter()
+    rows = score_csv(args.csv, output, args.text_column, int(args.workers), args.model, args.chunksize,
+                     args.batch_size, args.micro_batch)
+    elapsed = time.perf_counter() - start
+    print(f"Filas: {rows} en {elapsed:.1f} s -> {rows / max(elapsed, 1e-9):.1f} filas/s con {args.workers} workers")
+    print(f"Resultados en {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+'''Fine-tuning de RoBERTuito sobre TASS con padding dinámico y lotes por longitud.
+
+TASS_Sent.ipynb tokeniza los titulares con padding="max_length" a
+tokenizer.model_max_length, así que casi todos los tokens que procesa el
+Trainer son relleno. Este script entrena y evalúa el mismo modelo con:
+  - --padding dynamic: tokenización sin relleno, DataCollatorWithPadding
+    (cada lote se rellena solo hasta su titular más largo) y
+    group_by_length=True (lotes de titulares de longitud parecida),
+  - --padding max_length: el comportamiento del cuaderno, como referencia,
+  - el dataset tokenizado se guarda en disco (tass_cache/) y se reutiliza.
+
+Mide tokens/s (reales y con relleno) y el tiempo de entrenamiento de cada
+época (sin las evaluaciones ni los checkpoints intermedios); "compare" ejecuta
+los dos modos con la misma semilla y los mismos pasos (sin early stopping ni
+checkpoints) y muestra las métricas finales de ambos.
+
+Uso:
+    python tass_finetune.py train --padding dynamic [--epochs 3]
+    python tass_finetune.py compare --epochs 1 [--train-samples 2000]
+
+Entorno recomendado: "hf_env"'''
+
+
+# Importar librerías necesarias
+import argparse
+import os
+import time
+import numpy as np
+from datasets import load_dataset, load_from_disk
+from transformers import (AutoTokenizer, AutoModelForSequenceClassification, DataCollatorWithPadding,
+                          EarlyStoppingCallback, Trainer, TrainerCallback, TrainingArguments, default_data_collator,
+                          set_seed)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_NAME = "pysentimiento/robertuito-sentiment-analysis"
+DATASET_NAME = "pysentimiento/spanish-targeted-sentiment-headlines"
+CACHE_DIR = os.path.join(BASE_DIR, "tass_cache")
+SEED = 12
+
+
+# ----- Dataset tokenizado en caché -----
+def load_tokenized(tokenizer, padding, cache_dir=CACHE_DIR):
+    max_length = tokenizer.model_max_length
+    path = os.path.join(cache_dir, f"{MODEL_NAME.replace('/', '_')}-{padding}-{max_length}")
+    if os.path.isdir(path):
+        return load_from_disk(path)
+
+    def tokenize_function(examples):
+        if padding == "max_length":
+            tokens = tokenizer(examples["titulo"], padding="max_length", truncation=True, max_length=max_length)
+        else:
+            # Sin relleno: el collator rellena cada lote hasta su secuencia más larga
+            tokens = tokenizer(examples["titulo"], truncation=True, max_length=max_length)
+        # Longitud real precalculada para group_by_length
+        tokens["length"] = [sum(mask) for mask in tokens["attention_mask"]]
+        return tokens
+
+    dataset = load_dataset(DATASET_NAME)
+    tokenized = dataset.map(tokenize_function, batched=True, remove_columns=[c for c in dataset["train"].column_names if c != "label"])
+    tokenized.save_to_disk(path)
+    return tokenized
+
+
+# ----- Métricas (las del cuaderno) -----
+_metrics = {}
+
+
+def load_metrics():
+    # Se cargan en la primera evaluación, no al importar el módulo
+    if not _metrics:
+        import evaluate
+        for name in ("accuracy", "f1", "precision", "recall"):
+            _metrics[name] = evaluate.load(name)
+    return _metrics
+
+
+def compute_metrics(eval_pred):
+    accuracy, f1, precision, recall = (load_metrics()[name] for name in ("accuracy", "f1", "precision", "recall"))
+    logits, labels = eval_pred
+    predictions = logits.argmax(axis=-1)
+    return {
+        "accuracy": accuracy.compute(predictions=predictions, references=labels)["accuracy"],
+        "f1": f1.compute(predictions=predictions, references=labels, average="macro")["f1"],
+        "precision": precision.compute(predictions=predictions, references=labels, average="weighted")["precision"],
+        "recall": recall.compute(predictions=predictions, references=labels, average="weighted")["recall"],
+    }
+
+
+# ----- Medición de tokens y tiempos -----
+class CountingTrainer(Trainer):
+    # Cuenta los tokens reales y con relleno de los lotes de entrenamiento (el
+    # collator también lo usa la evaluación, así que se cuenta aquí y no en él)
+    real_tokens = 0
+    padded_tokens = 0
+
+    def training_step(self, model, inputs, *args, **kwargs):
+        self.padded_tokens += inputs["input_ids"].numel()
+        self.real_tokens += int(inputs["attention_mask"].sum())
+        return super().training_step(model, inputs, *args, **kwargs)
+
+
+class EpochTimer(TrainerCallback):
+    # Suma solo el tiempo de los pasos de entrenamiento: las evaluaciones y los
+    # checkpoints se ejecutan después de on_step_end y quedan fuera
+    def __init__(self):
+        self.trainer = None
+        self.epochs = []
+
+    def on_epoch_begin(self, args, state, control, **kwargs):
+        self._seconds, self._steps = 0.0, 0
+        self._real, self._padded = self.trainer.real_tokens, self.trainer.padded_tokens
+
+    def on_step_begin(self, args, state, control, **kwargs):
+        self._step_start = time.perf_counter()
+
+    def on_step_end(self, args, state, control, **kwargs):
+        self._seconds += time.perf_counter() - self._step_start
+        self._steps += 1
+
+    def on_epoch_end(self, args, state, control, **kwargs):
+        if not self._steps:
+            return
+        real = self.trainer.real_tokens - self._real
+        padded = self.trainer.padded_tokens - self._padded
+        self.epochs.append({"seconds": self._seconds, "steps": self._steps,
+                            # Época cortada por el early stopping: no se promedia
+                            "partial": self._steps < state.max_steps // args.num_train_epochs,
+                            "real_tokens_s": real / self._seconds, "padded_tokens_s": padded / self._seconds,
+                            "padding_ratio": 1 - real / max(padded, 1)})
+
+
+def train(padding, args, same_steps=False):
+    # same_steps: sin early stopping ni checkpoints intermedios, para que los dos
+    # modos de "compare" entrenen exactamente los mismos pasos
+    set_seed(SEED)
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    tokenized = load_tokenized(tokenizer, padding)
+    train_dataset, eval_dataset = tokenized["train"], tokenized["test"]
+    if args.train_samples:
+        train_dataset = train_dataset.shuffle(seed=SEED).select(range(min(args.train_samples, len(train_dataset))))
+    if args.eval_samples:
+        eval_dataset = eval_dataset.select(range(min(args.eval_samples, len(eval_dataset))))
+    num_labels = len(tokenized["train"].unique("label"))
+    model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME, num_labels=num_labels)
+
+    dynamic = padding == "dynamic"
+    collator = DataCollatorWithPadding(tokenizer) if dynamic else default_data_collator
+    timer = EpochTimer()
+    schedule = {"eval_strategy": "no", "save_strategy": "no"} if same_steps else {
+        "eval_strategy": "steps",        # Mismo calendario que el cuaderno: evaluar
+        "eval_steps": 100,               # y guardar cada 100 pasos
+        "save_strategy": "steps",
+        "save_steps": 100,
+        "load_best_model_at_end": True,
+        "metric_for_best_model": "f1",
+        "greater_is_better": True,
+    }
+    training_args = TrainingArguments(
+        output_dir=os.path.join(args.output_dir, padding),
+        num_train_epochs=args.epochs,
+        learning_rate=2e-5,
+        per_device_train_batch_size=16,
+        per_device_eval_batch_size=16,
+        weight_decay=0.01,
+        seed=SEED,
+        group_by_length=dynamic,         # Lotes de titulares de longitud parecida
+        length_column_name="length",     # Longitudes precalculadas en la caché
+        remove_unused_columns=True,
+        report_to=[],
+        **schedule,
+    )
+    trainer = CountingTrainer(
+        model=model,
+        args=training_args,
+        train_dataset=train_dataset,
+        eval_dataset=eval_dataset,
+        data_collator=collator,
+        compute_metrics=compute_metrics,
+        callbacks=[timer] if same_steps else [timer, EarlyStoppingCallback(early_stopping_patience=3)],
+    )
+    timer.trainer = trainer
+    trainer.train()
+
+    # Evaluación final cronometrada
+    start = time.perf_counter()
+    metrics = trainer.evaluate()
+    eval_seconds = time.perf_counter() - start
+    if args.save:
+        trainer.save_model(os.path.join(BASE_DIR, "tass-sentiment-model"))
+        tokenizer.save_pretrained(os.path.join(BASE_DIR, "tass-sentiment-model"))
+    return {"epochs": timer.epochs, "eval_seconds": eval_seconds, "metrics": metrics}
+
+
+def print_result(padding, result):
+    for i, epoch in enumerate(result["epochs"], start=1):
+        partial = " (parcial)" if epoch["partial"] else ""
+        print(f"[{padding}] época {i}{partial}: {epoch['seconds']:.1f} s en {epoch['steps']} pasos · "
+              f"{epoch['real_tokens_s']:.0f} tokens reales/s · {epoch['padded_tokens_s']:.0f} tokens procesados/s · "
+              f"relleno {epoch['padding_ratio']:.1%}")
+    metrics = result["metrics"]
+    print(f"[{padding}] evaluación: {result['eval_seconds']:.1f} s · accuracy={metrics['eval_accuracy']:.4f}  "
+          f"f1={metrics['eval_f1']:.4f}  precision={metrics['eval_precision']:.4f}  recall={metrics['eval_recall']:.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fine-tuning de RoBERTuito sobre TASS con padding dinámico")
+    parser.add_argument("command", choices=["train", "compare"])
+    parser.add_argument("--padding", choices=["dynamic", "max_length"], default="dynamic")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--train-samples", type=int, help="Subconjunto de entrenamiento para comparaciones rápidas")
+    parser.add_argument("--eval-samples", type=int)
+    parser.add_argument("--output-dir", default=os.path.join(BASE_DIR, "results"))
+    parser.add_argument("--save", action="store_true", help="Guardar el modelo en tass-sentiment-model/")
+    args = parser.parse_args()
+
+    if args.command == "train":
+        print_result(args.padding, train(args.padding, args))
+        return
+
+    results = {padding: train(padding, args, same_steps=True) for padding in ("max_length", "dynamic")}
+    for padding, result in results.items():
+        print_result(padding, result)
+    before, after = results["max_length"], results["dynamic"]
+    speedup = (np.mean([e["seconds"] for e in before["epochs"] if not e["partial"]])
+               / np.mean([e["seconds"] for e in after["epochs"] if not e["partial"]]))
+    print(f"Época {speedup:.1f}x más rápida · evaluación {before['eval_seconds'] / after['eval_seconds']:.1f}x más rápida · "
+          f"Δf1={after['metrics']['eval_f1'] - before['metrics']['eval_f1']:+.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+'''Clasificación zero-shot de noticias por lotes (facebook/bart-large-mnli).
+
+El pipeline "zero-shot-classification" de class_noticias.ipynb procesa cada
+noticia por separado y hace una pasada premisa-hipótesis por cada etiqueta.
+Aquí:
+  - las hipótesis ("This example is Política.", ...) se tokenizan una sola vez
+    y cada noticia se tokeniza una sola vez, aunque se combine con todas las
+    etiquetas,
+  - los pares noticia×etiqueta de muchas noticias se ordenan por longitud y se
+    agrupan con un presupuesto de tokens por lote (padding dinámico),
+  - opcionalmente (--prune-k) se hace una primera pasada barata con el
+    principio de cada noticia y solo las k mejores etiquetas se puntúan con la
+    noticia completa,
+  - los resultados se escriben en JSONL a medida que termina cada bloque.
+
+Las puntuaciones son las del pipeline: softmax de los logits de "entailment"
+entre etiquetas (o entailment frente a contradiction por etiqueta con
+--multi-label). Con --prune-k, las puntuaciones son solo de las k etiquetas
+que sobreviven.
+
+Uso:
+    python zero_shot_batch.py classify noticias.jsonl --text-field texto --output clases.jsonl [--prune-k 2]
+    python zero_shot_batch.py bench noticias.txt --articles 200
+
+Entorno recomendado: "transformers"'''
+
+
+# Importar librerías necesarias
+import argparse
+import json
+import time
+import numpy as np
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from ner_batch import iter_documents, iter_blocks, expand_paths, peak_memory_mb
+
+MODEL_NAME = "facebook/bart-large-mnli"
+LABELS = ["Política", "Economía", "Deportes", "Tecnología", "Salud"]
+HYPOTHESIS_TEMPLATE = "This example is {}."
+
+
+class BatchZeroShotClassifier:
+    def __init__(self, labels=LABELS, model_name=MODEL_NAME, hypothesis_template=HYPOTHESIS_TEMPLATE,
+                 batch_tokens=16384, max_length=None, multi_label=False, device="cpu"):
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_name).to(device).eval()
+        self.device = device
+        self.labels = list(labels)
+        self.multi_label = multi_label
+        self.batch_tokens = batch_tokens
+        self.max_length = max_length or min(self.tokenizer.model_max_length, self.model.config.max_position_embeddings)
+        # Índices de entailment y contradiction en la salida del modelo NLI
+        label2id = {k.lower(): v for k, v in self.model.config.label2id.items()}
+        self.entail_id = next(v for k, v in label2id.items() if k.startswith("entail"))
+        self.contra_id = next(v for k, v in label2id.items() if k.startswith("contra"))
+        # Hipótesis tokenizadas una sola vez
+        self.hypotheses = [
+            self.tokenizer(hypothesis_template.format(label), add_special_tokens=False)["input_ids"] for label in self.labels
+        ]
+        self.n_special = self.tokenizer.num_special_tokens_to_add(pair=True)
+        # Métricas
+        self.pairs = 0
+        self.batches = 0
+        self.padded_tokens = 0
+        self.real_tokens = 0
+
+    def _batches(self, pairs):
+        # pairs ordenados por longitud; lotes con presupuesto de tokens (con padding)
+        batch = []
+        for pair in pairs:
+            if batch and (len(batch) + 1) * len(pair[0]) > self.batch_tokens:
+                yield batch
+                batch = []
+            batch.append(pair)
+        if batch:
+            yield batch
+
+    @torch.inference_mode()
+    def _logits(self, pairs):
+        # pairs: (input_ids, clave); devuelve {clave: logits de la clase entailment/contradiction}
+        pairs = sorted(pairs, key=lambda pair: len(pair[0]))
+        results = {}
+        for batch in self._batches(pairs):
+            longest = len(batch[-1][0])
+            input_ids = torch.full((len(batch), longest), self.tokenizer.pad_token_id, dtype=torch.long)
+            attention_mask = torch.zeros((len(batch), longest), dtype=torch.long)
+            for row, (ids, _) in enumerate(batch):
+                input_ids[row, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+                attention_mask[row, :len(ids)] = 1
+            logits = self.model(input_ids=input_ids.to(self.device), attention_mask=attention_mask.to(self.device)).logits
+            logits = logits[:, [self.contra_id, self.entail_id]].float().cpu().numpy()
+            for (_, key), row in zip(batch, logits):
+                results[key] = row
+            self.pairs += len(batch)
+            self.batches += 1
+            self.padded_tokens += input_ids.numel()
+            self.real_tokens += int(attention_mask.sum())
+        return results
+
+    def _pair(self, premise_ids, label_idx, premise_tokens=None):
+        hypothesis = self.hypotheses[label_idx]
+        # Truncar solo la premisa (como truncation="only_first" del pipeline)
+        limit = self.max_length - self.n_special - len(hypothesis)
+        if premise_tokens:
+            limit = min(limit, premise_tokens)
+        return self.tokenizer.build_inputs_with_special_tokens(premise_ids[:limit], hypothesis)
+
+    def _scores(self, logits):
+        # logits: matriz (etiquetas, [contradiction, entailment])
+        if self.multi_label:
+            exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+            return exp[:, 1] / exp.sum(axis=1)
+        entail = logits[:, 1]
+        exp = np.exp(entail - entail.max())
+        return exp / exp.sum()
+
+    def classify_block(self, texts, prune_k=None, prune_tokens=64):
+        premises = self.tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+        candidates = [list(range(len(self.labels))) for _ in premises]
+
+        # Primera pasada barata: principio de la noticia contra todas las etiquetas
+        if prune_k and prune_k < len(self.labels):
+            logits = self._logits([
+                (self._pair(ids, j, prune_tokens), (i, j)) for i, ids in enumerate(premises) for j in candidates[i]
+            ])
+            for i in range(len(premises)):
+                entail = np.array([logits[(i, j)][1] for j in candidates[i]])
+                candidates[i] = sorted(np.argsort(-entail)[:prune_k].tolist())
+
+        logits = self._logits([(self._pair(ids, j), (i, j)) for i, ids in enumerate(premises) for j in candidates[i]])
+        results = []
+        for i, labels in enumerate(candidates):
+            scores = self._scores(np.array([logits[(i, j)] for j in labels]))
+            order = np.argsort(-scores)
+            results.append({
+                "labels": [self.labels[labels[k]] for k in order],
+                "scores": [float(scores[k]) for k in order],
+            })
+        return results
+
+    def run(self, documents, output, block_size=256, prune_k=None, prune_tokens=64):
+        n_docs = 0
+        for block in iter_blocks(documents, block_size):
+            for (doc_id, _), result in zip(block, self.classify_block([t for _, t in block], prune_k, prune_tokens)):
+                output.write(json.dumps({"id": doc_id, **result}, ensure_ascii=False) + "\n")
+            output.flush()
+            n_docs += len(block)
+        return n_docs
+
+
+# ----- Benchmark: pipeline noticia a noticia frente a lotes -----
+def bench(args, classifier):
+    from transformers import pipeline
+    documents = [text for _, text in iter_documents(expand_paths(args.inputs), args.text_field, args.id_field)]
+    documents = documents[:args.articles]
+    reference = pipeline("zero-shot-classification", model=classifier.model, tokenizer=classifier.tokenizer,
+                         device=classifier.model.device)
+
+    start = time.perf_counter()
+    expected = [reference(text, candidate_labels=classifier.labels, hypothesis_template=args.template,
+                          multi_label=args.multi_label)["labels"][0] for text in documents]
+    pipeline_rate = len(documents) / (time.perf_counter() - start)
+    print(f"pipeline por noticia     {pipeline_rate:8.2f} noticias/s")
+
+    for name, prune_k in (("lotes", None), (f"lotes + prune-k {args.prune_k or 2}", args.prune_k or 2)):
+        start = time.perf_counter()
+        got = []
+        for block in iter_blocks(documents, args.block_size):
+            got.extend(r["labels"][0] for r in classifier.classify_block(block, prune_k, args.prune_tokens))
+        rate = len(documents) / (time.perf_counter() - start)
+        agreement = np.mean([a == b for a, b in zip(expected, got)])
+        print(f"{name:<24} {rate:8.2f} noticias/s ({rate / pipeline_rate:.1f}x) · misma etiqueta top-1: {agreement:.3f}")
+    print(f"Pico de memoria: {peak_memory_mb():.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clasificación zero-shot de noticias por lotes")
+    parser.add_argument("command", choices=["classify", "bench"])
+    parser.add_argument("inputs", nargs="+", help="Ficheros .txt (una noticia por línea) o .jsonl; admite globs")
+    parser.add_argument("--output", default="clases.jsonl")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--labels", nargs="+", default=LABELS)
+    parser.add_argument("--template", default=HYPOTHESIS_TEMPLATE, help="Plantilla de la hipótesis")
+    parser.add_argument("--multi-label", action="store_true")
+    parser.add_argument("--text-field", default="text", help="Campo de texto en los .jsonl")
+    parser.add_argument("--id-field", default="id", help="Campo identificador en los .jsonl")
+    parser.add_argument("--batch-tokens", type=int, default=16384, help="Tokens (con padding) por lote")
+    parser.add_argument("--block-size", type=int, default=256, help="Noticias en memoria a la vez")
+    parser.add_argument("--prune-k", type=int, help="Puntuar con la noticia completa solo las k mejores etiquetas")
+    parser.add_argument("--prune-tokens", type=int, default=64, help="Tokens de la noticia en la primera pasada")
+    parser.add_argument("--articles", type=int, default=200, help="Noticias del benchmark")
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--threads", type=int, help="Hilos de PyTorch en CPU")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    classifier = BatchZeroShotClassifier(args.labels, args.model, args.template, batch_tokens=args.batch_tokens,
+                                         multi_label=args.multi_label, device=args.device)
+    if args.command == "bench":
+        bench(args, classifier)
+        return
+
+    paths = expand_paths(args.inputs)
+    if not paths:
+        parser.error("No se ha encontrado ningún fichero de entrada")
+    start = time.perf_counter()
+    with open(args.output, mode="w", encoding="utf-8") as output:
+        n_docs = classifier.run(iter_documents(paths, args.text_field, args.id_field), output,
+                                args.block_size, args.prune_k, args.prune_tokens)
+    elapsed = time.perf_counter() - start
+    print(f"Noticias: {n_docs} en {elapsed:.1f} s -> {n_docs / max(elapsed, 1e-9):.2f} noticias/s ({args.device})")
+    print(f"Pares noticia×etiqueta: {classifier.pairs} en {classifier.batches} lotes · tokens reales/con padding: "
+          f"{classifier.real_tokens / max(classifier.padded_tokens, 1):.1%}")
+    print(f"Pico de memoria: {peak_memory_mb():.0f} MB · resultados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
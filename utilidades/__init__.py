@@ -0,0 +1,3 @@
+#Utilidades compartidas por los proyectos del repositorio
+#Cada módulo se importa por separado (utilidades.encoding, utilidades.artifacts) para que
+#las apps no carguen dependencias que no usan
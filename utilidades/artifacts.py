@@ -0,0 +1,262 @@
+#Cargador de artefactos (modelos, escaladores, datos) a partir de un manifiesto
+#
+#Las apps ya no usan rutas absolutas: cada artefacto se declara en artifacts.json
+#(raíz del repositorio) con su ruta relativa, su cargador y su checksum SHA-256.
+#  - cada ruta se busca primero en la raíz del repositorio y, si el fichero no está ahí, en
+#    AI_LEARNING_ARTIFACTS_DIR (para artefactos que no están en el repositorio)
+#  - los modelos que generan los cuadernos (.pkl, .pth) no se versionan: su entrada tiene
+#    "sha256": null hasta que "update" guarda su checksum. Sin checksum, los artefactos que se
+#    cargan con pickle (joblib) no se cargan salvo con AI_LEARNING_ALLOW_UNVERIFIED=1, y los
+#    .pth se cargan con torch.load(weights_only=True); show_report avisa de lo no verificado
+#  - el checksum se comprueba una sola vez: el resultado se guarda en .artifacts_cache.json
+#    junto con el tamaño y la fecha de modificación, y solo se recalcula si el fichero cambia
+#  - cada artefacto se carga la primera vez que se usa y se reutiliza en todo el proceso
+#    (también entre reruns de Streamlit)
+#  - warm_up() lo carga en segundo plano y ejecuta una inferencia de prueba
+#  - report() devuelve los tiempos de verificación, carga y calentamiento
+#
+#Uso:
+#    python -m utilidades.artifacts check            #Verificar y cargar todos los artefactos disponibles
+#    python -m utilidades.artifacts update           #Recalcular los checksums del manifiesto
+
+#Importando las librerías necesarias
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MANIFEST_PATH = os.path.join(REPO_ROOT, "artifacts.json")
+VERIFY_CACHE_PATH = os.path.join(REPO_ROOT, ".artifacts_cache.json")
+ROOT_ENV = "AI_LEARNING_ARTIFACTS_DIR"
+ALLOW_UNVERIFIED_ENV = "AI_LEARNING_ALLOW_UNVERIFIED"
+#Cargadores que deserializan con pickle (pueden ejecutar código al cargar)
+PICKLE_LOADERS = {"joblib"}
+UNVERIFIED_STATUS = "cargado sin checksum"
+
+
+class ArtifactChecksumError(ValueError):
+    pass
+
+
+#Cargadores por tipo de artefacto (las librerías se importan solo cuando hacen falta)
+def _load_joblib(path):
+    import joblib
+    return joblib.load(path)
+
+
+def _load_keras(path):
+    from tensorflow.keras.models import load_model
+    return load_model(path)
+
+
+def _load_torch(path):
+    import torch
+    #Solo tensores y tipos básicos: no ejecuta código del fichero
+    return torch.load(path, map_location="cpu", weights_only=True)
+
+
+def _load_csv(path):
+    import pandas as pd
+    return pd.read_csv(path)
+
+
+LOADERS = {
+    "joblib": _load_joblib,
+    "keras": _load_keras,
+    "torch": _load_torch,
+    "csv": _load_csv,
+    "path": lambda path: path,
+}
+
+
+def sha256sum(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, mode="rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactRegistry:
+    def __init__(self, manifest_path=MANIFEST_PATH, root=None, verify_cache_path=VERIFY_CACHE_PATH):
+        with open(manifest_path, mode="r", encoding="utf-8") as file:
+            self.manifest = json.load(file)
+        #Directorios donde se buscan los artefactos, por orden
+        self.roots = [root] if root else [REPO_ROOT] + [d for d in [os.environ.get(ROOT_ENV)] if d]
+        self.verify_cache_path = verify_cache_path
+        self._artifacts = {}
+        self._stats = {name: {"status": "sin cargar"} for name in self.manifest}
+        self._locks = {name: threading.Lock() for name in self.manifest}
+        self._cache_lock = threading.Lock()
+
+    def path(self, name):
+        entry = self.manifest[name]
+        candidates = [os.path.join(root, *entry["path"].split("/")) for root in self.roots]
+        for path in candidates:
+            if os.path.isfile(path):
+                return path
+        hint = f" (se genera con {entry['generated_by']})" if entry.get("generated_by") else ""
+        raise FileNotFoundError(f"No existe el artefacto '{name}' en {' ni en '.join(candidates)}{hint}")
+
+    #Comprobar el checksum una sola vez por versión del fichero
+    def verify(self, name):
+        expected = self.manifest[name].get("sha256")
+        path = self.path(name)
+        if not expected:
+            return False
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        with self._cache_lock:
+            cache = self._read_verify_cache()
+            cached = cache.get(key)
+            if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns and cached["sha256"] == expected:
+                return True
+        actual = sha256sum(path)
+        if actual != expected:
+            raise ArtifactChecksumError(f"Checksum incorrecto para '{name}' ({path}): {actual} != {expected}")
+        with self._cache_lock:
+            cache = self._read_verify_cache()
+            cache[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": actual}
+            self._write_verify_cache(cache)
+        return True
+
+    def _read_verify_cache(self):
+        try:
+            with open(self.verify_cache_path, mode="r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_verify_cache(self, cache):
+        tmp_path = f"{self.verify_cache_path}.tmp"
+        try:
+            with open(tmp_path, mode="w", encoding="utf-8") as file:
+                json.dump(cache, file, indent=2)
+            os.replace(tmp_path, self.verify_cache_path)
+        except OSError:
+            #Sin permisos de escritura: se verificará de nuevo en el siguiente arranque
+            pass
+
+    def is_loaded(self, name):
+        return name in self._artifacts
+
+    #Cargar el artefacto la primera vez que se pide (loader opcional para construir objetos derivados)
+    def get(self, name, loader=None):
+        if name in self._artifacts:
+            return self._artifacts[name]
+        with self._locks[name]:
+            if name in self._artifacts:
+                return self._artifacts[name]
+            stats = self._stats[name]
+            start = time.perf_counter()
+            verified = self.verify(name)
+            stats["verify_s"] = time.perf_counter() - start
+            if not verified and self.manifest[name].get("loader") in PICKLE_LOADERS and os.environ.get(ALLOW_UNVERIFIED_ENV) != "1":
+                raise ArtifactChecksumError(
+                    f"'{name}' no tiene checksum en artifacts.json y se carga con pickle: ejecuta "
+                    f"'python -m utilidades.artifacts update' con el fichero generado, o define "
+                    f"{ALLOW_UNVERIFIED_ENV}=1 para cargarlo sin verificar"
+                )
+            start = time.perf_counter()
+            load = loader or LOADERS[self.manifest[name].get("loader", "path")]
+            artifact = load(self.path(name))
+            stats["load_s"] = time.perf_counter() - start
+            stats["status"] = "verificado" if verified else UNVERIFIED_STATUS
+            self._artifacts[name] = artifact
+            return artifact
+
+    #Cargar en segundo plano y ejecutar una inferencia de prueba
+    def warm_up(self, name, dummy_inference=None, loader=None):
+        stats = self._stats[name]
+        if stats.get("warm_up") or name in self._artifacts:
+            return stats.get("warm_up")
+
+        def run():
+            try:
+                artifact = self.get(name, loader)
+                if dummy_inference is not None:
+                    start = time.perf_counter()
+                    dummy_inference(artifact)
+                    stats["warm_up_s"] = time.perf_counter() - start
+            except Exception as exc:
+                stats["status"] = f"error: {exc}"
+
+        thread = threading.Thread(target=run, name=f"warm-up-{name}", daemon=True)
+        stats["warm_up"] = thread
+        thread.start()
+        return thread
+
+    def report(self):
+        rows = []
+        for name, stats in self._stats.items():
+            rows.append({
+                "artefacto": name,
+                "estado": stats["status"],
+                "verificación (s)": round(stats.get("verify_s", 0.0), 3),
+                "carga (s)": round(stats.get("load_s", 0.0), 3),
+                "calentamiento (s)": round(stats.get("warm_up_s", 0.0), 3),
+            })
+        return rows
+
+
+#Registro único por proceso (se conserva entre reruns de Streamlit)
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ArtifactRegistry()
+    return _registry
+
+
+#Función para mostrar el informe de carga en la barra lateral de una app de Streamlit
+def show_report(st, names=None):
+    rows = [row for row in registry().report() if names is None or row["artefacto"] in names]
+    unverified = [row["artefacto"] for row in rows if row["estado"] == UNVERIFIED_STATUS]
+    if unverified:
+        st.sidebar.warning(f"Artefactos cargados sin checksum: {', '.join(unverified)}")
+    with st.sidebar.expander("Artefactos"):
+        st.table(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verificar y cargar los artefactos del manifiesto")
+    parser.add_argument("command", choices=["check", "update"])
+    args = parser.parse_args()
+
+    if args.command == "update":
+        reg = ArtifactRegistry()
+        manifest = reg.manifest
+        for name, entry in manifest.items():
+            try:
+                path = reg.path(name)
+            except FileNotFoundError as exc:
+                print(f"{name}: {exc}, se mantiene el checksum anterior")
+                continue
+            entry["sha256"] = sha256sum(path)
+            entry.pop("sha256_note", None)
+            print(f"{name}: {entry['sha256']}")
+        with open(MANIFEST_PATH, mode="w", encoding="utf-8") as file:
+            json.dump(manifest, file, ensure_ascii=False, indent=2)
+            file.write("\n")
+        return
+
+    reg = registry()
+    for name in reg.manifest:
+        try:
+            reg.get(name)
+        except Exception as exc:
+            reg._stats[name]["status"] = f"error: {exc}"
+    for row in reg.report():
+        print(f"{row['artefacto']:<28} {row['estado']:<24} verificación {row['verificación (s)']:.3f} s · carga {row['carga (s)']:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#Codificación de variables categóricas sin one-hot denso
+#
+#pd.get_dummies crea una columna densa por cada categoría, lo que dispara la
+#memoria con columnas de alta cardinalidad (native-country, occupation, Suburb,
+#SellerG...). CategoricalEncoder aprende el vocabulario una vez y lo aplica igual
+#en entrenamiento y en inferencia, con cuatro salidas:
+#  - "native":   DataFrame con columnas category (LightGBM, XGBoost con enable_categorical)
+#  - "catboost": DataFrame con las categóricas como texto (cat_features de CatBoost)
+#  - "sparse":   matriz CSR de SciPy (numéricas + one-hot disperso) para el resto de modelos
+#  - "dense":    el one-hot denso de pd.get_dummies, como referencia
+#
+#Las categorías no vistas en el entrenamiento se tratan como valor ausente.
+
+#Importando las librerías necesarias
+import json
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+MODES = ("native", "catboost", "sparse", "dense")
+MISSING = "__nan__"
+
+
+class CategoricalEncoder:
+    def __init__(self, mode="native", categorical=None):
+        if mode not in MODES:
+            raise ValueError(f"Modo de codificación desconocido: {mode} (opciones: {', '.join(MODES)})")
+        self.mode = mode
+        self.categorical = list(categorical) if categorical is not None else None
+        self.numeric_ = None
+        self.vocabulary_ = None
+        self.feature_names_ = None
+
+    #Aprender las columnas y el vocabulario de cada categórica
+    def fit(self, X):
+        if self.categorical is None:
+            self.categorical = [c for c in X.columns if not pd.api.types.is_numeric_dtype(X[c]) or pd.api.types.is_bool_dtype(X[c])]
+        self.numeric_ = [c for c in X.columns if c not in self.categorical]
+        self.vocabulary_ = {
+            col: sorted(X[col].dropna().astype(str).unique().tolist()) for col in self.categorical
+        }
+        #Nombres de columnas del one-hot (mismo formato que pd.get_dummies)
+        self.feature_names_ = self.numeric_ + [f"{col}_{value}" for col in self.categorical for value in self.vocabulary_[col]]
+        return self
+
+    def _codes(self, X, col):
+        #Códigos del vocabulario aprendido (-1 para ausentes y categorías nuevas)
+        values = X[col].astype("string")
+        return pd.Categorical(values, categories=self.vocabulary_[col]).codes
+
+    def transform(self, X):
+        if self.vocabulary_ is None:
+            raise RuntimeError("El codificador no está ajustado; llama antes a fit()")
+        if self.mode == "native":
+            frame = X[self.numeric_].copy()
+            for col in self.categorical:
+                frame[col] = pd.Categorical.from_codes(self._codes(X, col), categories=self.vocabulary_[col])
+            return frame[self.numeric_ + self.categorical]
+        if self.mode == "catboost":
+            frame = X[self.numeric_].copy()
+            for col in self.categorical:
+                codes = self._codes(X, col)
+                vocab = np.array(self.vocabulary_[col] + [MISSING], dtype=object)
+                frame[col] = vocab[np.where(codes < 0, len(vocab) - 1, codes)]
+            return frame[self.numeric_ + self.categorical]
+        if self.mode == "sparse":
+            return self._sparse(X)
+        frame = pd.get_dummies(X[self.numeric_ + self.categorical].astype({c: str for c in self.categorical}))
+        return frame.reindex(columns=self.feature_names_, fill_value=0)
+
+    def fit_transform(self, X):
+        return self.fit(X).transform(X)
+
+    def _sparse(self, X):
+        n = len(X)
+        blocks = []
+        if self.numeric_:
+            #Las numéricas se guardan todas de forma explícita (también los ceros):
+            #en una CSR, XGBoost trataría un cero implícito como valor ausente
+            values = X[self.numeric_].to_numpy(dtype=np.float32)
+            rows = np.repeat(np.arange(n), len(self.numeric_))
+            cols = np.tile(np.arange(len(self.numeric_)), n)
+            blocks.append(sparse.csr_matrix((values.ravel(), (rows, cols)), shape=(n, len(self.numeric_))))
+        for col in self.categorical:
+            codes = self._codes(X, col)
+            present = codes >= 0
+            blocks.append(sparse.csr_matrix(
+                (np.ones(present.sum(), dtype=np.float32), (np.flatnonzero(present), codes[present])),
+                shape=(n, len(self.vocabulary_[col])),
+            ))
+        return sparse.hstack(blocks, format="csr")
+
+    #Parámetros del modelo y del fit para usar la codificación nativa de cada librería
+    def model_params(self, library):
+        if library == "xgboost" and self.mode == "native":
+            return {"enable_categorical": True, "tree_method": "hist"}
+        return {}
+
+    def fit_params(self, library):
+        if library == "catboost" and self.mode == "catboost":
+            return {"cat_features": list(self.categorical)}
+        return {}
+
+    #Guardar y cargar el vocabulario para reutilizarlo en inferencia
+    def save(self, path):
+        with open(path, mode="w", encoding="utf-8") as file:
+            json.dump({"mode": self.mode, "categorical": self.categorical, "numeric": self.numeric_,
+                       "vocabulary": self.vocabulary_}, file, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path, mode=None):
+        with open(path, mode="r", encoding="utf-8") as file:
+            state = json.load(file)
+        encoder = cls(mode or state["mode"], state["categorical"])
+        encoder.numeric_ = state["numeric"]
+        encoder.vocabulary_ = state["vocabulary"]
+        encoder.feature_names_ = encoder.numeric_ + [
+            f"{col}_{value}" for col in encoder.categorical for value in encoder.vocabulary_[col]
+        ]
+        return encoder
+
+
+#Memoria ocupada por la matriz de entrenamiento en MB
+def matrix_memory_mb(matrix):
+    if sparse.issparse(matrix):
+        return (matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes) / 1024 ** 2
+    return matrix.memory_usage(deep=True).sum() / 1024 ** 2
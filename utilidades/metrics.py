@@ -0,0 +1,252 @@
+#Instrumentación ligera de latencias por etapa (carga, preprocesado, inferencia, postprocesado)
+#
+#Cada par (app, etapa) acumula sus duraciones en un histograma de cubetas fijas
+#(memoria acotada, sin guardar muestras), del que se estiman p50/p95/p99.
+#  - with stage("titanic", "inference"): ...      #Context manager
+#  - @timed("chatbot", "intent")                   #Decorador
+#  - to_prometheus() / to_json()                   #Exportación en texto de Prometheus o JSON
+#  - serve(port) o AI_LEARNING_METRICS_PORT=9100   #Endpoint HTTP /metrics y /metrics.json
+#  - show_panel(st, "titanic")                     #Panel de depuración en Streamlit (AI_LEARNING_METRICS_PANEL=1)
+#
+#AI_LEARNING_METRICS=0 desactiva la medición (stage() devuelve un context manager vacío).
+#
+#Uso:
+#    python -m utilidades.metrics bench            #Coste por llamada con la medición activada y desactivada
+
+#Importando las librerías necesarias
+import argparse
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+ENABLED = os.environ.get("AI_LEARNING_METRICS", "1") != "0"
+PORT_ENV = "AI_LEARNING_METRICS_PORT"
+PANEL_ENV = "AI_LEARNING_METRICS_PANEL"
+
+#Límites superiores de las cubetas en nanosegundos: de 1 µs a ~67 s, multiplicando por 2
+BUCKETS_NS = [1000 * 2 ** i for i in range(27)]
+
+
+class Histogram:
+    __slots__ = ("counts", "total_ns", "count", "min_ns", "max_ns", "_lock")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_NS) + 1)
+        self.total_ns = 0
+        self.count = 0
+        self.min_ns = 0
+        self.max_ns = 0
+        self._lock = threading.Lock()
+
+    def observe(self, duration_ns):
+        index = bisect_left(BUCKETS_NS, duration_ns)
+        with self._lock:
+            self.counts[index] += 1
+            self.total_ns += duration_ns
+            self.count += 1
+            if duration_ns < self.min_ns or self.count == 1:
+                self.min_ns = duration_ns
+            if duration_ns > self.max_ns:
+                self.max_ns = duration_ns
+
+    def percentile(self, q):
+        #Estimación por interpolación lineal dentro de la cubeta (acotada por el mínimo y el máximo observados)
+        if not self.count:
+            return 0.0
+        target = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= target:
+                lower = max(BUCKETS_NS[i - 1] if i > 0 else 0, self.min_ns)
+                upper = min(BUCKETS_NS[i] if i < len(BUCKETS_NS) else self.max_ns, self.max_ns)
+                return lower + (upper - lower) * (target - seen) / n
+            seen += n
+        return float(self.max_ns)
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ns / self.count / 1e6 if self.count else 0.0,
+            "p50_ms": self.percentile(50) / 1e6,
+            "p95_ms": self.percentile(95) / 1e6,
+            "p99_ms": self.percentile(99) / 1e6,
+            "max_ms": self.max_ns / 1e6,
+        }
+
+
+#Histogramas del proceso por (app, etapa)
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def histogram(app, name):
+    key = (app, name)
+    hist = _histograms.get(key)
+    if hist is None:
+        with _histograms_lock:
+            hist = _histograms.setdefault(key, Histogram())
+    return hist
+
+
+class _Stage:
+    __slots__ = ("hist", "start")
+
+    def __init__(self, hist):
+        self.hist = hist
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.hist.observe(time.perf_counter_ns() - self.start)
+        return False
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+#Context manager que mide una etapa
+def stage(app, name):
+    if not ENABLED:
+        return _NO_STAGE
+    return _Stage(histogram(app, name))
+
+
+#Decorador que mide cada llamada a la función
+def timed(app, name):
+    def decorator(func):
+        if not ENABLED:
+            return func
+        hist = histogram(app, name)
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                hist.observe(time.perf_counter_ns() - start)
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        wrapper.__wrapped__ = func
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    return {f"{app}/{name}": hist.summary() for (app, name), hist in sorted(_histograms.items())}
+
+
+def to_json():
+    return json.dumps(snapshot(), indent=2)
+
+
+def to_prometheus():
+    lines = [
+        "# HELP ai_learning_stage_seconds Duración de cada etapa de predicción",
+        "# TYPE ai_learning_stage_seconds histogram",
+    ]
+    for (app, name), hist in sorted(_histograms.items()):
+        labels = f'app="{app}",stage="{name}"'
+        cumulative = 0
+        for bound, n in zip(BUCKETS_NS, hist.counts):
+            cumulative += n
+            lines.append(f'ai_learning_stage_seconds_bucket{{{labels},le="{bound / 1e9:.6g}"}} {cumulative}')
+        lines.append(f'ai_learning_stage_seconds_bucket{{{labels},le="+Inf"}} {hist.count}')
+        lines.append(f"ai_learning_stage_seconds_sum{{{labels}}} {hist.total_ns / 1e9:.9f}")
+        lines.append(f"ai_learning_stage_seconds_count{{{labels}}} {hist.count}")
+    return "\n".join(lines) + "\n"
+
+
+#Endpoint HTTP en un hilo aparte (uno por proceso)
+_server = None
+
+
+def serve(port, host="127.0.0.1"):
+    global _server
+    if _server is not None:
+        return _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/metrics.json"):
+                body, content_type = to_json(), "application/json"
+            elif self.path.startswith("/metrics"):
+                body, content_type = to_prometheus(), "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    _server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=_server.serve_forever, name="metrics-endpoint", daemon=True).start()
+    return _server
+
+
+def serve_from_env():
+    port = os.environ.get(PORT_ENV)
+    if port and _server is None:
+        try:
+            serve(int(port))
+        except OSError:
+            #Puerto ocupado (otra app ya sirve las métricas)
+            pass
+
+
+#Panel de depuración con las latencias de una app en la barra lateral de Streamlit
+def show_panel(st, app):
+    if os.environ.get(PANEL_ENV) != "1":
+        return
+    rows = [
+        {"etapa": name, **{k: round(v, 3) if isinstance(v, float) else v for k, v in hist.summary().items()}}
+        for (hist_app, name), hist in sorted(_histograms.items()) if hist_app == app
+    ]
+    with st.sidebar.expander("Latencias por etapa", expanded=True):
+        st.table(rows)
+
+
+def bench(calls):
+    global ENABLED
+    results = {}
+    for enabled in (True, False):
+        ENABLED = enabled
+        start = time.perf_counter_ns()
+        for _ in range(calls):
+            with stage("bench", "noop"):
+                pass
+        results[enabled] = (time.perf_counter_ns() - start) / calls
+    print(f"stage() activado: {results[True] / 1000:.2f} µs/llamada · desactivado: {results[False] / 1000:.2f} µs/llamada")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Instrumentación de latencias por etapa")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    p_bench = subparsers.add_parser("bench", help="Coste por llamada de stage()")
+    p_bench.add_argument("--calls", type=int, default=1_000_000)
+    args = parser.parse_args()
+    bench(args.calls)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+#Arranque rápido de las apps de Streamlit
+#
+#Las librerías pesadas (tensorflow, torch/torchvision, sentence_transformers, spacy,
+#matplotlib) y los modelos ya no se importan al principio del script: cada app los
+#importa y carga dentro de una función que se ejecuta en un hilo en segundo plano,
+#así que la interfaz se dibuja en cuanto arranca Streamlit.
+#  - background(name, loader) lanza loader() una sola vez por proceso (también entre reruns)
+#  - task.ready / task.result() (espera a que termine) / task.error
+#  - show_status(st, task) indicador de estado en la barra lateral
+#  - request_queue(st) peticiones hechas antes de que el modelo esté listo; la app las
+#    procesa en orden cuando termina la carga
+#  - poll(st, task) vuelve a ejecutar el script mientras se carga, para refrescar el
+#    indicador y vaciar la cola
+#
+#AI_LEARNING_FAST_STARTUP=0 importa y carga todo en primer plano antes de dibujar nada (referencia
+#para comparar; las apps llaman a background() antes del primer elemento de la página).
+#
+#Uso:
+#    python -m utilidades.startup importtime <app.py> [<app.py> ...]   #Tiempo hasta el primer render con y sin arranque rápido
+#    (también acepta la copia de una app de otra revisión, p. ej. sacada con git worktree)
+
+#Importando las librerías necesarias
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+FAST_ENV = "AI_LEARNING_FAST_STARTUP"
+PROBE_START = "startup-probe script_start"
+PROBE_MARKER = "startup-probe first_render"
+
+#Funciones de Streamlit que dibujan algo en la página (para detectar el primer render)
+RENDER_FUNCTIONS = (
+    "title", "header", "subheader", "markdown", "write", "caption", "text", "info",
+    "image", "slider", "text_input", "chat_input", "file_uploader", "number_input", "selectbox",
+)
+
+
+def fast_startup():
+    return os.environ.get(FAST_ENV, "1") != "0"
+
+
+class BackgroundTask:
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.error = None
+        self.elapsed_s = None
+        self._result = None
+        self._done = threading.Event()
+
+    def start(self, in_background=True):
+        if in_background:
+            threading.Thread(target=self._run, name=f"startup-{self.name}", daemon=True).start()
+        else:
+            self._run()
+        return self
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            self._result = self.loader()
+        except Exception as exc:
+            self.error = exc
+        finally:
+            self.elapsed_s = time.perf_counter() - start
+            self._done.set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def ready(self):
+        return self._done.is_set() and self.error is None
+
+    #Esperar a que termine la carga y devolver su resultado
+    def result(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"La carga de '{self.name}' no ha terminado tras {timeout} s")
+        if self.error is not None:
+            raise self.error
+        return self._result
+
+
+#Tareas del proceso por nombre (se conservan entre reruns de Streamlit)
+_tasks = {}
+_tasks_lock = threading.Lock()
+
+
+def background(name, loader):
+    with _tasks_lock:
+        task = _tasks.get(name)
+        if task is None:
+            task = _tasks[name] = BackgroundTask(name, loader)
+            created = True
+        else:
+            created = False
+    if created:
+        task.start(in_background=fast_startup())
+    return task
+
+
+#Indicador de estado en la barra lateral
+def show_status(st, task, label="Modelos"):
+    if task.ready:
+        st.sidebar.success(f"{label} listos ({task.elapsed_s:.1f} s)")
+    elif task.done:
+        st.sidebar.error(f"Error al cargar {label.lower()}: {task.error}")
+    else:
+        st.sidebar.info(f"Cargando {label.lower()} en segundo plano...")
+
+
+#Cola de peticiones de la sesión hechas antes de que el modelo esté listo
+def request_queue(st, key="startup_queue"):
+    if key not in st.session_state:
+        st.session_state[key] = deque()
+    return st.session_state[key]
+
+
+#Volver a ejecutar el script mientras la carga sigue en curso (llamar al final del script)
+def poll(st, task, interval=0.5):
+    if not task.done:
+        time.sleep(interval)
+        st.rerun()
+
+
+#Medición del tiempo hasta el primer render
+def _probe(script):
+    #Se ejecuta con python -X importtime: las marcas delimitan en stderr las importaciones
+    #del script hechas antes del primer elemento dibujado
+    import runpy
+    import streamlit as st
+
+    def first_render(*args, **kwargs):
+        sys.stderr.write(f"{PROBE_MARKER} {time.time():.6f}\n")
+        sys.stderr.flush()
+        os._exit(0)
+
+    for name in RENDER_FUNCTIONS:
+        if hasattr(st, name):
+            setattr(st, name, first_render)
+    script = os.path.abspath(script)
+    sys.path.insert(0, os.path.dirname(script))
+    sys.argv = [script]
+    sys.stderr.write(f"{PROBE_START}\n")
+    runpy.run_path(script, run_name="__main__")
+    #El script terminó sin dibujar nada
+    sys.stderr.write(f"{PROBE_MARKER} {time.time():.6f}\n")
+
+
+def _parse_importtime(stderr, launched_at):
+    #Líneas "import time: self [us] | cumulative | imported package" entre las dos marcas
+    first_render_s = None
+    imports = []
+    started = False
+    for line in stderr.splitlines():
+        if line.startswith(PROBE_START):
+            started = True
+        elif line.startswith(PROBE_MARKER):
+            first_render_s = float(line.split()[-1]) - launched_at
+            break
+        elif started and line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            _, cumulative, package = line[len("import time:"):].split("|")
+            imports.append((package.rstrip(), int(cumulative)))
+    #Paquetes de primer nivel (sin sangría) ordenados por tiempo acumulado
+    top_level = sorted(
+        ((package.strip(), us) for package, us in imports if not package.startswith("  ")),
+        key=lambda item: item[1], reverse=True,
+    )
+    return first_render_s, len(imports), top_level
+
+
+def measure(script, fast, top=5):
+    env = dict(os.environ, **{FAST_ENV: "1" if fast else "0"})
+    script = os.path.abspath(script)
+    launched_at = time.time()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "utilidades.startup", "_probe", script],
+        cwd=os.path.dirname(script), env=env, capture_output=True, text=True,
+    )
+    first_render_s, modules, top_level = _parse_importtime(completed.stderr, launched_at)
+    if first_render_s is None:
+        raise RuntimeError(f"{script} falló antes del primer render:\n{completed.stderr[-2000:]}")
+    return {"first_render_s": first_render_s, "modules": modules, "top": top_level[:top]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arranque rápido de las apps de Streamlit")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    p_importtime = subparsers.add_parser("importtime", help="Tiempo hasta el primer render con y sin arranque rápido")
+    p_importtime.add_argument("scripts", nargs="+")
+    p_importtime.add_argument("--top", type=int, default=5, help="Importaciones más lentas a mostrar")
+    p_probe = subparsers.add_parser("_probe")
+    p_probe.add_argument("script")
+    args = parser.parse_args()
+
+    if args.command == "_probe":
+        _probe(args.script)
+        return
+
+    #La raíz del repositorio debe estar en el path del subproceso para python -m utilidades.startup
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")]))
+    for script in args.scripts:
+        print(f"\n{script}")
+        results = {}
+        for fast in (False, True):
+            result = results[fast] = measure(script, fast, args.top)
+            mode = "arranque rápido" if fast else "carga completa"
+            print(f"  {mode:<16} primer render {result['first_render_s']:6.2f} s · {result['modules']:>5} módulos importados antes")
+            for package, us in result["top"]:
+                print(f"      {us / 1e6:6.2f} s  {package}")
+        speedup = results[False]["first_render_s"] / max(results[True]["first_render_s"], 1e-9)
+        print(f"  -> {speedup:.1f}x más rápido hasta el primer render")
+
+
+if __name__ == "__main__":
+    main()